@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Micro benchmarks for Tavi. Run a benchmark as a module, for example:
+
+    python -m benchmarks.lazy_decoding
+
+"""
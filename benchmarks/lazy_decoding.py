@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Compares eager and lazy loading of 100 field documents when only a few of
+their fields are read.
+
+"""
+import timeit
+from bson import BSON
+from tavi import fields
+from tavi.documents import Document, EmbeddedDocument
+
+try:
+    from bson.raw_bson import RawBSONDocument
+except ImportError:
+    RawBSONDocument = None
+
+NUM_FIELDS = 100
+NUM_DOCS = 1000
+FIELDS_READ = ["field_0", "field_1", "lines"]
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+    price = fields.FloatField("price")
+
+
+def wide_document_class():
+    attrs = {
+        "field_%d" % i: fields.StringField("field_%d" % i)
+        for i in range(NUM_FIELDS - 1)
+    }
+    attrs["lines"] = fields.ListField("lines", Line)
+    return type(Document)("WideDocument", (Document,), attrs)
+
+
+WideDocument = wide_document_class()
+
+
+def encoded_documents():
+    doc = {"field_%d" % i: "value %d" % i for i in range(NUM_FIELDS - 1)}
+    doc["lines"] = [{"quantity": i, "price": 1.5} for i in range(10)]
+    return [BSON.encode(doc) for _ in range(NUM_DOCS)]
+
+
+def read_fields(doc):
+    for field in FIELDS_READ:
+        getattr(doc, field)
+
+
+def eager(encoded):
+    for data in encoded:
+        read_fields(WideDocument(**BSON(data).decode()))
+
+
+def lazy(encoded):
+    for data in encoded:
+        read_fields(WideDocument.from_raw(RawBSONDocument(data)))
+
+
+def main():
+    encoded = encoded_documents()
+    runs = 5
+
+    results = [("eager", eager)]
+    if RawBSONDocument is not None:
+        results.append(("lazy", lazy))
+
+    for name, func in results:
+        duration = min(timeit.repeat(lambda: func(encoded), number=1,
+                                     repeat=runs))
+        print("%-5s %d docs x %d fields, reading %d: %.3fs (%.0f docs/s)" % (
+            name, NUM_DOCS, NUM_FIELDS, len(FIELDS_READ), duration,
+            NUM_DOCS / duration
+        ))
+
+
+if __name__ == "__main__":
+    main()
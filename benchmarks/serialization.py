@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Compares Document#to_json with encoding the document's field values with
+bson.json_util, as it used to, for all and for a few of its fields.
+
+"""
+import datetime
+import timeit
+from bson import ObjectId, json_util
+from tavi import fields
+from tavi.documents import Document, EmbeddedDocument
+
+NUM_DOCS = 2000
+FIELDS = ["name", "price", "lines"]
+
+
+class Line(EmbeddedDocument):
+    product_id = fields.ObjectIdField("product_id")
+    quantity = fields.IntegerField("quantity")
+    price = fields.FloatField("price")
+
+
+class Order(Document):
+    name = fields.StringField("name")
+    email = fields.StringField("email")
+    status = fields.StringField("status")
+    price = fields.FloatField("price")
+    quantity = fields.IntegerField("quantity")
+    placed_at = fields.DateTimeField("placed_at")
+    shipped_at = fields.DateTimeField("shipped_at")
+    customer_id = fields.ObjectIdField("customer_id")
+    tags = fields.ArrayField("tags")
+    lines = fields.ListField("lines", Line)
+
+
+def json_util_to_json(doc, fields=None):
+    if fields:
+        field_map = {field: doc.field_values[field] for field in fields}
+    else:
+        field_map = doc.field_values
+    field_map["id"] = doc.bson_id
+    return json_util.dumps(field_map)
+
+
+def main():
+    now = datetime.datetime(2013, 8, 25, 22, 24, 0)
+    docs = [Order(
+        name="Order %d" % i, email="jdoe@example.com", status="new",
+        price=19.99, quantity=3, placed_at=now, shipped_at=now,
+        customer_id=ObjectId(), tags=["a", "b"],
+        lines=[
+            {"product_id": ObjectId(), "quantity": 1, "price": 9.99}
+            for _ in range(5)
+        ]
+    ) for i in range(NUM_DOCS)]
+    requested = FIELDS + ["bson_id"]
+    runs = 5
+
+    results = [
+        ("json_util", lambda: [json_util_to_json(d) for d in docs]),
+        ("to_json", lambda: [d.to_json() for d in docs]),
+        ("json_util, %d fields" % len(FIELDS),
+         lambda: [json_util_to_json(d, FIELDS) for d in docs]),
+        ("to_json, %d fields" % len(FIELDS),
+         lambda: [d.to_json(requested) for d in docs])
+    ]
+
+    for name, func in results:
+        duration = min(timeit.repeat(func, number=1, repeat=runs))
+        print("%-20s %d docs: %.3fs (%.0f docs/s)" % (
+            name, NUM_DOCS, duration, NUM_DOCS / duration
+        ))
+
+
+if __name__ == "__main__":
+    main()
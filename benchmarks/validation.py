@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Measures field validation throughput by validating typical values, with
+and without optional constraints, against every built in scalar field and an
+array field. Also compares validating a batch of rows by creating a document
+for each of them with validating them at once with *validate_many*.
+
+"""
+import datetime
+import timeit
+from bson import ObjectId
+from tavi import fields
+from tavi.base.documents import BaseDocument
+
+NUM_VALIDATIONS = 100000
+NUM_ROWS = 10000
+
+
+class Sample(BaseDocument):
+    name = fields.StringField("name")
+    code = fields.StringField(
+        "code", required=True, min_length=2, max_length=8, pattern="^[A-Z]+$",
+        choices=["AB", "CD", "EF", "GH"]
+    )
+    active = fields.BooleanField("active")
+    sold_on = fields.DateTimeField("sold_on")
+    quantity = fields.IntegerField("quantity", min_value=0, max_value=100)
+    price = fields.FloatField("price", min_value=0)
+    ref = fields.ObjectIdField("ref")
+    tags = fields.ArrayField("tags", max_length=5)
+
+
+VALUES = {
+    "name": u"John",
+    "code": u"CD",
+    "active": True,
+    "sold_on": datetime.datetime(2013, 8, 25),
+    "quantity": 42,
+    "price": 9.99,
+    "ref": ObjectId(),
+    "tags": ["a", "b"]
+}
+
+
+def validate(doc, checks):
+    for field, value in checks:
+        field.validate(doc, value)
+
+
+def validate_documents(rows):
+    return [Sample(**row).valid for row in rows]
+
+
+def main():
+    doc = Sample()
+    descriptors = Sample._field_descriptors
+    checks = [(descriptors[attr], value) for attr, value in VALUES.items()]
+    checks *= NUM_VALIDATIONS // len(checks)
+    runs = 5
+
+    duration = min(timeit.repeat(lambda: validate(doc, checks), number=1,
+                                 repeat=runs))
+    print("%d validations: %.3fs (%.0f validations/s)" % (
+        len(checks), duration, len(checks) / duration
+    ))
+
+    rows = [dict(VALUES, quantity=i % 120) for i in range(NUM_ROWS)]
+    for name, func in [("documents", validate_documents),
+                       ("validate_many", Sample.validate_many)]:
+        duration = min(timeit.repeat(lambda: func(rows), number=1,
+                                     repeat=runs))
+        print("%-13s %d rows: %.3fs (%.0f rows/s)" % (
+            name, NUM_ROWS, duration, NUM_ROWS / duration
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,8 @@ setup(
         "inflection >= 0.2.0",
         "pymongo {PYMONGO_VERSION}".format(PYMONGO_VERSION=os.getenv("PYMONGO_VERSION", ">= 2.4.1"))
     ] + test_requirements,
+    extras_require={"numpy": ["numpy"], "simplejson": ["simplejson"]},
+    entry_points={"console_scripts": ["tavi = tavi.cli:main"]},
     tests_require=test_requirements,
     test_suite="nose_collector"
 )
@@ -3,14 +3,47 @@
 from pymongo import MongoClient, MongoReplicaSetClient
 from pymongo.database import Database
 import collections
+import os
 import tavi
+from tavi.utils import apply_slice
+
+
+class ConnectionMetaClass(type):
+    """MetaClass for Connection. Provides the *client* and *database*
+    properties, which connect again the first time they are used in a process
+    other than the one that set up the connection, e.g. after a fork.
+
+    """
+    @property
+    def client(cls):
+        """Returns the MongoClient for this process."""
+        cls._ensure_connected()
+        return cls._client
+
+    @property
+    def database(cls):
+        """Returns the Database for this process."""
+        cls._ensure_connected()
+        return cls._database
 
 
 class Connection(object):
-    """Represents a MongoDB connection."""
+    """Represents a MongoDB connection.
+
+    A MongoClient must not be used by a process forked from the one that
+    created it, as its sockets and monitor threads are shared with, or lost
+    from, the parent. Connection keeps track of the process that created the
+    client and creates a new one, using the same settings, when it is used in
+    another process. Pre-fork servers can also call *reset* explicitly after
+    forking.
+
+    """
+    __metaclass__ = ConnectionMetaClass
 
-    client = None
-    database = None
+    settings = None
+    _client = None
+    _database = None
+    _pid = None
 
     @classmethod
     def setup(cls, database_name, **kwargs):
@@ -19,14 +52,46 @@ class Connection(object):
         passed to *MongoClient*. If replicaSet is present in the host, a
         *MongoReplicaSetClient* will be used instead.
 
+        The arguments are kept in *settings* so that the same connection can
+        be set up again, e.g. in another process.
+
+        """
+        cls.settings = (database_name, kwargs)
+        cls._connect()
+
+    @classmethod
+    def reset(cls):
+        """Discards the current client. The next use of *client* or
+        *database* connects again using the settings given to *setup*. The
+        client is closed if it was created by this process; one inherited
+        from a parent process is left alone so that the parent's sockets are
+        not affected.
+
         """
+        if cls._client is not None and cls._pid == os.getpid():
+            cls._client.close()
+        cls._client = None
+        cls._database = None
+        cls._pid = None
+
+    @classmethod
+    def _ensure_connected(cls):
+        if cls._pid is not None and cls._pid != os.getpid():
+            cls.reset()
+        if cls._client is None and cls.settings is not None:
+            cls._connect()
+
+    @classmethod
+    def _connect(cls):
+        database_name, kwargs = cls.settings
         host = kwargs.get("host", "")
         if host.find("replicaSet") > 0:
             client = MongoReplicaSetClient(**kwargs)
         else:
             client = MongoClient(**kwargs)
-        cls.client = client
-        cls.database = Database(client, database_name)
+        cls._client = client
+        cls._database = Database(client, database_name)
+        cls._pid = os.getpid()
 
 
 class EmbeddedList(collections.MutableSequence):
@@ -34,12 +99,23 @@ class EmbeddedList(collections.MutableSequence):
     EmbeddedDocuments can be added to the list. Supports all the of standard
     list functions, excluding sorting.
 
+    Sub-documents loaded from Mongo are kept as they are and only turned into
+    EmbeddedDocuments when they are accessed.
+
+    Once the list is marked as saved, changes to it are tracked so that they
+    can be persisted with $push, $pull or positional $set operations instead
+    of rewriting the whole array.
+
     """
     def __init__(self, name, type_):
         self.list_ = list()
         self.name = name
         self._owner = None
         self._type = type_
+        self._saved_length = None
+        self._removed = []
+        self._replaced = set()
+        self._reset = False
 
         if not isinstance(self._type(), tavi.documents.EmbeddedDocument):
             raise tavi.errors.TaviTypeError(
@@ -51,19 +127,181 @@ class EmbeddedList(collections.MutableSequence):
         return len(self.list_)
 
     def __getitem__(self, index):
-        return self.list_[index]
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(len(self)))]
+
+        item = self.list_[index]
+        if isinstance(item, collections.Mapping):
+            item = self._materialize(index, item)
+        return item
+
+    def __iter__(self):
+        for index in xrange(len(self.list_)):
+            yield self[index]
 
     def __delitem__(self, index):
+        if self._is_saved(index):
+            if isinstance(index, slice) or self._replaced:
+                self._reset = True
+            else:
+                self._removed.append(self._field_values(self.list_[index]))
+                self._saved_length -= 1
         del self.list_[index]
 
     def __repr__(self):
         return str(self.list_)
 
     def __setitem__(self, index, value):
+        if self._is_saved(index):
+            if isinstance(index, slice):
+                self._reset = True
+            else:
+                self._replaced.add(self._position(index))
         self.list_[index] = value
 
     def __eq__(self, other):
-        return self.list_ == other
+        return list(self) == other
+
+    def _materialize(self, index, raw):
+        """Creates the EmbeddedDocument for the raw sub-document at *index*.
+        If the document is not valid its errors are added to the list owner.
+
+        """
+        value = self._type.from_raw(raw)
+        value.owner = self.owner
+        self.list_[index] = value
+
+        if not value.valid and self.owner is not None:
+            for msg in value.errors.full_messages:
+                self.owner.errors.add("%s Error:" % self.name, msg)
+
+        return value
+
+    def _position(self, index):
+        return index + len(self.list_) if index < 0 else index
+
+    def _is_saved(self, index):
+        """Indicates if *index* refers to items that have been saved."""
+        if self._saved_length is None:
+            return False
+        if isinstance(index, slice):
+            return index.indices(len(self))[0] < self._saved_length
+        return self._position(index) < self._saved_length
+
+    def _field_values(self, item):
+        if isinstance(item, collections.Mapping):
+            return item
+        return item.field_values
+
+    @property
+    def field_values(self):
+        """Returns a list containing the field values of every item. Items that
+        have not been accessed are returned as the raw sub-documents they
+        were loaded from.
+
+        """
+        return [self._field_values(item) for item in self.list_]
+
+    def mark_saved(self):
+        """Marks the current items as persisted. Changes made after this are
+        tracked.
+
+        """
+        self._saved_length = len(self.list_)
+        self._removed = []
+        self._replaced = set()
+        self._reset = False
+
+        for item in self.materialized():
+            item.changed_fields = set()
+
+    def update_operations(self, path):
+        """Returns the update operations that persist the changes made to the
+        list since it was marked as saved, using *path* as the name of the
+        array. Returns None if the whole array has to be set, which is the
+        case if the list was never saved, or if its changes cannot be
+        expressed as a single kind of operation.
+
+        """
+        if self._saved_length is None or self._reset:
+            return None
+
+        values = self.field_values
+        pushed = values[self._saved_length:]
+        modified = {
+            "%s.%d" % (path, i): values[i]
+            for i, item in enumerate(self.list_[:self._saved_length])
+            if i in self._replaced or getattr(item, "changed_fields", None)
+        }
+
+        if len([ops for ops in (pushed, modified, self._removed) if ops]) > 1:
+            return None
+        if pushed:
+            return {"$push": {path: {"$each": pushed}}}
+        if modified:
+            return {"$set": modified}
+        if self._removed:
+            return pull_operation(path, self._removed, values)
+        return {}
+
+    def record_push(self, items, slice_=None):
+        """Adds *items*, which have already been pushed to Mongo, to the end
+        of the saved items. *slice_* is applied to the saved items the same
+        way Mongo's $slice modifier is.
+
+        """
+        if self._saved_length is None:
+            self.list_ = apply_slice(self.list_ + list(items), slice_)
+            return
+
+        saved = self.list_[:self._saved_length] + list(items)
+        trimmed = apply_slice(saved, slice_)
+        if len(trimmed) != len(saved) and (self._replaced or self._removed):
+            self._reset = True
+
+        self.list_ = trimmed + self.list_[self._saved_length:]
+        self._saved_length = len(trimmed)
+
+    def record_pull(self, values):
+        """Removes all items matching the field *values*, which have already
+        been pulled from Mongo.
+
+        """
+        kept = [
+            (i, item) for i, item in enumerate(self.list_)
+            if self._field_values(item) not in values
+        ]
+
+        if self._saved_length is not None:
+            if self._replaced and len(kept) != len(self.list_):
+                self._reset = True
+            self._saved_length = len(
+                [i for i, _ in kept if i < self._saved_length])
+
+        self.list_ = [item for _, item in kept]
+
+    def changed(self):
+        """Returns the items that were added, replaced or changed since the
+        list was marked as saved, or every item that has been turned into an
+        EmbeddedDocument if the list has never been saved or must be set as a
+        whole.
+
+        """
+        if self._saved_length is None or self._reset:
+            return self.materialized()
+        return [
+            item for i, item in enumerate(self.list_)
+            if not isinstance(item, collections.Mapping) and (
+                i >= self._saved_length or i in self._replaced or
+                item.changed_fields)
+        ]
+
+    def materialized(self):
+        """Returns the items that have been turned into EmbeddedDocuments."""
+        return [
+            item for item in self.list_
+            if not isinstance(item, collections.Mapping)
+        ]
 
     @property
     def owner(self):
@@ -89,7 +327,14 @@ class EmbeddedList(collections.MutableSequence):
         None.
 
         """
-        return next((i for i in self.list_ if i == item), None)
+        return next((i for i in self if i == item), None)
+
+    def extend_raw(self, items):
+        """Adds the raw sub-documents *items* to the list without creating
+        EmbeddedDocuments for them.
+
+        """
+        self.list_.extend(items)
 
     def insert(self, index, value):
         """Adds *value* to list at *index*. Ensures that *value* is a
@@ -97,6 +342,18 @@ class EmbeddedList(collections.MutableSequence):
         not. Checks that *value* is valid before being added. If *value* is not
         valid it adds the errors to the list owner.
 
+        """
+        if self.accepts(value):
+            value.owner = self.owner
+            if self._is_saved(index) and index < len(self.list_):
+                self._reset = True
+            self.list_.insert(index, value)
+
+    def accepts(self, value):
+        """Indicates if *value* can be added to the list. Raises a
+        TaviTypeError if *value* is not of the type of the list. If *value* is
+        not valid it adds the errors to the list owner.
+
         """
         if not isinstance(value, self._type):
             raise tavi.errors.TaviTypeError(
@@ -107,8 +364,27 @@ class EmbeddedList(collections.MutableSequence):
             )
 
         if value.valid:
-            value.owner = self.owner
-            self.list_.insert(index, value)
-        else:
-            for msg in value.errors.full_messages:
-                self.owner.errors.add("%s Error:" % self.name, msg)
+            return True
+
+        for msg in value.errors.full_messages:
+            self.owner.errors.add("%s Error:" % self.name, msg)
+        return False
+
+
+def pull_operation(path, removed, remaining):
+    """Returns a $pull operation that removes the *removed* values from the
+    array at *path*, or None if doing so would also remove any of the
+    *remaining* values. Embedded documents are matched on all of their fields.
+
+    """
+    if any(value in remaining for value in removed):
+        return None
+
+    documents = [v for v in removed if isinstance(v, collections.Mapping)]
+    if not documents:
+        return {"$pull": {path: {"$in": list(removed)}}}
+    if len(documents) != len(removed):
+        return None
+    if 1 == len(documents):
+        return {"$pull": {path: documents[0]}}
+    return {"$pull": {path: {"$or": documents}}}
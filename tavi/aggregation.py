@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Translates aggregation pipelines written with Document attribute names
+into pipelines that use the Mongo names of the fields.
+
+"""
+from tavi.base.documents import BaseDocument
+
+_LOGICAL_OPERATORS = frozenset(["$and", "$or", "$nor"])
+
+# Stages after which documents no longer have the Document's fields.
+_RESHAPING_STAGES = frozenset([
+    "$group", "$replaceRoot", "$replaceWith", "$bucket", "$bucketAuto",
+    "$facet", "$sortByCount", "$count"
+])
+
+
+def translate_path(document_class, path):
+    """Returns the dotted *path* with its first part, if it is the attribute
+    name of a field, replaced by the Mongo name of the field. Embedded
+    documents are stored using their attribute names, so the rest of the
+    path is kept as it is.
+
+    """
+    head, dot, rest = path.partition(".")
+    field = document_class._field_descriptors.get(head)
+    if field is None:
+        return path
+    return field.name + dot + rest
+
+
+def translate_expression(document_class, expression):
+    """Returns the aggregation *expression* with every field path, i.e.
+    every string starting with a single "$", translated.
+
+    """
+    if isinstance(expression, basestring):
+        if expression.startswith("$") and not expression.startswith("$$"):
+            return "$" + translate_path(document_class, expression[1:])
+        return expression
+    if isinstance(expression, dict):
+        return {
+            key: translate_expression(document_class, value)
+            for key, value in expression.items()
+        }
+    if isinstance(expression, list):
+        return [translate_expression(document_class, value)
+                for value in expression]
+    return expression
+
+
+def translate_query(document_class, query):
+    """Returns the *query*, as given to find or $match, with its field names
+    translated.
+
+    """
+    translated = {}
+    for key, value in query.items():
+        if key in _LOGICAL_OPERATORS:
+            value = [translate_query(document_class, item) for item in value]
+        elif "$expr" == key:
+            value = translate_expression(document_class, value)
+        elif not key.startswith("$"):
+            key = translate_path(document_class, key)
+        translated[key] = value
+    return translated
+
+
+def translate_stage(document_class, stage):
+    """Returns the pipeline *stage* with its field names translated."""
+    translated = {}
+    for operator, value in stage.items():
+        if "$match" == operator:
+            value = translate_query(document_class, value)
+        elif operator in ("$project", "$addFields", "$set", "$sort"):
+            value = {
+                translate_path(document_class, key):
+                    translate_expression(document_class, item)
+                for key, item in value.items()
+            }
+        elif "$unset" == operator:
+            if isinstance(value, basestring):
+                value = translate_path(document_class, value)
+            else:
+                value = [translate_path(document_class, v) for v in value]
+        else:
+            value = translate_expression(document_class, value)
+        translated[operator] = value
+    return translated
+
+
+def translate(document_class, pipeline):
+    """Returns *pipeline* with the attribute names of *document_class*
+    translated to Mongo names, up to and including the first stage that
+    reshapes the documents, such as $group. Later stages refer to the names
+    output by that stage and are kept as they are.
+
+    """
+    translated = []
+    for stage in pipeline:
+        if document_class is None:
+            translated.append(stage)
+            continue
+
+        translated.append(translate_stage(document_class, stage))
+        if _RESHAPING_STAGES.intersection(stage):
+            document_class = None
+    return translated
+
+
+def hydrator(document_class, hydrate):
+    """Returns the function used to build the results of an aggregation
+    from the raw documents, or None if they are returned as they are.
+
+    """
+    if not hydrate:
+        return None
+    if hydrate is True:
+        hydrate = document_class
+    if isinstance(hydrate, type) and issubclass(hydrate, BaseDocument):
+        return hydrate.from_raw
+    return hydrate
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Builds specialized per-class functions for BaseDocuments.
+
+The generic *get_field_attr* and *set_field_attr* functions inspect every
+value they handle. Since the kind of every field is known when a document
+class is defined, the metaclass uses the builders in this module to generate
+straight-line Python functions for hydrating, and dumping the fields of,
+instances of that class.
+
+"""
+import collections
+import keyword
+import re
+
+SCALAR, EMBEDDED, LIST, REFERENCE, GENERIC = (
+    "scalar", "embedded", "list", "reference", "generic")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _is_identifier(name):
+    return bool(_IDENTIFIER.match(name)) and not keyword.iskeyword(name)
+
+
+def _get(attr):
+    """Returns an expression that reads *attr* from *doc*."""
+    if _is_identifier(attr):
+        return "doc.%s" % attr
+    return "getattr(doc, %r)" % attr
+
+
+def _set(attr, expr):
+    """Returns a statement that assigns *expr* to *attr* on *doc*."""
+    if _is_identifier(attr):
+        return "doc.%s = %s" % (attr, expr)
+    return "setattr(doc, %r, %s)" % (attr, expr)
+
+
+def compile_function(name, lines, namespace):
+    """Compiles the source *lines* of a function called *name*, resolving
+    globals from *namespace*, and returns the function.
+
+    """
+    source = "\n".join(lines) + "\n"
+    code = compile(source, "<tavi %s>" % name, "exec")
+    scope = {}
+    exec(code, namespace, scope)
+    func = scope[name]
+    func.__source__ = source
+    return func
+
+
+def build_hydrate(descriptors, namespace):
+    """Returns a function with the signature *hydrate(doc, kwargs)* that sets
+    every field in *descriptors* from *kwargs* the same way *set_field_attr*
+    does. *namespace* must provide *set_field_attr*.
+
+    """
+    namespace = dict(namespace, MutableSequence=collections.MutableSequence)
+    lines = ["def hydrate(doc, kwargs):", "    get = kwargs.get"]
+
+    for i, (attr, field) in enumerate(descriptors.items()):
+        descriptor = "field_%d" % i
+        namespace[descriptor] = field
+        kind = field.kind
+
+        if GENERIC == kind:
+            lines.append(
+                "    set_field_attr(doc, %r, get(%r))" % (attr, attr))
+            continue
+
+        lines.append("    value = get(%r)" % attr)
+
+        if LIST == kind:
+            lines.extend([
+                "    if value is not None:",
+                "        if not isinstance(value, MutableSequence):",
+                "            raise ValueError("
+                "'ListField value must be a sequence.')",
+                "        %s.extend_raw(value)" % _get(attr),
+                "    else:",
+                "        " + _set(attr, "%s.default" % descriptor)
+            ])
+            continue
+
+        lines.extend([
+            "    if value is None:",
+            "        value = %s.default" % descriptor
+        ])
+
+        if EMBEDDED == kind:
+            lines.extend([
+                "    if isinstance(value, dict):",
+                "        value = %s.doc_class(**value)" % descriptor
+            ])
+
+        lines.append("    " + _set(attr, "value"))
+
+    return compile_function("hydrate", lines, namespace)
+
+
+def _dump_value(value, attr, field, descriptor, indent):
+    """Returns the lines that assign the dumped value of the field *attr*,
+    whose descriptor is bound to the name *descriptor*, to the variable
+    *value*.
+
+    """
+    kind = field.kind
+
+    if SCALAR == kind:
+        lines = ["%s = %s" % (value, _get(attr))]
+    elif EMBEDDED == kind:
+        lines = [
+            "%s = %s" % (value, _get(attr)),
+            "if isinstance(%s, BaseDocument):" % value,
+            "    %s = %s.field_values" % (value, value)
+        ]
+    elif LIST == kind:
+        lines = ["%s = %s.field_values or None" % (value, _get(attr))]
+    elif REFERENCE == kind:
+        lines = ["%s = %s.get_id(doc)" % (value, descriptor)]
+    else:
+        lines = ["%s = get_field_attr(doc, %r)" % (value, attr)]
+
+    return [indent + line for line in lines]
+
+
+def _build_dump(name, descriptors, key, namespace):
+    namespace = dict(namespace)
+    lines = ["def %s(doc):" % name]
+    items = []
+
+    for i, (attr, field) in enumerate(descriptors.items()):
+        value = "value_%d" % i
+        descriptor = "field_%d" % i
+        namespace[descriptor] = field
+        lines.extend(_dump_value(value, attr, field, descriptor, "    "))
+        items.append("%r: %s" % (key(attr, field), value))
+
+    lines.append("    return {%s}" % ", ".join(items))
+    return compile_function(name, lines, namespace)
+
+
+def build_field_values_for(descriptors, namespace):
+    """Returns a function with the signature *field_values_for(doc, fields)*
+    that builds the same dictionary as *field_values*, but only for the
+    attribute names in the set *fields*, without reading any other field.
+
+    """
+    namespace = dict(namespace)
+    lines = ["def field_values_for(doc, fields):", "    values = {}"]
+
+    for i, (attr, field) in enumerate(descriptors.items()):
+        descriptor = "field_%d" % i
+        namespace[descriptor] = field
+        lines.append("    if %r in fields:" % attr)
+        lines.extend(
+            _dump_value("value", attr, field, descriptor, "        "))
+        lines.append("        values[%r] = value" % attr)
+
+    lines.append("    return values")
+    return compile_function("field_values_for", lines, namespace)
+
+
+def build_field_values(descriptors, namespace):
+    """Returns a function with the signature *field_values(doc)* that builds
+    the same dictionary as calling *get_field_attr* for every field.
+    *namespace* must provide *BaseDocument* and *get_field_attr*.
+
+    """
+    return _build_dump(
+        "field_values", descriptors, lambda attr, field: attr, namespace)
+
+
+def build_mongo_field_values(descriptors, namespace):
+    """Same as *build_field_values* except that the dictionary built by the
+    returned function is keyed by the Mongo field names.
+
+    """
+    return _build_dump(
+        "mongo_field_values", descriptors, lambda attr, field: field.name,
+        namespace
+    )
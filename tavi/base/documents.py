@@ -1,13 +1,54 @@
 # -*- coding: utf-8 -*-
 """Provides base document support."""
 import collections
+import contextlib
 import logging
-from bson.json_util import dumps, loads
-from tavi.errors import Errors
+import threading
+from bson import BSON, json_util
+from tavi.errors import BatchErrors, Errors, TaviError
+from tavi.base import codegen
 from tavi.base.fields import BaseField
+from tavi.utils import dump_json
 
 logger = logging.getLogger(__name__)
 
+try:
+    from bson import decode as decode_bson
+except ImportError:  # pymongo < 3.9
+    def decode_bson(data):
+        return BSON(data).decode()
+
+VALIDATION_MODES = frozenset(["immediate", "deferred"])
+
+_context = threading.local()
+
+
+def _check_validation_mode(mode):
+    if mode not in VALIDATION_MODES:
+        raise TaviError(
+            "unknown validation mode '%s' (expected one of %s)" %
+            (mode, ", ".join(sorted(VALIDATION_MODES)))
+        )
+
+
+@contextlib.contextmanager
+def validation(mode):
+    """Context manager that sets the validation *mode* of all documents
+    created within it, regardless of their class's *__validation__*.
+
+    For example::
+        with validation("deferred"):
+            orders = [Order(**record) for record in records]
+
+    """
+    _check_validation_mode(mode)
+    previous = getattr(_context, "validation", None)
+    _context.validation = mode
+    try:
+        yield
+    finally:
+        _context.validation = previous
+
 
 def get_field_attr(cls, field):
     """Custom function for retrieving a tavi.field attribute. Handles nested
@@ -17,6 +58,8 @@ def get_field_attr(cls, field):
     value = getattr(cls, field)
     if isinstance(value, BaseDocument):
         value = value.field_values
+    elif hasattr(value, "extend_raw"):
+        value = value.field_values
     elif (isinstance(value, collections.MutableSequence) and
             len(value) and isinstance(value[0], BaseDocument)):
         value = [v.field_values for v in value]
@@ -33,8 +76,7 @@ def set_field_attr(cls, field, value):
         if not isinstance(value, collections.MutableSequence):
             raise ValueError('ListField value must be a sequence.')
 
-        for item in value:
-            getattr(cls, field).append(field_descriptor._type(**item))
+        getattr(cls, field).extend_raw(value)
         return
 
     if value is None:
@@ -48,11 +90,13 @@ def set_field_attr(cls, field, value):
 
 class BaseDocumentMetaClass(type):
     """MetaClass for BaseDocuments. Handles initializing the list of fields for
-    the BaseDocument.
+    the BaseDocument and generating the functions used to hydrate and dump its
+    field values.
 
     """
     def __init__(cls, name, bases, attrs):
         super(BaseDocumentMetaClass, cls).__init__(name, bases, attrs)
+        _check_validation_mode(cls.__validation__)
 
         sorted_fields = sorted(
             [field for field in attrs.iteritems()
@@ -61,22 +105,128 @@ class BaseDocumentMetaClass(type):
         )
 
         cls._field_descriptors = collections.OrderedDict(sorted_fields)
+        cls._field_names = frozenset(cls._field_descriptors)
+        cls._attribute_names = {
+            v.name: k for k, v in cls._field_descriptors.items()}
+        cls._hydrate = codegen.build_hydrate(
+            cls._field_descriptors, globals())
+        cls._dump_field_values = codegen.build_field_values(
+            cls._field_descriptors, globals())
+        cls._dump_mongo_field_values = codegen.build_mongo_field_values(
+            cls._field_descriptors, globals())
+        cls._dump_field_values_for = codegen.build_field_values_for(
+            cls._field_descriptors, globals())
 
 
 class BaseDocument(object):
-    """Base class for Mongo Documents. Provides basic field support."""
+    """Base class for Mongo Documents. Provides basic field support.
+
+    By default every field is validated each time it is assigned. Setting
+    *__validation__* to "deferred" on a subclass, or creating documents within
+    a *validation("deferred")* block, only records which fields were assigned
+    and validates them once when *valid* is checked, e.g. when the document is
+    saved. The resulting errors are the same, but they are not available until
+    then.
+
+    """
     __metaclass__ = BaseDocumentMetaClass
+    __validation__ = "immediate"
+
+    _pending = frozenset()
+    _unvalidated = None
 
     def __init__(self, **kwargs):
         self._errors = Errors()
-        for field in self.fields:
-            set_field_attr(self, field, kwargs.get(field))
+        self._unvalidated = self._new_unvalidated()
+        self._hydrate(kwargs)
         for k, v in kwargs.iteritems():
-            if k not in self.fields:
+            if k not in self._field_names:
                 msg = "Ignoring unknown field for %s: %s = '%s'"
                 logger.debug(msg, self.__class__.__name__, repr(k), repr(v))
         self.changed_fields = set()
 
+    @classmethod
+    def from_raw(cls, raw):
+        """Creates a Document from *raw*, a mapping of Mongo field names to
+        values such as a bson.raw_bson.RawBSONDocument, without hydrating any
+        of its fields. Each field is decoded and validated the first time it
+        is accessed.
+
+        Raw BSON is decoded in one pass, using pymongo's C extension when it is
+        available, the first time any field is accessed.
+
+        """
+        doc = cls.__new__(cls)
+        doc._errors = Errors()
+        doc._unvalidated = cls._new_unvalidated()
+        doc._raw = raw
+        doc._decoded = None
+        doc._pending = set(cls._attribute_names)
+        doc.changed_fields = set()
+        return doc
+
+    @classmethod
+    def validate_many(cls, rows):
+        """Validates *rows*, dictionaries of field values as would be given to
+        the constructor, one field at a time without creating a Document for
+        each row. Returns a tavi.errors.BatchErrors holding the field errors
+        of each invalid row, the same errors the Documents would have.
+
+        Embedded and list fields, which are not validated when assigned, are
+        not checked. Range checks of number fields are vectorized if NumPy is
+        installed.
+
+        If the class overrides *__validate__*, or any of its fields overrides
+        *validate*, each row is instead validated on its own by a Document
+        built from it, as those checks expect the Document itself. This is
+        as slow as creating the Documents, but gives the same errors.
+
+        For example::
+            report = Order.validate_many(rows)
+            for row in report.rows:
+                print(row, report.full_messages_for(row))
+
+        """
+        if not isinstance(rows, collections.Sequence):
+            rows = list(rows)
+
+        errors = BatchErrors()
+        if cls._validates_rows():
+            for row, values in enumerate(rows):
+                errors.row = row
+                # Skips the subclass constructor, e.g. Document's, which
+                # may talk to Mongo.
+                document = cls.__new__(cls)
+                BaseDocument.__init__(document, **values)
+                document.valid
+                for field, messages in document.errors.items():
+                    for msg in messages:
+                        errors.add(field, msg)
+            return errors
+
+        for attr, field in cls._field_descriptors.items():
+            if field.kind in (codegen.EMBEDDED, codegen.LIST):
+                continue
+            prepare = field.prepare
+            field.validate_column(
+                errors, [prepare(row.get(attr)) for row in rows])
+        return errors
+
+    @classmethod
+    def _validates_rows(cls):
+        """Indicates if *validate_many* must validate each row with a
+        Document, since the class or one of its fields has checks that
+        cannot be run on a column of values.
+
+        """
+        if cls.__validate__.im_func is not BaseDocument.__validate__.im_func:
+            return True
+        return any(
+            type(field).validate.im_func is not BaseField.validate.im_func
+            for field in cls._field_descriptors.values()
+            if field.kind not in (codegen.EMBEDDED, codegen.LIST)
+        )
+
     @property
     def fields(self):
         """Returns the list of fields for the Document."""
@@ -85,7 +235,7 @@ class BaseDocument(object):
     @property
     def field_values(self):
         """Returns a dictionary containing all fields and their values."""
-        return {field: get_field_attr(self, field) for field in self.fields}
+        return self._dump_field_values()
 
     @property
     def mongo_field_values(self):
@@ -94,10 +244,7 @@ class BaseDocument(object):
         field name persisted in Mongo.
 
         """
-        return {
-            v.name: get_field_attr(self, k)
-            for k, v in self._field_descriptors.items()
-        }
+        return self._dump_mongo_field_values()
 
     @property
     def errors(self):
@@ -110,6 +257,10 @@ class BaseDocument(object):
     @property
     def valid(self):
         """Indicates if all the fields in the Document are valid."""
+        if self._pending:
+            self._load_pending_fields()
+        if self._unvalidated:
+            self._validate_deferred_fields()
         self.__validate__()
         return 0 == self.errors.count
 
@@ -117,30 +268,76 @@ class BaseDocument(object):
         """Convert Document model object to JSON. Optionally, specify which
         fields should be serialized.
 
+        Only the requested fields are read. The output is the same as
+        bson.json_util.dumps.
+
         """
         include_bson_id = True
 
         if fields:
-            if "bson_id" not in fields:
-                include_bson_id = False
-            else:
-                fields.remove("bson_id")
+            fields = set(fields)
+            include_bson_id = "bson_id" in fields
+            fields.discard("bson_id")
+
+            unknown = fields - self._field_names
+            if unknown:
+                raise KeyError(unknown.pop())
 
-            field_map = {field: self.field_values[field] for field in fields}
+            field_map = self._dump_field_values_for(fields)
         else:
             field_map = self.field_values
 
         if include_bson_id:
             field_map["id"] = self.bson_id
 
-        return dumps(field_map)
+        return dump_json(field_map)
 
     @classmethod
     def from_json(cls, json_str):
         """Deserialize a JSON string into a Document model object."""
-        attrs = loads(json_str)
+        attrs = json_util.loads(json_str)
         return cls(**attrs)
 
+    def raw_value(self, name):
+        """Returns the value of the Mongo field *name* from the raw document
+        this Document was created from by *from_raw*.
+
+        """
+        if self._decoded is None:
+            raw = getattr(self._raw, "raw", None)
+            self._decoded = self._raw if raw is None else decode_bson(raw)
+        return self._decoded.get(name)
+
+    def _load_pending_fields(self):
+        """Decodes all fields that have not been accessed yet on a Document
+        created by *from_raw*.
+
+        """
+        for field in self._field_descriptors.values():
+            if field.is_pending(self):
+                field.load_pending(self)
+
+    @classmethod
+    def _new_unvalidated(cls):
+        """Returns the set used to record assigned fields for documents that
+        defer validation, or None if fields are validated when assigned.
+
+        """
+        mode = getattr(_context, "validation", None) or cls.__validation__
+        return set() if "deferred" == mode else None
+
+    def _validate_deferred_fields(self):
+        """Validates the fields that have been assigned since they were last
+        validated on a Document that defers validation.
+
+        """
+        if not self._unvalidated:
+            return
+        fields = sorted(self._unvalidated, key=lambda f: f.creation_order)
+        self._unvalidated = set()
+        for field in fields:
+            field.validate(self, getattr(self, field.attribute_name))
+
     def __validate__(self):
         """Override for model level validations. This method will be called by
         the #valid property.
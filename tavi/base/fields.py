@@ -15,9 +15,18 @@ class BaseField(object):
     persist   -- boolean indicating if field should be persisted to Mongo;
                  default is True
 
+    Subclasses may set *kind* to tell the document metaclass how their values
+    are hydrated and dumped: "scalar" values are used as-is, "embedded" values
+    are tavi.documents.EmbeddedDocuments, "list" values are
+    tavi.EmbeddedLists and "reference" fields are dumped by their *get_id*
+    method. "generic" fields go through *get_field_attr* and
+    *set_field_attr*.
+
     """
 
     _creation_counter = 0
+    _validators = None
+    kind = "generic"
 
     def __init__(
         self, name,
@@ -34,29 +43,177 @@ class BaseField(object):
         BaseField._creation_counter += 1
 
     def __get__(self, instance, owner):
-        if self.attribute_name not in instance.__dict__ and self.default:
-            self.__set__(instance, self.default)
+        if self.attribute_name not in instance.__dict__:
+            if self.is_pending(instance):
+                self.load_pending(instance)
+            elif self.default:
+                self.__set__(instance, self.default)
         return getattr(instance, self.attribute_name)
 
     def __set__(self, instance, value):
+        if self.is_pending(instance):
+            instance._pending.discard(self.name)
+
+        value = self.convert(value)
         if value is None and self.required and self.default:
             value = self.default
-        self.validate(instance, value)
+        unvalidated = getattr(instance, "_unvalidated", None)
+        if unvalidated is None:
+            self.validate(instance, value)
+        else:
+            unvalidated.add(self)
         setattr(instance, self.attribute_name, value)
         if hasattr(instance, "changed_fields"):
             instance.changed_fields.add(self.name)
 
+    def convert(self, value):
+        """Returns *value* as it is stored when assigned to the field.
+        Subclasses that normalize their values should override this.
+
+        """
+        return value
+
+    def prepare(self, value):
+        """Returns *value*, as given to a Document's constructor, as it would
+        be stored and validated by the field.
+
+        """
+        if value is None:
+            value = self.default
+        value = self.convert(value)
+        if value is None and self.required and self.default:
+            value = self.default
+        return value
+
+    def is_pending(self, instance):
+        """Indicates if *instance* was loaded lazily and this field has not
+        been decoded from its raw document yet.
+
+        """
+        return self.name in getattr(instance, "_pending", ())
+
+    def load_pending(self, instance):
+        """Decodes the field from the raw document *instance* was loaded from.
+        Loading a field does not mark it as changed.
+
+        """
+        instance._pending.discard(self.name)
+        changed = self.name in instance.changed_fields
+        self.load_raw(instance, instance.raw_value(self.name))
+        if not changed:
+            instance.changed_fields.discard(self.name)
+
+    def load_raw(self, instance, value):
+        """Sets the field on *instance* from *value* as read from a raw
+        document. Subclasses that hold documents should override this in order
+        to load them lazily.
+
+        """
+        if value is None:
+            value = self.default
+        self.__set__(instance, value)
+
+    def mark_saved(self, instance):
+        """Called after *instance* has been loaded from, or saved to, Mongo.
+        Fields that track their changes should override this.
+
+        """
+        pass
+
+    def update_operations(self, instance):
+        """Returns a dictionary of Mongo update operations that persist the
+        changes made to the field on *instance* since it was last saved, or
+        None if the field should be persisted by setting its whole value.
+
+        """
+        return None
+
+    def validate_increment(self, instance, amount):
+        """Validates *amount* as the operand of an atomic $inc of the field.
+        Returns a query condition on the field that only matches documents for
+        which the incremented value is still valid, or None.
+
+        Fields that can be incremented should override this.
+
+        """
+        instance.errors.add(self.name, "cannot be incremented")
+
     def validate(self, instance, value):
-        """Validates the field.
+        """Validates the field by running the checks returned by
+        *build_validators*, which are built the first time the field is
+        validated.
 
-        Subclasses should call *super* and implement their own validation.
-        Assumes that *obj* has an *errors* attribute that acts like a
-        tavi.errors.Errors class.
+        Subclasses should call *super* and implement their own validation, or
+        extend *build_validators*. Assumes that *obj* has an *errors* attribute
+        that acts like a tavi.errors.Errors class.
 
         """
         instance.errors.clear(self.name)
-        if self.required and value is None:
+        validators = self._validators
+        if validators is None:
+            validators = self._validators = self.build_validators()
+        for check in validators:
+            check(instance, value)
+
+    @property
+    def validators(self):
+        """Returns the checks built by *build_validators*."""
+        if self._validators is None:
+            self._validators = self.build_validators()
+        return self._validators
+
+    def validate_column(self, errors, values):
+        """Validates *values*, the prepared values of the field for a batch of
+        rows, adding any errors to *errors*, a tavi.errors.BatchErrors. Checks
+        that have a *column_check* attribute are run once for the whole batch
+        using it, the others once for each row.
+
+        """
+        for check in self.validators:
+            column_check = getattr(check, "column_check", None)
+            if column_check is not None:
+                column_check(errors, values)
+                continue
+            for row, value in enumerate(values):
+                errors.row = row
+                check(errors, value)
+
+    def build_validators(self):
+        """Returns a list of the checks for the constraints configured on the
+        field. Each check is called with the document instance and the value
+        and adds any errors to the instance.
+
+        Subclasses should call *super* and append checks for their own
+        constraints, leaving out those that are not configured.
+
+        """
+        validators = []
+        if self.required:
+            validators.append(self._check_required)
+        if self.choices:
+            validators.append(_choices_check(self.name, self.choices))
+        return validators
+
+    def _check_required(self, instance, value):
+        if value is None:
             instance.errors.add(self.name, "is required")
 
-        if self.choices and value not in self.choices:
-            instance.errors.add(self.name, "value must be in list")
+
+def _choices_check(name, choices):
+    """Returns a check that *value* is a member of *choices*, using a set if
+    all of them are hashable.
+
+    """
+    try:
+        choices = frozenset(choices)
+    except TypeError:
+        pass
+
+    def check(instance, value):
+        try:
+            valid = value in choices
+        except TypeError:  # unhashable value
+            valid = value in list(choices)
+        if not valid:
+            instance.errors.add(name, "value must be in list")
+    return check
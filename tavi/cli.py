@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Command line interface for exporting and importing Mongo collections.
+
+For example::
+    tavi export my_database orders --query '{"status": "shipped"}' \\
+        --fields name,email --output orders.ndjson
+
+    tavi import my_database orders --input orders.ndjson --workers 4 \\
+        --rejects rejects.ndjson
+
+"""
+import argparse
+import contextlib
+import sys
+from bson import json_util
+from tavi import Connection, ndjson
+
+
+def export(args):
+    """Streams a collection to a file, or to stdout, as NDJSON."""
+    spec = json_util.loads(args.query) if args.query else None
+    projection = None
+    if args.fields:
+        projection = {field: True for field in args.fields.split(",")}
+
+    collection = Connection.database[args.collection]
+    if args.output:
+        with open(args.output, "w") as fileobj:
+            return ndjson.export(
+                collection, fileobj, spec, projection, args.batch_size)
+    return ndjson.export(
+        collection, sys.stdout, spec, projection, args.batch_size)
+
+
+def load(args):
+    """Imports a file, or stdin, of NDJSON into a collection, reporting the
+    progress to stderr.
+
+    """
+    def progress(report):
+        sys.stderr.write("\r%s" % _describe(report))
+
+    collection = Connection.database[args.collection]
+    with _open(args.input, "r", sys.stdin) as fileobj, \
+            _open(args.rejects, "w", None) as rejects:
+        if args.processes:
+            report = ndjson.load_parallel(
+                args.collection, fileobj, args.processes,
+                batch_size=args.batch_size, upsert=args.upsert,
+                rejects=rejects, progress=progress
+            )
+        else:
+            report = ndjson.load(
+                collection, fileobj, batch_size=args.batch_size,
+                workers=args.workers, upsert=args.upsert, rejects=rejects,
+                progress=progress
+            )
+    sys.stderr.write("\r%s in %.1fs\n" % (_describe(report), report.elapsed))
+    return report
+
+
+def _describe(report):
+    return "%d read, %d written, %d rejected (%.0f documents/s)" % (
+        report.read, report.written, report.rejected, report.rate)
+
+
+@contextlib.contextmanager
+def _open(path, mode, default):
+    if path is None:
+        yield default
+    else:
+        with open(path, mode) as fileobj:
+            yield fileobj
+
+
+def parser():
+    """Returns the argument parser for the command line interface."""
+    root = argparse.ArgumentParser(prog="tavi")
+    root.add_argument(
+        "--host", default="localhost",
+        help="MongoDB host or connection URI (default: localhost)")
+    commands = root.add_subparsers(title="commands")
+
+    command = commands.add_parser(
+        "export", help="export a collection as newline delimited JSON")
+    command.add_argument("database")
+    command.add_argument("collection")
+    command.add_argument(
+        "--query", help="extended JSON query selecting the documents")
+    command.add_argument(
+        "--fields", help="comma separated list of the fields to export")
+    command.add_argument(
+        "--output", help="file to write to (default: stdout)")
+    command.add_argument(
+        "--batch-size", type=int, default=ndjson.DEFAULT_BATCH_SIZE,
+        help="number of documents fetched at a time")
+    command.set_defaults(func=export)
+
+    command = commands.add_parser(
+        "import", help="import newline delimited JSON into a collection")
+    command.add_argument("database")
+    command.add_argument("collection")
+    command.add_argument(
+        "--input", help="file to read from (default: stdin)")
+    command.add_argument(
+        "--rejects", help="file to write rejected lines and their errors to")
+    command.add_argument(
+        "--batch-size", type=int, default=ndjson.DEFAULT_BATCH_SIZE,
+        help="number of documents written at a time")
+    command.add_argument(
+        "--workers", type=int, default=1,
+        help="number of batches written at the same time")
+    command.add_argument(
+        "--processes", type=int,
+        help="number of worker processes that parse and write batches")
+    command.add_argument(
+        "--upsert", action="store_true",
+        help="replace stored documents that have the same _id")
+    command.set_defaults(func=load)
+
+    return root
+
+
+def main(argv=None):
+    """Runs the command given in *argv*, or the process's arguments."""
+    args = parser().parse_args(argv)
+    Connection.setup(args.database, host=args.host)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
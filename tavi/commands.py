@@ -1,41 +1,129 @@
 # -*- coding: utf-8 -*-
-import collections
+import copy
 import datetime
-import tavi.documents
+from bson.objectid import ObjectId
+
+TIMESTAMP_FIELDS = ("created_at", "last_modified_at")
+
+
+def timestamp_targets(descriptors, name):
+    """Returns the fields, out of the field *descriptors* of a Document, that
+    hold the timestamp *name* as a list of (attribute name, kind) pairs.
+    *kind* is "own" for the Document's own field, or "embedded" or "list"
+    for embedded fields and list fields whose documents have the field.
+
+    """
+    targets = []
+    for attr, field in descriptors.items():
+        if name == attr:
+            targets.append((attr, "own"))
+        elif "embedded" == field.kind:
+            if name in field.doc_class._field_descriptors:
+                targets.append((attr, "embedded"))
+        elif "list" == field.kind:
+            if name in field._type._field_descriptors:
+                targets.append((attr, "list"))
+    return targets
+
+
+def write(collection, operation, kwargs):
+    """Performs the write *operation*, as returned by
+    *MongoCommand.write_operation*, on *collection*. Updates are upserts.
+    *kwargs* are passed to pymongo. Returns pymongo's result.
+
+    """
+    if "insert" == operation[0]:
+        return collection.insert(operation[1], **kwargs)
+    return collection.update(
+        operation[1], operation[2], upsert=True, **kwargs)
 
 
 class MongoCommand(object):
     def __init__(self, target, **kwargs):
         self.target = target
         self.kwargs = kwargs
+        self.current_date = {}
 
     @property
     def name(self):
         raise "Not Implemented"
 
+    def has_changes(self):
+        """Indicates if executing the command would change anything."""
+        return True
+
     def execute(self):
+        """Stamps the target's timestamps and writes it to Mongo."""
+        self.stamp()
+        write(
+            self.target.__class__.collection,
+            self.write_operation(),
+            self.kwargs
+        )
+
+    def queue(self, buffer):
+        """Stamps the target's timestamps and queues its write on *buffer*, a
+        tavi.writebehind.WriteBehind, instead of writing it. The write is
+        copied, since it refers to the target's arrays and embedded
+        documents, which may change before it is written.
+
+        """
+        self.stamp()
+        buffer.put(copy.deepcopy(self.write_operation()))
+
+    def stamp(self):
+        """Sets the timestamps of the target and its embedded documents."""
         self._now = datetime.datetime.utcnow()
         if hasattr(self.target, "last_modified_at"):
             self.old_last_modified_at = self.target.last_modified_at
 
         self._update_field("last_modified_at", self._now)
 
+    def write_operation(self):
+        """Returns the write that persists the target, either
+        ("insert", document) or ("update", spec, document).
+
+        """
+        raise NotImplementedError
+
     def reset_fields(self):
         if hasattr(self.target, "last_modified_at"):
             self._update_field("last_modified_at", self.old_last_modified_at)
 
     def _update_field(self, name, timestamp):
-        for field in self.target.fields:
-            value = getattr(self.target, field)
-            if name == field:
-                setattr(self.target, name, timestamp)
-            elif isinstance(value, collections.Iterable):
-                for item in value:
-                    if isinstance(item, tavi.documents.EmbeddedDocument):
-                        setattr(item, name, timestamp)
-            elif isinstance(value, tavi.documents.EmbeddedDocument):
-                if hasattr(value, name):
+        """Sets the timestamp *name* on the target and its embedded documents
+        using the fields found by the metaclass. With server timestamps, the
+        target's own field is added to *current_date* instead.
+
+        """
+        for attr, kind in self.target._timestamp_targets[name]:
+            if "embedded" == kind:
+                value = getattr(self.target, attr)
+                if value is not None:
                     setattr(value, name, timestamp)
+            elif "list" == kind:
+                # Only items that are written anyway are stamped, so that
+                # stamping does not turn a $push into a $set of every item.
+                for item in getattr(self.target, attr).changed():
+                    setattr(item, name, timestamp)
+            elif self.target.__server_timestamps__:
+                field = self.target._field_descriptors[attr]
+                self.current_date[field.name] = True
+            else:
+                setattr(self.target, attr, timestamp)
+
+    def _server_timestamp_names(self):
+        """Returns the Mongo names of the target's own timestamp fields, which
+        are never sent by the client when they are stamped by the server.
+
+        """
+        descriptors = self.target._field_descriptors
+        return [
+            descriptors[attr].name
+            for name in TIMESTAMP_FIELDS
+            for attr, kind in self.target._timestamp_targets[name]
+            if "own" == kind
+        ]
 
 
 class Insert(MongoCommand):
@@ -43,19 +131,41 @@ class Insert(MongoCommand):
     def name(self):
         return "INSERT"
 
-    def execute(self):
-        super(Insert, self).execute()
+    def stamp(self):
+        super(Insert, self).stamp()
         if hasattr(self.target, "created_at"):
             self.old_created_at = self.target.created_at
 
         self._update_field("created_at", self._now)
 
-        collection = self.target.__class__.collection
+    def write_operation(self):
+        """Returns the insert of the target with a new _id, which is assigned
+        to the target.
+
+        """
         values = self.target.mongo_field_values
-        self.target._id = collection.insert(values, **self.kwargs)
+        _id = ObjectId()
+
+        if self.current_date:
+            # $currentDate is only supported by updates, so the Document is
+            # inserted by upserting it with the new _id.
+            for name in self._server_timestamp_names():
+                values.pop(name, None)
+
+            document = {"$currentDate": self.current_date}
+            if values:
+                document["$set"] = values
+            operation = ("update", {"_id": _id}, document)
+        else:
+            values["_id"] = _id
+            operation = ("insert", values)
+
+        self.target._id = _id
+        return operation
 
     def reset_fields(self):
         super(Insert, self).reset_fields()
+        self.target._id = None
         if hasattr(self.target, "created_at"):
             self._update_field("created_at", self.old_created_at)
 
@@ -65,10 +175,98 @@ class Update(MongoCommand):
     def name(self):
         return "UPDATE"
 
-    def execute(self):
-        super(Update, self).execute()
-        self.kwargs["upsert"] = True
-        self.target.__class__.collection.update(
-            {"_id": self.target._id},
-            {"$set": self.target.mongo_field_values},
-            **self.kwargs)
+    def write_operation(self):
+        return ("update", {"_id": self.target._id}, self._update_document())
+
+    def has_changes(self):
+        return bool(self._update_document())
+
+    def _update_document(self):
+        """Builds the update document. Fields that track their changes, such
+        as lists and arrays, contribute their own update operations; all other
+        fields are $set if they changed since the target was loaded or saved.
+        Timestamps stamped by the server are set with $currentDate.
+
+        """
+        values = self.target.mongo_field_values
+        document = {}
+
+        for field in self.target._field_descriptors.values():
+            operations = field.update_operations(self.target)
+            if operations is None:
+                continue
+
+            del values[field.name]
+            for operator, spec in operations.items():
+                document.setdefault(operator, {}).update(spec)
+
+        values = self.target.changed_values(values)
+
+        if self.target.__server_timestamps__:
+            for name in self._server_timestamp_names():
+                values.pop(name, None)
+            if self.current_date:
+                document["$currentDate"] = self.current_date
+
+        if values:
+            document.setdefault("$set", {}).update(values)
+
+        return document
+
+
+class Upsert(MongoCommand):
+    """Upserts the target on the values of its *keys* fields, writing only
+    the fields in *fields*. Both are lists of attribute names. The target's
+    own created_at is only written when the upsert inserts.
+
+    """
+    def __init__(self, target, keys, fields, **kwargs):
+        super(Upsert, self).__init__(target, **kwargs)
+        self.keys = keys
+        self.fields = fields
+
+    @property
+    def name(self):
+        return "UPSERT"
+
+    def stamp(self):
+        super(Upsert, self).stamp()
+        # $currentDate cannot be limited to inserts, so created_at is always
+        # taken from the client's clock.
+        for attr in self._own_targets("created_at"):
+            setattr(self.target, attr, self._now)
+
+    def write_operation(self):
+        descriptors = self.target._field_descriptors
+        created = self._own_targets("created_at")
+
+        fields = set(self.keys).union(self.fields, created)
+        if not self.current_date:
+            fields.update(self._own_targets("last_modified_at"))
+
+        values = self.target._dump_field_values_for(fields)
+        spec = {descriptors[attr].name: values.pop(attr) for attr in self.keys}
+
+        document = {}
+        if created:
+            document["$setOnInsert"] = {
+                descriptors[attr].name: values.pop(attr) for attr in created
+            }
+        if values:
+            document["$set"] = {
+                descriptors[attr].name: value
+                for attr, value in values.items()
+            }
+        if self.current_date:
+            document["$currentDate"] = self.current_date
+        if not document:
+            # An empty update document would replace the stored document.
+            document["$setOnInsert"] = dict(spec)
+
+        return ("update", spec, document)
+
+    def _own_targets(self, name):
+        return [
+            attr for attr, kind in self.target._timestamp_targets[name]
+            if "own" == kind
+        ]
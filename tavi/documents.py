@@ -1,18 +1,81 @@
 # -*- coding: utf-8 -*-
 """Provides support for dealing with Mongo Documents."""
+from bson import BSON, json_util
 from bson.objectid import ObjectId
-from tavi import Connection
+from tavi import (
+    Connection, EmbeddedList, aggregation, ndjson, pagination, pull_operation,
+    scan, writebehind
+)
 from tavi.base.documents import BaseDocument, BaseDocumentMetaClass
-from tavi.commands import Insert, Update
-from tavi.errors import TaviConnectionError
+from tavi.commands import (
+    TIMESTAMP_FIELDS, Insert, Update, Upsert, timestamp_targets, write
+)
+from tavi.errors import TaviConnectionError, TaviError, TaviValidationError
+from tavi.utils.cache import ExpiringCache
 from tavi.utils.timer import Timer
+import datetime
 import inflection
 import logging
 import pymongo
 import re
+import threading
+
+try:
+    from bson.codec_options import CodecOptions
+    from bson.raw_bson import RawBSONDocument
+except ImportError:  # pymongo < 3.2
+    RawBSONDocument = None
 
 logger = logging.getLogger(__name__)
 
+_count_cache = ExpiringCache()
+_write_behind_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def _fingerprint(value):
+    """Returns a value that compares equal to the fingerprint of any value
+    that Mongo would store the same way as *value*. Dictionaries keep a
+    fingerprint per key so that changes can be found field by field; lists
+    are encoded as BSON.
+
+    """
+    if isinstance(value, dict):
+        return {k: _fingerprint(v) for k, v in value.iteritems()}
+    if isinstance(value, list):
+        return BSON.encode({"": value})
+    return value
+
+
+def _diff(path, value, saved, changed):
+    """Adds *path*, and *value*, to the dictionary *changed* if *value* does
+    not match the fingerprint *saved*. Changed sub-documents are compared
+    key by key, so that only the keys that changed are added, as dotted
+    paths.
+
+    """
+    if saved is not _MISSING:
+        if isinstance(value, dict) and isinstance(saved, dict):
+            for k, v in value.iteritems():
+                _diff("%s.%s" % (path, k), v, saved.get(k), changed)
+            return
+        if _fingerprint(value) == saved:
+            return
+    changed[path] = value
+
+
+def _exact_count(collection, spec):
+    if hasattr(collection, "count_documents"):  # pymongo >= 3.7
+        return collection.count_documents(spec or {})
+    return collection.find(spec).count()
+
+
+def _estimated_count(collection):
+    if hasattr(collection, "estimated_document_count"):  # pymongo >= 3.7
+        return collection.estimated_document_count()
+    return collection.count()
+
 
 class DocumentMetaClass(BaseDocumentMetaClass):
     """MetaClass for Documents. Sets up the database connection, infers the
@@ -25,6 +88,10 @@ class DocumentMetaClass(BaseDocumentMetaClass):
         super(DocumentMetaClass, cls).__init__(name, bases, attrs)
         cls._collection_name = inflection.underscore(
             inflection.pluralize(name))
+        cls._timestamp_targets = {
+            field: timestamp_targets(cls._field_descriptors, field)
+            for field in TIMESTAMP_FIELDS
+        }
 
     @property
     def collection(cls):
@@ -40,6 +107,60 @@ class DocumentMetaClass(BaseDocumentMetaClass):
         """Returns the name of the Document collection."""
         return cls._collection_name
 
+    @property
+    def raw_collection(cls):
+        """Returns a handle to the Document collection that returns results as
+        bson.raw_bson.RawBSONDocuments. Falls back to the regular collection
+        if the installed pymongo does not support raw BSON documents.
+
+        """
+        if RawBSONDocument is None:
+            return cls.collection
+        return cls.collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument))
+
+
+class ResultList(list):
+    """The list of Documents returned by *find*."""
+
+    def prefetch(self, *fields):
+        """Fetches the Documents referenced by the tavi.fields.ReferenceFields
+        *fields* of every Document in the list, so that reading them does not
+        query Mongo once per Document. Referenced Documents of the same class
+        are fetched with a single $in query. Returns the list.
+
+        For example::
+            for order in Order.find({"paid": True}).prefetch("customer"):
+                print(order.customer.email)
+
+        """
+        if not self:
+            return self
+
+        descriptors = [self[0]._field_descriptors[field] for field in fields]
+
+        ids = {}
+        for descriptor in descriptors:
+            ids.setdefault(descriptor.doc_class, set()).update(
+                descriptor.get_id(document) for document in self)
+
+        found = {}
+        for doc_class, class_ids in ids.items():
+            class_ids.discard(None)
+            if not class_ids:
+                continue
+            spec = {"_id": {"$in": list(class_ids)}}
+            for document in doc_class.find(spec):
+                found[(doc_class, document.bson_id)] = document
+
+        for descriptor in descriptors:
+            for document in self:
+                id_ = descriptor.get_id(document)
+                if id_ is not None:
+                    descriptor.set_document(
+                        document, found.get((descriptor.doc_class, id_)))
+        return self
+
 
 class Document(BaseDocument):
     """Represents a Mongo Document. Provides methods for saving and retrieving
@@ -48,6 +169,29 @@ class Document(BaseDocument):
     """
     __metaclass__ = DocumentMetaClass
 
+    __UPDATE_OPERATORS__ = {
+        "set": "$set",
+        "inc": "$inc",
+        "min": "$min",
+        "max": "$max",
+        "current_date": "$currentDate"
+    }
+
+    __COUNT_MODES__ = ("exact", "estimated", "cached")
+
+    # Set to True to have Mongo stamp created_at and last_modified_at.
+    __server_timestamps__ = False
+
+    # Set to True, or to a dictionary of tavi.writebehind.WriteBehind
+    # options, to queue saves and write them in bulk in the background.
+    __write_behind__ = None
+
+    # Set to a dictionary of write concern options, such as {"w": 0} or
+    # {"w": "majority", "wtimeout": 5000}, to use for writes of this class.
+    __write_concern__ = None
+
+    _snapshot = None
+
     __MAX_NAMESPACE_SIZE__ = 127  # bytes
     __UNIQUE_INDEX_SUFFIX__ = "_unique_index"
 
@@ -69,21 +213,386 @@ class Document(BaseDocument):
             opts = {"name": name, "unique": True}
             self.__class__.collection.create_index(key_pairs, **opts)
 
+    @classmethod
+    def from_raw(cls, raw):
+        doc = super(Document, cls).from_raw(raw)
+        doc._id = doc.raw_value("_id")
+        return doc
+
     @property
     def bson_id(self):
         """Returns the BSON Id of the Document."""
         return self._id
 
     @classmethod
-    def count(cls):
-        """Returns the total number of documents in the collection."""
-        return cls.collection.count()
+    def count(cls, spec=None, mode="exact", ttl=60):
+        """Returns the number of documents in the collection that meet
+        criteria. *mode* is one of:
+
+        * "exact" counts the matching documents.
+        * "estimated" returns the document count from the collection's
+          metadata without scanning anything. It cannot be combined with
+          criteria and may be off after an unclean shutdown or while
+          chunks are migrating.
+        * "cached" returns the exact count from an earlier call with the
+          same criteria, if it is less than *ttl* seconds old, and counts
+          otherwise.
+
+        """
+        if mode not in cls.__COUNT_MODES__:
+            raise TaviError("Unknown count mode: %r" % mode)
+
+        timer = Timer()
+        with timer:
+            if "estimated" == mode:
+                if spec:
+                    raise TaviError("Estimated counts cannot have criteria.")
+                count = _estimated_count(cls.collection)
+            elif "cached" == mode:
+                key = (cls, json_util.dumps(spec, sort_keys=True))
+                count = _count_cache.get(key, ttl)
+                if count is None:
+                    count = _exact_count(cls.collection, spec)
+                    _count_cache.set(key, count)
+            else:
+                count = _exact_count(cls.collection, spec)
+
+        logger.info(
+            "(%ss) %s COUNT %s, %s (%s record(s))",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            mode,
+            count
+        )
+
+        return count
+
+    @classmethod
+    def parallel_scan(cls, fn, spec=None, workers=4, processes=False,
+                      partitions=None, lazy=False):
+        """Calls *fn* with every Document that meets criteria, scanning the
+        collection with *workers* threads, or worker processes if *processes*
+        is True, each with its own cursor. Returns an iterator over the
+        results of *fn* that are not None, in no particular order.
+
+        The Documents are split into *partitions* ranges of _ids of about the
+        same size that are scanned as workers become free. Results are passed
+        back one range at a time, so the results of a whole range are held in
+        memory, for up to three ranges per worker. By default there are four
+        ranges per worker, or more so that each holds about
+        tavi.scan.DEFAULT_RANGE_SIZE Documents of the collection. With
+        *processes*, *fn* must be a module level function; each process
+        connects to Mongo on its own. If *lazy* is True, Documents are
+        loaded lazily as for *find*.
+
+        For example::
+            def total(order):
+                return order.total_price
+
+            revenue = sum(Order.parallel_scan(total, {"paid": True}))
+
+        """
+        if partitions is None:
+            size = _estimated_count(cls.collection)
+            partitions = max(
+                workers * 4, -(-size // scan.DEFAULT_RANGE_SIZE))
+
+        timer = Timer()
+        with timer:
+            for result in scan.parallel_scan(
+                    cls, fn, spec, workers, processes, partitions, lazy):
+                yield result
+
+        logger.info(
+            "(%ss) %s PARALLEL SCAN %s (%s workers)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            workers
+        )
+
+    @classmethod
+    def aggregate(cls, pipeline, hydrate=False, batch_size=None, **kwargs):
+        """Runs the aggregation *pipeline* on the collection and returns an
+        iterator over the results. Any other keyword arguments are passed to
+        pymongo's *aggregate*. Stages may use attribute names, which are
+        translated to the Mongo names of the fields in every stage up to
+        and including the first one that reshapes the documents, such as
+        $group. Stages may write to temporary files on the server, so large
+        results are streamed from the cursor *batch_size* at a time.
+
+        Results are raw dictionaries unless *hydrate* is given. If it is
+        True, results are loaded into instances of this class; if it is
+        another Document or EmbeddedDocument class, into instances of that
+        class; and if it is any other callable, it is called with each
+        result.
+
+        For example::
+            class Total(EmbeddedDocument):
+                status = fields.StringField("status")
+                total = fields.FloatField("total")
+
+            totals = Order.aggregate([
+                {"$match": {"paid": True}},
+                {"$group": {"_id": "$status", "total": {"$sum": "$price"}}},
+                {"$project": {"_id": 0, "status": "$_id", "total": 1}}
+            ], hydrate=Total)
+
+        """
+        pipeline = aggregation.translate(cls, pipeline)
+        build = aggregation.hydrator(cls, hydrate)
+
+        kwargs.setdefault("allowDiskUse", True)
+        if batch_size:
+            kwargs["batchSize"] = batch_size
+
+        timer = Timer()
+        with timer:
+            results = cls.collection.aggregate(pipeline, **kwargs)
+
+        logger.info(
+            "(%ss) %s AGGREGATE %s",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            pipeline
+        )
+
+        if isinstance(results, dict):  # pymongo < 3
+            results = results["result"]
+        if build is None:
+            return results
+        return (build(result) for result in results)
+
+    @classmethod
+    def paginate(cls, spec=None, sort=None, after=None, limit=20,
+                 lazy=False):
+        """Returns a tavi.pagination.Page of up to *limit* Documents that
+        meet criteria, in the order *sort*. *sort* is a list of field names,
+        or of (field name, direction) pairs, and _id is added as the last
+        key, unless it is already sorted on, so that the order is total.
+        Sort fields may be null or missing, but should otherwise hold values
+        of a single type.
+
+        The *after* token of a page is passed as *after* to fetch the next
+        page. Instead of skipping over the earlier pages, which gets slower
+        the deeper the page, the query starts right after the sort key of
+        the last Document of the previous page, so every page costs the same
+        when there is an index on the sort keys followed by _id. One extra
+        Document is fetched to tell if there is a next page, without a
+        count. If *lazy* is True, Documents are loaded lazily as for *find*.
+
+        For example::
+            page = Order.paginate({"paid": True}, sort=[("total", -1)])
+            next_page = Order.paginate(
+                {"paid": True}, sort=[("total", -1)], after=page.after)
+
+        """
+        keys = []
+        for item in sort or []:
+            if isinstance(item, basestring):
+                item = (item, 1)
+            key, direction = item
+            if "_id" != key:
+                key = cls._field_descriptors[key].name
+            keys.append((key, direction))
+        if "_id" not in [k for k, _ in keys]:
+            keys.append(("_id", 1))
+
+        collection, build = cls._finder(lazy)
+
+        timer = Timer()
+        with timer:
+            page = pagination.paginate(
+                collection, build, spec, keys, after, limit)
+
+        logger.info(
+            "(%ss) %s PAGINATE %s, %s (%s record(s) found)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            keys,
+            len(page)
+        )
+
+        return page
+
+    @classmethod
+    def scan(cls, spec=None, batch_size=scan.DEFAULT_BATCH_SIZE, key="_id",
+             checkpoint=None, lazy=False, progress=None):
+        """Returns an iterator over the Documents that meet criteria, fetched
+        *batch_size* at a time in order of *key*, which must be "_id" or an
+        indexed field present in every Document. Each batch is fetched with a
+        new query that starts after the last key of the previous batch, so
+        no cursor is kept open between batches.
+
+        If a *checkpoint*, such as a tavi.scan.FileCheckpoint or
+        tavi.scan.CollectionCheckpoint, is given, the last key of each batch
+        is saved to it once all the Documents in the batch have been
+        processed, and the scan resumes from the saved key when it is
+        restarted. The checkpoint is cleared when the scan completes. A
+        batch that was interrupted is processed again, so processing should
+        be idempotent.
+
+        An optional *progress* callable is called after each batch with a
+        tavi.scan.ScanReport. If *lazy* is True, Documents are loaded lazily
+        as for *find*.
+
+        For example::
+            checkpoint = tavi.scan.FileCheckpoint("reindex.checkpoint")
+            for order in Order.scan(batch_size=500, checkpoint=checkpoint):
+                reindex(order)
+
+        """
+        if "_id" != key:
+            key = cls._field_descriptors[key].name
+
+        def report(scan_report):
+            logger.info(
+                "(%ss) %s SCAN %s, batch %d (%s record(s), %.0f/s)",
+                round(scan_report.batch_elapsed, 3),
+                cls.__name__,
+                spec,
+                scan_report.batches,
+                scan_report.batch_size,
+                scan_report.batch_rate
+            )
+            if progress:
+                progress(scan_report)
+
+        return scan.keyset_scan(
+            cls, spec, key, batch_size, checkpoint, lazy, report)
+
+    @classmethod
+    def export_ndjson(cls, spec, fileobj, fields=None,
+                      batch_size=ndjson.DEFAULT_BATCH_SIZE):
+        """Streams the Documents that meet criteria to *fileobj* as newline
+        delimited extended JSON, one Document per line, without loading them
+        all into memory. Documents are written as they are stored in Mongo.
+        Optionally, specify which fields should be exported, as for
+        *to_json*. Returns the number of Documents exported.
+
+        For example::
+            with open("orders.ndjson", "w") as f:
+                Order.export_ndjson({"status": "shipped"}, f)
+
+        """
+        projection = None
+        if fields:
+            projection = {
+                cls._field_descriptors[f].name
+                if f in cls._field_descriptors else f: True
+                for f in fields if f != "bson_id"
+            }
+            projection["_id"] = "bson_id" in fields
+
+        timer = Timer()
+        with timer:
+            count = ndjson.export(
+                cls.collection, fileobj, spec, projection, batch_size)
+
+        logger.info(
+            "(%ss) %s EXPORT NDJSON %s, %s (%s record(s) exported)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            projection,
+            count
+        )
+
+        return count
+
+    @classmethod
+    def import_ndjson(cls, fileobj, batch_size=ndjson.DEFAULT_BATCH_SIZE,
+                      workers=1, upsert=False, rejects=None, progress=None,
+                      processes=None):
+        """Imports newline delimited extended JSON documents, as written by
+        *export_ndjson*, from *fileobj* without creating a Document for each
+        of them. Lines are parsed and validated with *validate_many*
+        *batch_size* at a time and valid documents are written with
+        unordered bulk inserts by up to *workers* threads. If *upsert* is
+        True, documents with an _id replace the stored ones.
+
+        Documents are written as given, with their string and Object Id
+        fields converted as they would be when assigned; created_at and
+        last_modified_at are not set.
+
+        Rejected lines and their error messages are written to the *rejects*
+        file, if given. *progress* is called with a tavi.ndjson.ImportReport
+        after each batch. Returns the final ImportReport.
+
+        If parsing and validation are the bottleneck, *processes* worker
+        processes can be used instead of threads. Each of them sets up its
+        own connection and parses, validates and writes whole batches; this
+        process only reads lines and collects the results. The Document
+        class must be importable by the workers.
+
+        For example::
+            with open("orders.ndjson") as f, open("rejects.ndjson", "w") as r:
+                report = Order.import_ndjson(f, workers=4, rejects=r)
+
+        """
+        timer = Timer()
+        with timer:
+            if processes:
+                report = ndjson.load_parallel(
+                    cls, fileobj, processes, batch_size, upsert, rejects,
+                    progress
+                )
+            else:
+                report = ndjson.load(
+                    cls.collection, fileobj, cls._prepare_import, batch_size,
+                    workers, upsert, rejects, progress
+                )
+
+        logger.info(
+            "(%ss) %s IMPORT NDJSON (%s read, %s written, %s rejected)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            report.read,
+            report.written,
+            report.rejected
+        )
+
+        return report
+
+    @classmethod
+    def _prepare_import(cls, rows):
+        """Validates *rows*, dictionaries keyed by Mongo field name, for
+        *import_ndjson*. Returns the documents to insert for the valid rows,
+        and (index, messages) for the invalid ones.
+
+        """
+        descriptors = cls._field_descriptors.items()
+        errors = cls.validate_many([
+            {attr: row.get(field.name) for attr, field in descriptors}
+            for row in rows
+        ])
+        invalid = set(errors.rows)
+
+        documents = []
+        for i, row in enumerate(rows):
+            if i in invalid:
+                continue
+            document = {}
+            if "_id" in row:
+                document["_id"] = row["_id"]
+            for _, field in descriptors:
+                value = row.get(field.name)
+                if field.kind not in ("embedded", "list"):
+                    value = field.prepare(value)
+                document[field.name] = value
+            documents.append(document)
+
+        rejected = [(i, errors.full_messages_for(i)) for i in errors.rows]
+        return documents, rejected
 
     def delete(self):
         """Removes the Document from the collection."""
         timer = Timer()
         with timer:
-            result = self.__class__.collection.remove({"_id": self._id})
+            result = self.__class__.collection.remove(
+                {"_id": self._id}, **self._write_options({}))
 
         logger.info(
             "(%ss) %s DELETE %s",
@@ -92,18 +601,50 @@ class Document(BaseDocument):
             self._id
         )
 
-        if result.get("err"):
+        if result and result.get("err"):
             logger.error(result.get("err"))
 
+    @classmethod
+    def _finder(cls, lazy):
+        """Returns the collection to query and the function used to build
+        Documents from its results.
+
+        """
+        if lazy:
+            return cls.raw_collection, cls.from_raw
+        return cls.collection, cls._from_mongo
+
+    @classmethod
+    def _from_mongo(cls, result):
+        """Creates a Document from *result*, a dictionary of Mongo field names
+        to values.
+
+        """
+        names = cls._attribute_names
+        doc = cls(**{names.get(k, k): v for k, v in result.iteritems()})
+        doc.mark_saved()
+        doc.take_snapshot()
+        return doc
+
     @classmethod
     def find(cls, *args, **kwargs):
         """Returns all Documents in collection that meet criteria. Wraps
         pymongo's *find* method and supports all of the same arguments.
 
+        If *lazy* is True, results are fetched as raw BSON and each field is
+        only decoded and validated when it is first accessed.
+
+        The results are returned as a ResultList, whose *prefetch* method
+        fetches referenced Documents for all of the results at once.
+
         """
+        collection, build = cls._finder(kwargs.pop("lazy", False))
+
         timer = Timer()
         with timer:
-            results = cls.collection.find(*args, **kwargs)
+            results = ResultList(
+                build(result) for result in collection.find(*args, **kwargs)
+            )
 
         logger.info(
             "(%ss) %s FIND %s, %s (%s record(s) found)",
@@ -111,10 +652,10 @@ class Document(BaseDocument):
             cls.__name__,
             args,
             kwargs,
-            results.count()
+            len(results)
         )
 
-        return [cls(**result) for result in results]
+        return results
 
     @classmethod
     def find_all(cls):
@@ -122,27 +663,30 @@ class Document(BaseDocument):
         return cls.find()
 
     @classmethod
-    def find_by_id(cls, id_):
+    def find_by_id(cls, id_, lazy=False):
         """Returns the Document that matches *id_* or None if it cannot be
         found.
 
         """
-        return cls.find_one(ObjectId(id_))
+        return cls.find_one(ObjectId(id_), lazy=lazy)
 
     @classmethod
     def find_one(cls, spec_or_id=None, *args, **kwargs):
         """Returns one Document that meets criteria. Wraps pymongo's find_one
-        method and supports all of the same arguments.
+        method and supports all of the same arguments. Supports the same
+        *lazy* option as *find*.
 
         """
+        collection, build = cls._finder(kwargs.pop("lazy", False))
+
         timer = Timer()
         with timer:
-            result = cls.collection.find_one(spec_or_id, *args, **kwargs)
+            result = collection.find_one(spec_or_id, *args, **kwargs)
 
         found_record, num_found = None, 0
 
         if result:
-            found_record, num_found = cls(**result), 1
+            found_record, num_found = build(result), 1
 
         logger.info(
             "(%ss) %s FIND ONE %s, %s, %s (%s record(s) found)",
@@ -156,17 +700,22 @@ class Document(BaseDocument):
 
         return found_record
 
-    def save(self, w=1, wtimeout=0, j=False):
+    def save(self, w=None, wtimeout=None, j=None):
         """Saves the Document by inserting it into the collection if it does
         not exist or updating it if it does. Returns True if save was
         successful. Ensures that the Document is valid before saving and
         returns False if it was not.
 
         This function performs an upsert if the model has an ID, but is not in
-        the database.
+        the database. Only the fields, and fields of embedded documents, that
+        changed since the Document was loaded or last saved are written, and
+        if none changed nothing is written at all.
 
         If the document model has a field named 'created_at', this field's
         value will be set to the current time when the document is inserted.
+        If *__server_timestamps__* is True, the Document's own 'created_at'
+        and 'last_modified_at' fields are set by Mongo with $currentDate
+        instead, and are not updated on the Document until it is reloaded.
 
         Supports the following arguments that are passed to pymongo:
 
@@ -174,26 +723,52 @@ class Document(BaseDocument):
         wtimeout: Timeout in ms for write concern. Default is 0
         j: Journaling option for write concern. Default is False
 
+        Defaults for these can be set for the class with *__write_concern__*.
+        With w=0 the write is not acknowledged: save returns True as soon as
+        it is sent, and errors such as unique index violations are not
+        reported.
+
         See Pymongo docs for more information on these arguments:
         http://api.mongodb.org/python/current/api/pymongo/collection.html
 
         See the Mongo docs for more information on Write Concern:
         http://docs.mongodb.org/manual/core/write-concern/
 
+        If the class sets *__write_behind__*, the write is queued instead and
+        written in bulk by a background thread, using the collection's write
+        concern. Writes that fail, such as unique index violations, are then
+        reported to the buffer's *on_error* callback instead of the Document's
+        errors. Call *flush* to wait for queued writes.
+
         """
         if not self.valid:
             return False
 
-        write_opts = frozenset(["w", "j", "wtimeout"])
-        kwargs = {k: v for k, v in locals().iteritems() if k in write_opts}
+        kwargs = {"w": 1, "wtimeout": 0, "j": False}
+        kwargs.update(self._write_options(
+            {"w": w, "wtimeout": wtimeout, "j": j}))
 
         operation = Update if self.bson_id else Insert
         operation = operation(self, **kwargs)
 
+        if not operation.has_changes():
+            logger.info(
+                "%s %s skipped, nothing changed, %s",
+                self.__class__.__name__,
+                operation.name,
+                self._id
+            )
+            return True
+
+        buffer = self._write_behind()
+
         timer = Timer()
         with timer:
             try:
-                operation.execute()
+                if buffer is None:
+                    operation.execute()
+                else:
+                    operation.queue(buffer)
             except pymongo.errors.PyMongoError as e:
                 operation.reset_fields()
 
@@ -203,17 +778,528 @@ class Document(BaseDocument):
                 raise
 
         self.changed_fields = set()
+        self.mark_saved()
+        self.take_snapshot()
 
         logger.info(
-            "(%ss) %s %s %s, %s",
+            "(%ss) %s %s%s %s, %s",
             timer.duration_in_seconds(),
             self.__class__.__name__,
             operation.name,
+            "" if buffer is None else " QUEUED",
             self.mongo_field_values,
             self._id
         )
         return True
 
+    @classmethod
+    def _write_behind(cls):
+        """Returns the tavi.writebehind.WriteBehind that queues the writes of
+        this class, or None if *__write_behind__* is not set.
+
+        """
+        options = cls.__write_behind__
+        if not options:
+            return None
+
+        buffer = cls.__dict__.get("_write_behind_buffer")
+        if buffer is None:
+            with _write_behind_lock:
+                buffer = cls.__dict__.get("_write_behind_buffer")
+                if buffer is None:
+                    options = dict({} if options is True else options)
+                    options.setdefault(
+                        "write_concern", cls.__write_concern__)
+                    buffer = writebehind.WriteBehind(
+                        lambda: cls.collection, **options)
+                    cls._write_behind_buffer = buffer
+        return buffer
+
+    @classmethod
+    def flush(cls):
+        """Blocks until all of the saves queued for this class, if it has
+        *__write_behind__* set, have been written.
+
+        """
+        buffer = cls._write_behind()
+        if buffer is not None:
+            buffer.flush()
+
+    @classmethod
+    def _write_options(cls, kwargs):
+        """Returns the write concern options of the class, set by
+        *__write_concern__*, overridden by the arguments in *kwargs* that are
+        not None.
+
+        """
+        options = dict(cls.__write_concern__ or {})
+        options.update(
+            (k, v) for k, v in kwargs.iteritems() if v is not None)
+        return options
+
+    @classmethod
+    def update_one(cls, spec_or_id, **kwargs):
+        """Atomically updates one Document that meets criteria without loading
+        it. Field values are given by attribute name using the following
+        arguments, each of which maps to the Mongo update operator of the
+        same name:
+
+        set: dictionary of values to set
+        inc: dictionary of amounts to increment numeric fields by
+        min: dictionary of values to set if they are less than the current
+             ones
+        max: dictionary of values to set if they are greater than the current
+             ones
+        current_date: list of date time fields to set to the server's date
+
+        Values are validated by their fields and a TaviValidationError is
+        raised if any are not valid. Increments of fields that have a minimum
+        or maximum value only update Documents for which the result will be
+        in range. Any other arguments are passed to pymongo's *update*.
+
+        Returns True if a Document was updated, False if none matched and None
+        for unacknowledged writes.
+
+        For example::
+            Product.update_one({"sku": "123"}, inc={"stock": -1})
+
+        """
+        spec, document = cls._build_update(spec_or_id, kwargs)
+        kwargs = cls._write_options(kwargs)
+
+        timer = Timer()
+        with timer:
+            result = cls.collection.update(spec, document, **kwargs)
+
+        logger.info(
+            "(%ss) %s UPDATE ONE %s, %s",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            document
+        )
+
+        return None if result is None else bool(result.get("n"))
+
+    @classmethod
+    def find_one_and_update(cls, spec_or_id, new=True, sort=None, **kwargs):
+        """Same as *update_one* except that it returns the updated Document,
+        or the Document as it was before the update if *new* is False. If
+        multiple Documents match, the first according to *sort* is updated.
+        Returns None if no Document matched.
+
+        """
+        spec, document = cls._build_update(spec_or_id, kwargs)
+
+        timer = Timer()
+        with timer:
+            if hasattr(cls.collection, "find_one_and_update"):
+                result = cls.collection.find_one_and_update(
+                    spec, document, sort=sort,
+                    return_document=pymongo.ReturnDocument.AFTER
+                    if new else pymongo.ReturnDocument.BEFORE,
+                    **kwargs
+                )
+            else:  # pymongo < 3.0
+                result = cls.collection.find_and_modify(
+                    spec, document, sort=sort, new=new, **kwargs)
+
+        logger.info(
+            "(%ss) %s FIND ONE AND UPDATE %s, %s (%s record(s) found)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            document,
+            1 if result else 0
+        )
+
+        return cls._from_mongo(result) if result else None
+
+    def update(self, **kwargs):
+        """Atomically updates this Document in Mongo using the same arguments
+        as *update_one*, then refreshes the updated fields from the result.
+        Other changes to the Document are not saved. Returns True if
+        successful. Returns False if any of the values are not valid, in which
+        case the errors are added to the Document, or if an increment would
+        put a field out of range.
+
+        """
+        self._ensure_saved()
+
+        try:
+            spec, document = self._build_update(self._id, kwargs)
+        except TaviValidationError as e:
+            for field, messages in e.errors.items():
+                for msg in messages:
+                    self.errors.add(field, msg)
+            return False
+
+        result = self.__class__.collection.find_one_and_update(
+            spec, document, return_document=pymongo.ReturnDocument.AFTER,
+            **kwargs
+        ) if hasattr(self.__class__.collection, "find_one_and_update") \
+            else self.__class__.collection.find_and_modify(
+                spec, document, new=True, **kwargs)
+
+        if not result:
+            return False
+
+        names = set(k for values in document.values() for k in values)
+        for attr, field in self._field_descriptors.items():
+            if field.name in names:
+                changed = field.name in self.changed_fields
+                field.load_raw(self, result.get(field.name))
+                if not changed:
+                    self.changed_fields.discard(field.name)
+
+        if self._snapshot is not None:
+            self.take_snapshot({
+                name: value for name, value in result.iteritems()
+                if name in names
+            })
+        return True
+
+    @classmethod
+    def upsert_by(cls, values, keys=None, new=False, **kwargs):
+        """Inserts or updates the Document whose *keys* fields have the same
+        values as in *values*, a dictionary of field values by attribute
+        name, with a single upsert instead of finding the Document first.
+        *keys* default to the fields declared unique.
+
+        Only the fields in *values* are written, along with last_modified_at,
+        and created_at if the Document is inserted. The values are validated
+        as a whole Document, since it may be inserted, and a
+        TaviValidationError is raised if they are not valid.
+
+        Returns the upserted Document if *new* is True, using the
+        collection's write concern. Otherwise returns True, or None for
+        unacknowledged writes; any other arguments are write concern options,
+        see *save*.
+
+        For example::
+            Product.upsert_by({"sku": "123", "price": 9.99})
+
+        """
+        operation = cls._upsert_operation(values, keys, kwargs)
+        _, spec, document = operation.write_operation()
+
+        timer = Timer()
+        with timer:
+            try:
+                result = cls._upsert(spec, document, operation.kwargs, new)
+            except pymongo.errors.DuplicateKeyError:
+                # A concurrent upsert inserted a Document with the same keys
+                # first; this time the upsert matches it.
+                result = cls._upsert(spec, document, operation.kwargs, new)
+
+        logger.info(
+            "(%ss) %s UPSERT %s, %s",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            spec,
+            document
+        )
+
+        if new:
+            return cls._from_mongo(result)
+        return None if result is None else True
+
+    @classmethod
+    def _upsert(cls, spec, document, kwargs, new):
+        collection = cls.collection
+        if not new:
+            return write(collection, ("update", spec, document), kwargs)
+        if hasattr(collection, "find_one_and_update"):
+            return collection.find_one_and_update(
+                spec, document, upsert=True,
+                return_document=pymongo.ReturnDocument.AFTER
+            )
+        return collection.find_and_modify(  # pymongo < 3.0
+            spec, document, upsert=True, new=True)
+
+    @classmethod
+    def upsert_many(cls, rows, keys=None, **kwargs):
+        """Same as *upsert_by* for each of the dictionaries in *rows*, but
+        writes them with unordered bulk upserts. Rows that are not valid,
+        lack a key or could not be written are skipped. Returns the (index,
+        messages) pairs of the skipped rows. Any other arguments are write
+        concern options, see *save*.
+
+        """
+        kwargs = cls._write_options(kwargs)
+        rejected, indexes = [], []
+        bulk = cls.collection.initialize_unordered_bulk_op()
+        count = 0
+
+        timer = Timer()
+        with timer:
+            for i, values in enumerate(rows):
+                count += 1
+                try:
+                    operation = cls._upsert_operation(values, keys, {})
+                except TaviValidationError as e:
+                    rejected.append((i, e.errors.full_messages))
+                    continue
+                except TaviError as e:
+                    rejected.append((i, [e.message]))
+                    continue
+
+                _, spec, document = operation.write_operation()
+                bulk.find(spec).upsert().update_one(document)
+                indexes.append(i)
+
+            if indexes:
+                try:
+                    bulk.execute(kwargs or None)
+                except pymongo.errors.BulkWriteError as e:
+                    for error in e.details["writeErrors"]:
+                        rejected.append(
+                            (indexes[error["index"]], [error["errmsg"]]))
+
+        logger.info(
+            "(%ss) %s UPSERT MANY (%s written, %s rejected)",
+            timer.duration_in_seconds(),
+            cls.__name__,
+            count - len(rejected),
+            len(rejected)
+        )
+
+        return sorted(rejected)
+
+    @classmethod
+    def _upsert_operation(cls, values, keys, kwargs):
+        """Validates *values* for *upsert_by* and returns the stamped Upsert
+        command that writes them.
+
+        """
+        if keys is None:
+            keys = [k for k, v in cls._field_descriptors.items() if v.unique]
+        if not keys:
+            raise TaviError(
+                "%s has no unique fields to upsert by" % cls.__name__)
+
+        missing = [key for key in keys if key not in values]
+        if missing:
+            raise TaviError("Missing values for upsert keys: %s" % (
+                ", ".join(missing)))
+
+        unknown = set(values) - cls._field_names
+        if unknown:
+            raise TaviError("%s is not a field of %s" % (
+                unknown.pop(), cls.__name__))
+
+        # Skips Document.__init__, which ensures the unique index each time.
+        document = cls.__new__(cls)
+        super(Document, document).__init__(**values)
+        document._id = None
+
+        if not document.valid:
+            raise TaviValidationError(document.errors)
+
+        operation = Upsert(
+            document, keys, list(values), **cls._write_options(kwargs))
+        operation.stamp()
+        return operation
+
+    @classmethod
+    def _build_update(cls, spec_or_id, kwargs):
+        """Pops the update operator arguments from *kwargs* and returns the
+        query and update document for an atomic update. Raises a
+        TaviValidationError if any values are not valid.
+
+        """
+        scratch = cls.from_raw({})
+        spec = spec_or_id
+        if not isinstance(spec, dict):
+            spec = {"_id": spec}
+
+        document, conditions = {}, []
+        for arg, operator in cls.__UPDATE_OPERATORS__.items():
+            values = kwargs.pop(arg, None)
+            if not values:
+                continue
+            if "current_date" == arg:
+                values = {attr: True for attr in values}
+
+            for attr, value in values.items():
+                field = cls._field_descriptors.get(attr)
+                if field is None or field.kind not in ("scalar", "generic"):
+                    raise TaviError(
+                        "%s cannot be updated atomically" % attr)
+
+                value, condition = cls._update_operand(
+                    scratch, attr, arg, value)
+                document.setdefault(operator, {})[field.name] = value
+                if condition:
+                    conditions.append({field.name: condition})
+
+        scratch._validate_deferred_fields()
+        if scratch.errors.count:
+            raise TaviValidationError(scratch.errors)
+        if conditions:
+            spec = {"$and": [spec] + conditions}
+        return spec, document
+
+    @classmethod
+    def _update_operand(cls, scratch, attr, arg, value):
+        """Validates *value* as the operand of the update operator *arg* on
+        the field *attr*, using the *scratch* Document to hold errors. Returns
+        the value to send to Mongo and an optional query condition.
+
+        """
+        field = cls._field_descriptors[attr]
+
+        if "inc" == arg:
+            return value, field.validate_increment(scratch, value)
+
+        if "current_date" == arg:
+            setattr(scratch, attr, datetime.datetime.utcnow())
+            if not isinstance(getattr(scratch, attr), datetime.datetime):
+                scratch.errors.add(field.name, "must be a date and time")
+            return value, None
+
+        setattr(scratch, attr, value)
+        return getattr(scratch, attr), None
+
+    def mark_saved(self):
+        """Marks the current field values as persisted, so that changes to
+        fields that track them can be saved with atomic update operations.
+
+        """
+        for field in self._field_descriptors.values():
+            field.mark_saved(self)
+
+    def take_snapshot(self, values=None):
+        """Records a fingerprint of the Mongo field *values*, all of the
+        Document's by default, as they are stored in Mongo. Changes made
+        since are found by comparing against the snapshot, including changes
+        inside embedded documents.
+
+        Documents loaded by *find* have a snapshot taken when they are
+        hydrated and saved Documents when they are saved. Documents loaded
+        lazily are compared against their raw document instead.
+
+        """
+        if values is None:
+            values = self.mongo_field_values
+        if self._snapshot is None:
+            self._snapshot = {}
+        for name, value in values.iteritems():
+            self._snapshot[name] = _fingerprint(value)
+
+    def changed_values(self, values=None):
+        """Returns the Mongo paths of the fields in *values*, all of the
+        Document's by default, that changed since the Document was loaded or
+        saved, mapped to their new values. Changes inside embedded documents
+        are returned as dotted paths. Every field of a Document that was not
+        loaded from Mongo is changed.
+
+        """
+        if values is None:
+            values = self.mongo_field_values
+
+        changed = {}
+        for name, value in values.iteritems():
+            _diff(name, value, self._saved_fingerprint(name), changed)
+        return changed
+
+    def _saved_fingerprint(self, name):
+        if self._snapshot is not None:
+            return self._snapshot.get(name, _MISSING)
+        if "_raw" in self.__dict__:
+            return _fingerprint(self.raw_value(name))
+        return _MISSING
+
+    def push(self, field, *values, **kwargs):
+        """Atomically appends *values* to the list or array *field* in Mongo,
+        without saving any other changes to the Document, and appends them to
+        the Document as well. Returns True if successful; returns False if any
+        of the values are not valid.
+
+        Supports the following arguments:
+
+        slice: Keeps only the given number of items after pushing; negative
+               numbers keep the last items. Default is None
+        w, wtimeout, j: Write concern options, see *save*
+
+        """
+        self._ensure_saved()
+        slice_ = kwargs.pop("slice", None)
+        descriptor = self._field_descriptors[field]
+        items = getattr(self, field)
+
+        if isinstance(items, EmbeddedList):
+            if items.owner is None:
+                items.owner = self
+            if not all([items.accepts(value) for value in values]):
+                return False
+            mongo_values = [value.field_values for value in values]
+        else:
+            descriptor.validate(self, items + list(values))
+            if self.errors.get(descriptor.name):
+                return False
+            mongo_values = list(values)
+
+        spec = {"$each": mongo_values}
+        if slice_ is not None:
+            spec["$slice"] = slice_
+
+        self._atomic_update("PUSH", {"$push": {descriptor.name: spec}}, kwargs)
+
+        if isinstance(items, EmbeddedList):
+            for value in values:
+                value.owner = items.owner
+            items.record_push(values, slice_)
+        else:
+            descriptor.record_push(self, values, slice_)
+        return True
+
+    def pull(self, field, *values, **kwargs):
+        """Atomically removes all items equal to any of *values* from the list
+        or array *field* in Mongo, without saving any other changes to the
+        Document, and removes them from the Document as well. Supports the
+        same write concern options as *save*.
+
+        """
+        self._ensure_saved()
+        descriptor = self._field_descriptors[field]
+        items = getattr(self, field)
+
+        if isinstance(items, EmbeddedList):
+            values = [value.field_values for value in values]
+
+        operation = pull_operation(descriptor.name, values, [])
+        self._atomic_update("PULL", operation, kwargs)
+
+        if isinstance(items, EmbeddedList):
+            items.record_pull(values)
+        else:
+            descriptor.record_pull(self, values)
+
+    def _ensure_saved(self):
+        if self._id is None:
+            raise TaviError(
+                "%s must be saved before it can be updated atomically" %
+                self.__class__.__name__
+            )
+
+    def _atomic_update(self, name, document, write_opts):
+        """Applies the update *document* to this Document in Mongo."""
+        timer = Timer()
+        with timer:
+            self.__class__.collection.update(
+                {"_id": self._id}, document,
+                **self._write_options(write_opts))
+
+        logger.info(
+            "(%ss) %s %s %s, %s",
+            timer.duration_in_seconds(),
+            self.__class__.__name__,
+            name,
+            document,
+            self._id
+        )
+
     def parse_duplicate_key_error(self, operation, error):
         logger.warn(
             "%s %s failed due to unique index violation (%s)",
@@ -230,7 +1316,15 @@ class Document(BaseDocument):
                 SUFFIX=self.__UNIQUE_INDEX_SUFFIX__
             )
 
-        f = re.search(index_rex, error.message).group(1)
+        match = re.search(index_rex, error.message)
+        if match:
+            f = match.group(1)
+        else:
+            # The message does not name the index in the formats matched
+            # above, e.g. a bare "E11000 duplicate key error", but all unique
+            # fields share the one index.
+            f = "_".join(
+                k for k, v in self._field_descriptors.items() if v.unique)
         self.errors.add(f, "must be unique")
 
 
@@ -243,5 +1337,19 @@ class EmbeddedDocument(BaseDocument):
         super(EmbeddedDocument, self).__init__(**kwargs)
         self.owner = None
 
+    @classmethod
+    def from_raw(cls, raw):
+        doc = super(EmbeddedDocument, cls).from_raw(raw)
+        doc.owner = None
+        return doc
+
+    def raw_value(self, name):
+        """Embedded documents are persisted using their attribute names, so
+        *name* is looked up by its attribute name.
+
+        """
+        return super(EmbeddedDocument, self).raw_value(
+            self._attribute_names.get(name, name))
+
     def __eq__(self, other):
         return other and self.field_values == other.field_values
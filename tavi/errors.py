@@ -22,23 +22,42 @@ class TaviConnectionError(TaviError):
     pass
 
 
+class TaviValidationError(TaviError):
+    """Raised when the values given to an atomic update are not valid. The
+    *errors* attribute is a tavi.errors.Errors object holding the messages.
+
+    """
+    def __init__(self, errors):
+        super(TaviValidationError, self).__init__(
+            ", ".join(errors.full_messages))
+        self.errors = errors
+
+
 class Errors(object):
     """Provides a dictionary-like object that is used for handing error
     messages for fields.
 
+    Nothing is allocated until an error is added, and clearing a field that
+    has no errors is free, so valid documents cost next to nothing. The number
+    of messages is kept as they are added and cleared.
+
     """
+    __slots__ = ("_errors", "_count")
 
     def __init__(self):
-        self._errors = {}
+        self._errors = None
+        self._count = 0
 
     @property
     def count(self):
         """Returns the number of error messages."""
-        return len(flatten(self._errors.values()))
+        return self._count
 
     @property
     def full_messages(self):
         """Returns all the full error messages as a list."""
+        if not self._count:
+            return []
         return flatten(
             [self.full_messages_for(field) for field in self._errors]
         )
@@ -48,21 +67,107 @@ class Errors(object):
         error can be added to the same *field*.
 
         """
+        if self._errors is None:
+            self._errors = {}
         if field not in self._errors:
             self._errors[field] = []
         self._errors[field].append(message)
+        self._count += 1
 
     def clear(self, field):
         """Clear the error messages."""
-        self._errors[field] = []
+        if self._count and field in self._errors:
+            self._count -= len(self._errors.pop(field))
 
     def full_messages_for(self, field):
         """Returns all the full error messages for a given *field* as a list.
 
         """
-        humanized_field = inflection.titleize(inflection.humanize(field))
-        return ["%s %s" % (humanized_field, msg) for msg in self.get(field)]
+        return [full_message(field, msg) for msg in self.get(field)]
 
     def get(self, field):
         """Return error messages for *field*."""
-        return self._errors[field]
+        if self._count and field in self._errors:
+            return self._errors[field]
+        return []
+
+    def items(self):
+        """Returns a list of (field, messages) pairs for the fields that have
+        errors.
+
+        """
+        if not self._count:
+            return []
+        return self._errors.items()
+
+
+class BatchErrors(object):
+    """Holds the error messages for a batch of rows validated together by
+    tavi.base.documents.BaseDocument.validate_many. Only invalid rows are
+    stored, each as a list of (field, message) pairs, so no Errors object is
+    created per row.
+
+    Field checks add errors through *errors.add* on the document they
+    validate; a BatchErrors can be passed in place of the document, in which
+    case *add* records the message for the row at index *row*.
+
+    """
+
+    def __init__(self):
+        self.row = None
+        self._errors = {}
+
+    @property
+    def errors(self):
+        """Returns itself so that field checks can add errors to it."""
+        return self
+
+    @property
+    def count(self):
+        """Returns the number of error messages."""
+        return sum(len(errors) for errors in self._errors.values())
+
+    @property
+    def rows(self):
+        """Returns the sorted indexes of the rows that are not valid."""
+        return sorted(self._errors)
+
+    @property
+    def full_messages(self):
+        """Returns a dictionary of the full error messages of each invalid
+        row, keyed by row index.
+
+        """
+        return {row: self.full_messages_for(row) for row in self._errors}
+
+    def add(self, field, message):
+        """Adds *message* on *field* to the current *row*."""
+        self._errors.setdefault(self.row, []).append((field, message))
+
+    def add_rows(self, rows, field, message):
+        """Adds *message* on *field* to each of the *rows*."""
+        for row in rows:
+            self._errors.setdefault(row, []).append((field, message))
+
+    def full_messages_for(self, row):
+        """Returns the full error messages for *row* as a list."""
+        return [full_message(field, msg) for field, msg in self.get(row)]
+
+    def get(self, row):
+        """Returns the (field, message) pairs for *row*."""
+        return self._errors.get(row, [])
+
+
+_labels = {}
+
+
+def full_message(field, message):
+    """Returns *message* prefixed with the humanized name of *field*. Names
+    are only humanized once.
+
+    """
+    label = _labels.get(field)
+    if label is None:
+        label = _labels[field] = inflection.titleize(
+            inflection.humanize(field))
+    return "%s %s" % (label, message)
@@ -5,10 +5,16 @@ import collections
 import datetime
 from bson import ObjectId
 from pymongo.errors import InvalidId
-from tavi import EmbeddedList
+from tavi import EmbeddedList, pull_operation
 from tavi.base.fields import BaseField
-from tavi.documents import EmbeddedDocument
+from tavi.documents import Document, EmbeddedDocument
 from tavi.errors import TaviTypeError
+from tavi.utils import apply_slice
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class BooleanField(BaseField):
@@ -16,9 +22,13 @@ class BooleanField(BaseField):
     validations of *BaseField*.
 
     """
-    def validate(self, instance, value):
-        super(BooleanField, self).validate(instance, value)
+    kind = "scalar"
+
+    def build_validators(self):
+        return super(BooleanField, self).build_validators() + [
+            self._check_boolean]
 
+    def _check_boolean(self, instance, value):
         if value and not isinstance(value, bool):
             instance.errors.add(self.name, "must be a valid boolean")
 
@@ -28,10 +38,13 @@ class DateTimeField(BaseField):
     Supports all the validations in *BaseField*.
 
     """
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(DateTimeField, self).validate(instance, value)
+    kind = "scalar"
 
+    def build_validators(self):
+        return super(DateTimeField, self).build_validators() + [
+            self._check_datetime]
+
+    def _check_datetime(self, instance, value):
         if value is not None and not isinstance(value, datetime.datetime):
             instance.errors.add(self.name, "must be a valid date and time")
 
@@ -45,34 +58,29 @@ class FloatField(BaseField):
     max_value -- validates the maximum value the field value can be
 
     """
+    kind = "scalar"
+
     def __init__(self, name, min_value=None, max_value=None, **kwargs):
         super(FloatField, self).__init__(name, **kwargs)
 
         self.min_value = None if min_value is None else float(min_value)
         self.max_value = None if max_value is None else float(max_value)
 
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(FloatField, self).validate(instance, value)
-
-        if value is not None:
-            if isinstance(value, int):
-                value = float(value)
-
-            if not isinstance(value, float):
-                instance.errors.add(self.name, "must be a float")
+    def build_validators(self):
+        validators = super(FloatField, self).build_validators()
+        validators.append(self._check_float)
+        return validators + _range_checks(self)
 
-            if self.min_value is not None and value < self.min_value:
-                instance.errors.add(
-                    self.name,
-                    "is too small (minimum is %s)" % self.min_value
-                )
+    def _check_float(self, instance, value):
+        if value is not None and not isinstance(value, (int, float)):
+            instance.errors.add(self.name, "must be a float")
 
-            if self.max_value is not None and value > self.max_value:
-                instance.errors.add(
-                    self.name,
-                    "is too big (maximum is %s)" % self.max_value
-                )
+    def validate_increment(self, instance, amount):
+        if not isinstance(amount, (int, long, float)) or \
+                isinstance(amount, bool):
+            instance.errors.add(self.name, "must be incremented by a float")
+            return None
+        return _range_condition(self, amount)
 
 
 class IntegerField(BaseField):
@@ -84,31 +92,28 @@ class IntegerField(BaseField):
     max_value -- validates the maximum value the field value can be
 
     """
+    kind = "scalar"
+
     def __init__(self, name, min_value=None, max_value=None, **kwargs):
         super(IntegerField, self).__init__(name, **kwargs)
 
         self.min_value = None if min_value is None else int(min_value)
         self.max_value = None if max_value is None else int(max_value)
 
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(IntegerField, self).validate(instance, value)
+    def build_validators(self):
+        validators = super(IntegerField, self).build_validators()
+        validators.append(self._check_integer)
+        return validators + _range_checks(self)
 
-        if value is not None:
-            if not isinstance(value, int):
-                instance.errors.add(self.name, "must be a integer")
+    def _check_integer(self, instance, value):
+        if value is not None and not isinstance(value, int):
+            instance.errors.add(self.name, "must be a integer")
 
-            if self.min_value is not None and value < self.min_value:
-                instance.errors.add(
-                    self.name,
-                    "is too small (minimum is %s)" % self.min_value
-                )
-
-            if self.max_value is not None and value > self.max_value:
-                instance.errors.add(
-                    self.name,
-                    "is too big (maximum is %s)" % self.max_value
-                )
+    def validate_increment(self, instance, amount):
+        if not isinstance(amount, (int, long)) or isinstance(amount, bool):
+            instance.errors.add(self.name, "must be incremented by a integer")
+            return None
+        return _range_condition(self, amount)
 
 
 class ObjectIdField(BaseField):
@@ -116,24 +121,23 @@ class ObjectIdField(BaseField):
     in *BaseField*.
 
     """
-    def __set__(self, instance, raw_value):
+    kind = "scalar"
+
+    def convert(self, raw_value):
         if raw_value is not None:
             try:
-                value = ObjectId(raw_value)
+                return ObjectId(raw_value)
             except InvalidId:
-                value = raw_value
-        else:
-            value = None
+                return raw_value
+        return None
 
-        super(ObjectIdField, self).__set__(instance, value)
+    def build_validators(self):
+        return super(ObjectIdField, self).build_validators() + [
+            self._check_object_id]
 
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(ObjectIdField, self).validate(instance, value)
-
-        if value is not None:
-            if not isinstance(value, ObjectId):
-                instance.errors.add(self.name, "must be a valid Object Id")
+    def _check_object_id(self, instance, value):
+        if value is not None and not isinstance(value, ObjectId):
+            instance.errors.add(self.name, "must be a valid Object Id")
 
 
 class StringField(BaseField):
@@ -154,6 +158,8 @@ class StringField(BaseField):
                   pattern; default is *None*
 
     """
+    kind = "scalar"
+
     def __init__(
         self, name,
         length=None, min_length=None, max_length=None, pattern=None,
@@ -167,13 +173,10 @@ class StringField(BaseField):
         self.max_length = max_length
         self.regex = re.compile(pattern) if pattern else None
 
-    def __set__(self, instance, unstripped_value):
+    def convert(self, unstripped_value):
         if unstripped_value:
-            value = self._ensure_unicode_string(unstripped_value).strip()
-        else:
-            value = None
-
-        super(StringField, self).__set__(instance, value)
+            return self._ensure_unicode_string(unstripped_value).strip()
+        return None
 
     def _ensure_unicode_string(self, value):
         if not isinstance(value, basestring):
@@ -182,33 +185,21 @@ class StringField(BaseField):
             value = unicode(value, "utf-8")
         return value
 
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(StringField, self).validate(instance, value)
-        val_length = len(value) if value else None
-
-        if self.required and '' == value:
+    def build_validators(self):
+        validators = super(StringField, self).build_validators()
+        if self.required:
+            validators.append(self._check_not_empty)
+        validators.extend(_length_checks(self, "characters"))
+        if self.regex:
+            validators.append(self._check_pattern)
+        return validators
+
+    def _check_not_empty(self, instance, value):
+        if '' == value:
             instance.errors.add(self.name, "is required")
 
-        if self.length and self.length != val_length:
-            instance.errors.add(
-                self.name,
-                "is the wrong length (should be %s characters)" % self.length
-            )
-
-        if self.min_length and val_length < self.min_length:
-            instance.errors.add(
-                self.name,
-                "is too short (minimum is %s characters)" % self.min_length
-            )
-
-        if self.max_length and val_length > self.max_length:
-            instance.errors.add(
-                self.name,
-                "is too long (maximum is %s characters)" % self.max_length
-            )
-
-        if self.regex and value and self.regex.match(value) is None:
+    def _check_pattern(self, instance, value):
+        if value and self.regex.match(value) is None:
             instance.errors.add(self.name, "is in the wrong format")
 
 
@@ -217,6 +208,8 @@ class EmbeddedField(BaseField):
     is not a tavi.document.EmbeddedDocument.
 
     """
+    kind = "embedded"
+
     def __init__(self, name, doc, **kwargs):
         super(EmbeddedField, self).__init__(name, **kwargs)
         doc_instance = doc()
@@ -232,9 +225,14 @@ class EmbeddedField(BaseField):
         self.value = self.default or doc_instance
 
     def __get__(self, instance, owner):
+        if self.is_pending(instance):
+            self.load_pending(instance)
         return self.value
 
     def __set__(self, instance, value):
+        if self.is_pending(instance):
+            instance._pending.discard(self.name)
+
         if value:
             if not isinstance(value, EmbeddedDocument):
                 raise TaviTypeError(
@@ -252,9 +250,77 @@ class EmbeddedField(BaseField):
         else:
             self.value = value
 
+    def load_raw(self, instance, value):
+        if value is None:
+            self.__set__(instance, self.default)
+        else:
+            self.value = self.doc_class.from_raw(value)
+
+
+class ReferenceField(ObjectIdField):
+    """Represents a reference to another Mongo Document. Raises a
+    TaviTypeError if *doc* is not a tavi.documents.Document.
+
+    Only the _id of the referenced Document is stored. The Document is
+    fetched the first time the field is read and kept until another value is
+    assigned. Either a Document or its _id may be assigned. Supports all the
+    validations of *ObjectIdField*.
+
+    """
+    kind = "reference"
+
+    def __init__(self, name, doc, **kwargs):
+        super(ReferenceField, self).__init__(name, **kwargs)
+
+        if not (isinstance(doc, type) and issubclass(doc, Document)):
+            raise TaviTypeError(
+                "expected %s to be a subclass of tavi.documents.Document" %
+                doc
+            )
+
+        self.doc_class = doc
+        self.cache_name = "_%s_reference" % name
+
+    def __get__(self, instance, owner):
+        id_ = self.get_id(instance)
+        if id_ is None:
+            return None
+
+        cached = instance.__dict__.get(self.cache_name)
+        if cached is None or cached[0] != id_:
+            self.set_document(instance, self.doc_class.find_by_id(id_))
+            cached = instance.__dict__[self.cache_name]
+        return cached[1]
+
+    def __set__(self, instance, value):
+        super(ReferenceField, self).__set__(instance, value)
+        if isinstance(value, Document):
+            self.set_document(instance, value)
+
+    def convert(self, raw_value):
+        if isinstance(raw_value, Document):
+            return raw_value.bson_id
+        return super(ReferenceField, self).convert(raw_value)
+
+    def get_id(self, instance):
+        """Returns the _id of the Document referenced by *instance* without
+        fetching it.
+
+        """
+        return super(ReferenceField, self).__get__(instance, None)
+
+    def set_document(self, instance, document):
+        """Caches *document*, or None if the Document referenced by *instance*
+        does not exist, as the Document referenced by *instance*.
+
+        """
+        instance.__dict__[self.cache_name] = (self.get_id(instance), document)
+
 
 class ListField(BaseField):
     """Represents a list of embedded document fields."""
+    kind = "list"
+
     def __init__(self, name, type_, **kwargs):
         super(ListField, self).__init__(name, **kwargs)
         self._type = type_
@@ -266,11 +332,26 @@ class ListField(BaseField):
                 self.attribute_name,
                 EmbeddedList(self.name, self._type)
             )
+            if self.is_pending(instance):
+                self.load_pending(instance)
         return getattr(instance, self.attribute_name)
 
     def __set__(self, instance, value):
         pass
 
+    def load_raw(self, instance, value):
+        items = self.__get__(instance, instance.__class__)
+        if value is not None:
+            items.extend_raw(value)
+        items.mark_saved()
+
+    def mark_saved(self, instance):
+        self.__get__(instance, instance.__class__).mark_saved()
+
+    def update_operations(self, instance):
+        items = self.__get__(instance, instance.__class__)
+        return items.update_operations(self.name)
+
 
 class ArrayField(BaseField):
     """Represents an array field for a Mongo Document.
@@ -303,46 +384,227 @@ class ArrayField(BaseField):
         if validate_item is not None and not callable(validate_item):
             raise ValueError("validate_item must be callable or None")
         self.validate_item = validate_item
-
-    def validate(self, instance, value):
-        """Validates the field."""
-        super(ArrayField, self).validate(instance, value)
+        self.saved_attribute_name = "_%s_saved" % name
+
+    def build_validators(self):
+        validators = super(ArrayField, self).build_validators()
+        validators.append(self._check_list)
+        if self.required:
+            validators.append(self._check_not_empty)
+        validators.extend(_length_checks(self, "items"))
+        if self.validate_item:
+            validators.append(self._check_items)
+        return validators
+
+    def _check_list(self, instance, value):
         if (value is not None and
                 not isinstance(value, collections.MutableSequence)):
             instance.errors.add(self.name, "is not a list.")
 
-        val_length = len(value) if value else None
-
-        if self.required and not value:
+    def _check_not_empty(self, instance, value):
+        if not value:
             instance.errors.add(self.name, "is required")
 
-        if self.length and self.length != val_length:
-            instance.errors.add(
-                self.name,
-                "is the wrong length (should be %s items)" % self.length
-            )
-
-        if self.min_length and val_length < self.min_length:
-            instance.errors.add(
-                self.name,
-                "is too short (minimum is %s items)" % self.min_length
-            )
-
-        if self.max_length and val_length > self.max_length:
-            instance.errors.add(
-                self.name,
-                "is too long (maximum is %s items)" % self.max_length
-            )
-
-        if self.validate_item and value is not None:
+    def _check_items(self, instance, value):
+        if value is not None:
             for item in value:
                 self.validate_item(self, instance, item)
 
     def __get__(self, instance, owner):
         if self.attribute_name not in instance.__dict__:
-            setattr(
-                instance,
-                self.attribute_name,
-                []
-            )
+            if self.is_pending(instance):
+                self.load_pending(instance)
+            else:
+                setattr(
+                    instance,
+                    self.attribute_name,
+                    []
+                )
         return getattr(instance, self.attribute_name) or []
+
+    def load_raw(self, instance, value):
+        super(ArrayField, self).load_raw(instance, value)
+        self.mark_saved(instance)
+
+    def mark_saved(self, instance):
+        """Keeps a copy of the saved array so that changes to it can be
+        persisted with $push, $pull or positional $set operations.
+
+        """
+        value = instance.__dict__.get(self.attribute_name)
+        instance.__dict__[self.saved_attribute_name] = (
+            None if value is None else list(value))
+
+    def update_operations(self, instance):
+        saved = instance.__dict__.get(self.saved_attribute_name)
+        value = instance.__dict__.get(self.attribute_name)
+        if saved is None or not value:
+            return None
+
+        if value == saved:
+            return {}
+
+        if len(value) > len(saved) and value[:len(saved)] == saved:
+            return {"$push": {self.name: {"$each": value[len(saved):]}}}
+
+        if len(value) == len(saved):
+            return {"$set": {
+                "%s.%d" % (self.name, i): item
+                for i, item in enumerate(value) if item != saved[i]
+            }}
+
+        removed = _removed_items(saved, value)
+        if removed is None:
+            return None
+        return pull_operation(self.name, removed, value)
+
+    def record_push(self, instance, values, slice_=None):
+        """Appends *values*, which have already been pushed to Mongo, to the
+        array on *instance* without marking it as changed. *slice_* is applied
+        the same way Mongo's $slice modifier is.
+
+        """
+        for name in (self.attribute_name, self.saved_attribute_name):
+            items = instance.__dict__.get(name)
+            if items is not None or name == self.attribute_name:
+                instance.__dict__[name] = apply_slice(
+                    (items or []) + list(values), slice_)
+
+    def record_pull(self, instance, values):
+        """Removes all items equal to any of *values*, which have already been
+        pulled from Mongo, from the array on *instance* without marking it as
+        changed.
+
+        """
+        for name in (self.attribute_name, self.saved_attribute_name):
+            items = instance.__dict__.get(name)
+            if items is not None:
+                instance.__dict__[name] = [
+                    item for item in items if item not in values]
+
+
+def _removed_items(saved, value):
+    """Returns the items that were removed from the list *saved* to get the
+    list *value*, or None if *value* is not *saved* with some items removed.
+
+    """
+    removed, position = [], 0
+    for item in saved:
+        if position < len(value) and value[position] == item:
+            position += 1
+        else:
+            removed.append(item)
+
+    return removed if position == len(value) else None
+
+
+def _range_checks(field):
+    """Returns checks for the *min_value* and *max_value* of a number
+    *field*.
+
+    """
+    checks = []
+    name = field.name
+
+    if field.min_value is not None:
+        minimum = field.min_value
+        too_small = "is too small (minimum is %s)" % minimum
+
+        def check_min_value(instance, value):
+            if value is not None and value < minimum:
+                instance.errors.add(name, too_small)
+        check_min_value.column_check = _range_column_check(
+            check_min_value, "less", minimum, name, too_small)
+        checks.append(check_min_value)
+
+    if field.max_value is not None:
+        maximum = field.max_value
+        too_big = "is too big (maximum is %s)" % maximum
+
+        def check_max_value(instance, value):
+            if value is not None and value > maximum:
+                instance.errors.add(name, too_big)
+        check_max_value.column_check = _range_column_check(
+            check_max_value, "greater", maximum, name, too_big)
+        checks.append(check_max_value)
+
+    return checks
+
+
+def _range_column_check(check, comparison, bound, name, message):
+    """Returns a column check that compares a batch of numbers to *bound* at
+    once using the NumPy function *comparison*, or None if NumPy is not
+    installed. Batches that contain values that are not numbers, or that
+    NumPy cannot represent natively, are checked row by row with *check*.
+
+    """
+    if numpy is None:
+        return None
+    compare = getattr(numpy, comparison)
+
+    def column_check(errors, values):
+        rows = [i for i, value in enumerate(values) if value is not None]
+        numbers = [values[i] for i in rows]
+        if not all(isinstance(n, (int, long, float)) for n in numbers):
+            array = None
+        else:
+            array = numpy.array(numbers)
+        if array is None or array.dtype.kind not in "biuf":
+            for row in rows:
+                errors.row = row
+                check(errors, values[row])
+            return
+        failed = numpy.flatnonzero(compare(array, bound))
+        errors.add_rows([rows[i] for i in failed], name, message)
+    return column_check
+
+
+def _length_checks(field, unit):
+    """Returns checks for the *length*, *min_length* and *max_length* of a
+    string or array *field*, whose length is measured in *unit*.
+
+    """
+    checks = []
+    name = field.name
+
+    if field.length:
+        length = field.length
+        wrong_length = "is the wrong length (should be %s %s)" % (length, unit)
+
+        def check_length(instance, value):
+            if length != (len(value) if value else None):
+                instance.errors.add(name, wrong_length)
+        checks.append(check_length)
+
+    if field.min_length:
+        min_length = field.min_length
+        too_short = "is too short (minimum is %s %s)" % (min_length, unit)
+
+        def check_min_length(instance, value):
+            if (len(value) if value else None) < min_length:
+                instance.errors.add(name, too_short)
+        checks.append(check_min_length)
+
+    if field.max_length:
+        max_length = field.max_length
+        too_long = "is too long (maximum is %s %s)" % (max_length, unit)
+
+        def check_max_length(instance, value):
+            if (len(value) if value else None) > max_length:
+                instance.errors.add(name, too_long)
+        checks.append(check_max_length)
+
+    return checks
+
+
+def _range_condition(field, amount):
+    """Returns a query condition that only matches values of *field* that stay
+    within its minimum and maximum values when incremented by *amount*.
+
+    """
+    condition = {}
+    if amount < 0 and field.min_value is not None:
+        condition["$gte"] = field.min_value - amount
+    if amount > 0 and field.max_value is not None:
+        condition["$lte"] = field.max_value - amount
+    return condition or None
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Provides streaming of Mongo collections to and from newline delimited
+extended JSON (NDJSON), one document per line.
+
+"""
+import itertools
+import multiprocessing
+import os
+import time
+from bson import json_util
+from multiprocessing.pool import ThreadPool
+from pymongo.errors import BulkWriteError
+from tavi import Connection
+from tavi.utils import bounded_map, dump_json
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def export(collection, fileobj, spec=None, projection=None,
+           batch_size=DEFAULT_BATCH_SIZE):
+    """Writes the documents in *collection* that match *spec* to *fileobj*
+    as NDJSON. *projection* selects the fields written, as in pymongo's
+    *find*. Documents are fetched *batch_size* at a time and written as they
+    arrive, so the results are never held in memory all at once. Returns the
+    number of documents written.
+
+    """
+    cursor = collection.find(spec, projection).batch_size(batch_size)
+
+    count = 0
+    for document in cursor:
+        fileobj.write(dump_json(document))
+        fileobj.write("\n")
+        count += 1
+    return count
+
+
+class ImportReport(object):
+    """Keeps track of the progress of an NDJSON import. When documents are
+    imported by several processes, *workers* holds an ImportReport for each
+    of them, keyed by process id.
+
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+        self.workers = {}
+        self._started = time.time()
+
+    @property
+    def elapsed(self):
+        """Returns the number of seconds since the import started."""
+        return time.time() - self._started
+
+    @property
+    def rate(self):
+        """Returns the number of documents written per second."""
+        elapsed = self.elapsed
+        return self.written / elapsed if elapsed else 0.0
+
+    def add(self, read, rejected):
+        """Records that *read* documents were imported, of which *rejected*
+        were rejected.
+
+        """
+        self.read += read
+        self.rejected += rejected
+        self.written += read - rejected
+
+    def __repr__(self):
+        return "<ImportReport read=%d written=%d rejected=%d (%.0f/s)>" % (
+            self.read, self.written, self.rejected, self.rate)
+
+
+def load(collection, fileobj, prepare=None, batch_size=DEFAULT_BATCH_SIZE,
+         workers=1, upsert=False, rejects=None, progress=None):
+    """Imports the NDJSON documents in *fileobj* into *collection* and
+    returns an ImportReport.
+
+    Lines are parsed *batch_size* at a time. If given, *prepare* is called
+    with each batch of parsed documents and must return the documents to
+    write and a list of (index, messages) pairs for the ones it rejects.
+    Batches are written with unordered bulk inserts, or, if *upsert* is True,
+    documents that have an _id replace the stored document with that _id.
+    Up to *workers* batches are written at the same time.
+
+    Lines that cannot be parsed, rejected documents and documents that could
+    not be written are written to the *rejects* file, if given, as JSON
+    objects with the line number and error messages. *progress* is called
+    with the ImportReport after every batch.
+
+    """
+    report = ImportReport()
+
+    def write(batch):
+        lines, documents, rejected = batch
+        failures = _write_batch(collection, documents, upsert)
+        return lines, rejected + failures
+
+    batches = _parse_batches(_numbered(fileobj), batch_size, prepare)
+    pool = ThreadPool(workers) if workers > 1 else None
+    for lines, rejected in bounded_map(write, batches, pool, workers * 2):
+        report.add(len(lines), len(rejected))
+        _record(lines, rejected, rejects, progress, report)
+
+    return report
+
+
+def load_parallel(target, fileobj, processes, batch_size=DEFAULT_BATCH_SIZE,
+                  upsert=False, rejects=None, progress=None):
+    """Same as *load* except that batches are parsed, prepared and written by
+    a pool of *processes* worker processes, for imports where parsing and
+    validating documents is the bottleneck. This process only reads the
+    lines and handles the results.
+
+    *target* is either a tavi.documents.Document class, whose collection and
+    *validate_many* are used, or the name of a collection in the database.
+    Each worker sets up its own connection using tavi.Connection.settings,
+    so tavi.Connection.setup must have been called.
+
+    """
+    report = ImportReport()
+    pool = multiprocessing.Pool(
+        processes, _setup_worker, (Connection.settings, target, upsert))
+
+    chunks = _chunks(_numbered(fileobj), batch_size)
+    results = bounded_map(_load_chunk, chunks, pool, processes * 2)
+    for pid, lines, rejected in results:
+        report.add(len(lines), len(rejected))
+        report.workers.setdefault(pid, ImportReport()).add(
+            len(lines), len(rejected))
+        _record(lines, rejected, rejects, progress, report)
+
+    return report
+
+
+_worker = {}
+
+
+def _setup_worker(settings, target, upsert):
+    """Sets up a worker process of *load_parallel* with its own
+    connection.
+
+    """
+    database_name, kwargs = settings
+    Connection.setup(database_name, **kwargs)
+
+    if isinstance(target, basestring):
+        _worker.update(collection=Connection.database[target], prepare=None)
+    else:
+        _worker.update(
+            collection=target.collection, prepare=target._prepare_import)
+    _worker["upsert"] = upsert
+
+
+def _load_chunk(chunk):
+    """Parses, prepares and writes a chunk of numbered lines in a worker
+    process of *load_parallel*.
+
+    """
+    batches = _parse_batches(chunk, len(chunk), _worker["prepare"])
+    lines, documents, rejected = next(batches)
+    failures = _write_batch(
+        _worker["collection"], documents, _worker["upsert"])
+    return os.getpid(), lines, rejected + failures
+
+
+def _record(lines, rejected, rejects, progress, report):
+    """Writes the *rejected* documents of a batch to *rejects* and reports
+    the progress.
+
+    """
+    if rejects is not None:
+        for index, messages, document in sorted(rejected):
+            rejects.write(dump_json(
+                {"line": lines[index], "errors": messages,
+                 "document": document}
+            ))
+            rejects.write("\n")
+
+    if progress is not None:
+        progress(report)
+
+
+def _numbered(fileobj):
+    """Yields the line number and line of the lines in *fileobj* that are
+    not blank.
+
+    """
+    for number, line in enumerate(fileobj, 1):
+        if line.strip():
+            yield number, line
+
+
+def _chunks(iterable, size):
+    """Yields lists of up to *size* items from *iterable*."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_batches(numbered, batch_size, prepare):
+    """Yields (line numbers, documents, rejected) for each batch of the
+    *numbered* lines. The indexes of rejected documents refer to the line
+    numbers.
+
+    """
+    for chunk in _chunks(numbered, batch_size):
+        lines, parsed, rejected = [], [], []
+        for number, line in chunk:
+            index = len(lines)
+            lines.append(number)
+            try:
+                parsed.append((index, json_util.loads(line)))
+            except ValueError as e:
+                message = "is not valid JSON: %s" % e
+                rejected.append((index, [message], line.rstrip("\r\n")))
+
+        documents = [document for _, document in parsed]
+        if prepare is not None:
+            documents, invalid = prepare(documents)
+            valid = set(range(len(parsed))) - set(i for i, _ in invalid)
+            rejected.extend(
+                (parsed[i][0], messages, parsed[i][1])
+                for i, messages in invalid
+            )
+            parsed = [parsed[i] for i in sorted(valid)]
+
+        yield lines, zip([i for i, _ in parsed], documents), rejected
+
+
+def _write_batch(collection, documents, upsert):
+    """Writes the (index, document) pairs in *documents* to *collection* in
+    one unordered bulk operation. Returns (index, messages, document) for
+    the documents that could not be written.
+
+    """
+    if not documents:
+        return []
+
+    bulk = collection.initialize_unordered_bulk_op()
+    for _, document in documents:
+        if upsert and "_id" in document:
+            bulk.find({"_id": document["_id"]}).upsert().replace_one(document)
+        else:
+            bulk.insert(document)
+
+    try:
+        bulk.execute()
+    except BulkWriteError as e:
+        return [
+            (documents[error["index"]][0], [error["errmsg"]],
+             documents[error["index"]][1])
+            for error in e.details["writeErrors"]
+        ]
+    return []
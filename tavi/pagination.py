@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Provides keyset pagination: paging through documents in a fixed sort
+order by querying for the documents that come after the sort key of the last
+one seen, instead of skipping over all of the earlier ones.
+
+"""
+import base64
+import binascii
+from bson import json_util
+from tavi.errors import TaviError
+from tavi.utils import dump_json
+
+
+class Page(object):
+    """A page of Documents returned by *paginate*. *after* is the token to
+    pass to *paginate* to fetch the next page, or None if the page is empty,
+    and *has_next* tells if there are more Documents after this page.
+
+    """
+
+    def __init__(self, documents, after, has_next):
+        self.documents = documents
+        self.after = after
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __getitem__(self, index):
+        return self.documents[index]
+
+    def __repr__(self):
+        return "<Page %d document(s) has_next=%s>" % (
+            len(self.documents), self.has_next)
+
+
+def keyset_spec(spec, sort, last):
+    """Returns a query for the documents that match *spec* and come after
+    the sort key *last* in the order *sort*, a list of (key, direction)
+    pairs. *last* holds a value for each key in *sort*; null and missing
+    values sort before all others, as they do in Mongo.
+
+    """
+    if last is None:
+        return spec or {}
+
+    clauses = []
+    for i, (key, direction) in enumerate(sort):
+        clause = {k: value for (k, _), value in zip(sort[:i], last)}
+        if last[i] is None:
+            if direction < 0:
+                continue  # nothing sorts before null
+            clause[key] = {"$ne": None}
+        elif direction > 0:
+            clause[key] = {"$gt": last[i]}
+        else:
+            # Comparisons never match null, which sorts after every value in
+            # descending order.
+            clause["$or"] = [{key: {"$lt": last[i]}}, {key: None}]
+        clauses.append(clause)
+
+    condition = clauses[0] if 1 == len(clauses) else {"$or": clauses}
+    if not spec:
+        return condition
+    return {"$and": [spec, condition]}
+
+
+def sort_key(document, sort):
+    """Returns the values of the keys in *sort* for the raw *document*."""
+    return [document.get(key) for key, _ in sort]
+
+
+def encode_token(key):
+    """Encodes the sort key *key* as an opaque, URL safe token."""
+    return base64.urlsafe_b64encode(dump_json(key))
+
+
+def decode_token(token, sort):
+    """Decodes a token made by *encode_token* for the order *sort*. Raises a
+    TaviError if the token is not valid.
+
+    """
+    try:
+        key = json_util.loads(base64.urlsafe_b64decode(str(token)))
+    except (TypeError, ValueError, binascii.Error):
+        raise TaviError("Invalid pagination token: %r" % token)
+
+    if not isinstance(key, list) or len(key) != len(sort):
+        raise TaviError("Invalid pagination token: %r" % token)
+    return key
+
+
+def paginate(collection, build, spec, sort, after, limit):
+    """Implements tavi.documents.Document.paginate. *sort* uses Mongo names
+    and must end with _id.
+
+    """
+    last = decode_token(after, sort) if after else None
+    cursor = collection.find(keyset_spec(spec, sort, last))
+    results = list(cursor.sort(sort).limit(limit + 1))
+
+    has_next = len(results) > limit
+    results = results[:limit]
+
+    after = encode_token(sort_key(results[-1], sort)) if results else None
+    return Page([build(result) for result in results], after, has_next)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""Provides support for scanning large collections, either in parallel by
+splitting them into ranges of _ids, or in resumable batches using keyset
+pagination.
+
+"""
+import datetime
+import errno
+import multiprocessing
+import os
+import time
+from bson import json_util
+from multiprocessing.pool import ThreadPool
+from tavi.pagination import keyset_spec, sort_key
+from tavi.utils import bounded_map, dump_json
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_RANGE_SIZE = 10000
+SAMPLES_PER_PARTITION = 20
+
+
+def id_ranges(collection, spec, partitions):
+    """Splits the documents in *collection* that match *spec* into up to
+    *partitions* ranges of about the same size, ordered by _id. Returns a
+    list of (lower, upper) bounds, where *lower* is inclusive, *upper* is
+    exclusive and None means unbounded.
+
+    The bounds are picked from a random sample of the _ids, drawn with
+    $sample in a single aggregation, the same way the MongoDB Spark
+    connector's sample partitioner does. Without *spec* Mongo samples the
+    collection without scanning it; with one, the matching documents are
+    read once.
+
+    """
+    pipeline = [{"$match": spec}] if spec else []
+    pipeline.extend([
+        {"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+        {"$project": {"_id": True}}
+    ])
+    results = collection.aggregate(pipeline)
+    if isinstance(results, dict):  # pymongo < 3
+        results = results["result"]
+
+    ids = sorted(set(document["_id"] for document in results))
+    partitions = max(1, min(partitions, len(ids)))
+
+    bounds = [ids[i * len(ids) // partitions] for i in range(1, partitions)]
+    lowers = [None] + bounds
+    uppers = bounds + [None]
+    return zip(lowers, uppers)
+
+
+def range_spec(spec, lower, upper):
+    """Returns a query for the documents that match *spec* and have an _id
+    in the range from *lower* to *upper*.
+
+    """
+    condition = {}
+    if lower is not None:
+        condition["$gte"] = lower
+    if upper is not None:
+        condition["$lt"] = upper
+    if not condition:
+        return spec or {}
+    if not spec:
+        return {"_id": condition}
+    return {"$and": [spec, {"_id": condition}]}
+
+
+def parallel_scan(document_class, fn, spec=None, workers=4,
+                  processes=False, partitions=None, lazy=False):
+    """Implements tavi.documents.Document.parallel_scan."""
+    ranges = id_ranges(
+        document_class.collection, spec, partitions or workers * 4)
+
+    if processes:
+        pool = multiprocessing.Pool(
+            workers, _setup_worker, (document_class, fn, spec, lazy))
+        func = _scan_range
+    else:
+        pool = ThreadPool(workers)
+
+        def func(bounds):
+            return _apply(document_class, fn, spec, lazy, bounds)
+
+    for results in bounded_map(func, ranges, pool, workers * 2):
+        for result in results:
+            yield result
+
+
+def _apply(document_class, fn, spec, lazy, bounds):
+    """Calls *fn* with each Document in the range of _ids *bounds* and
+    returns the results that are not None. The results are collected in a
+    list, so their number is limited by the size of the range.
+
+    """
+    collection, build = document_class._finder(lazy)
+
+    results = []
+    for raw in collection.find(range_spec(spec, *bounds)):
+        result = fn(build(raw))
+        if result is not None:
+            results.append(result)
+    return results
+
+
+_worker = {}
+
+
+def _setup_worker(document_class, fn, spec, lazy):
+    """Sets up a worker process of *parallel_scan*."""
+    _worker.update(document_class=document_class, fn=fn, spec=spec, lazy=lazy)
+
+
+def _scan_range(bounds):
+    """Scans the range of _ids *bounds* in a worker process of
+    *parallel_scan*.
+
+    """
+    return _apply(
+        _worker["document_class"], _worker["fn"], _worker["spec"],
+        _worker["lazy"], bounds
+    )
+
+
+class FileCheckpoint(object):
+    """Stores the last key processed by a resumable scan as extended JSON in
+    the file at *path*.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Returns the stored key, or None if there is none."""
+        try:
+            with open(self.path) as f:
+                return json_util.loads(f.read())["key"]
+        except IOError as e:
+            if errno.ENOENT == e.errno:
+                return None
+            raise
+
+    def save(self, key):
+        """Stores *key*. The file is replaced atomically so a crash never
+        leaves a partial checkpoint behind.
+
+        """
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            f.write(dump_json({"key": key}))
+        os.rename(temp, self.path)
+
+    def clear(self):
+        """Removes the stored key."""
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            if errno.ENOENT != e.errno:
+                raise
+
+
+class CollectionCheckpoint(object):
+    """Stores the last key processed by a resumable scan in the document with
+    the _id *name* in the pymongo *collection*.
+
+    """
+
+    def __init__(self, collection, name):
+        self.collection = collection
+        self.name = name
+
+    def load(self):
+        """Returns the stored key, or None if there is none."""
+        document = self.collection.find_one({"_id": self.name})
+        return document["key"] if document else None
+
+    def save(self, key):
+        """Stores *key*."""
+        self.collection.update(
+            {"_id": self.name},
+            {"$set": {"key": key, "saved_at": datetime.datetime.utcnow()}},
+            upsert=True
+        )
+
+    def clear(self):
+        """Removes the stored key."""
+        self.collection.remove({"_id": self.name})
+
+
+class ScanReport(object):
+    """Keeps track of the progress of a resumable scan. *key* is the last key
+    processed and the *batch_* attributes describe the last batch.
+
+    """
+
+    def __init__(self):
+        self.batches = 0
+        self.scanned = 0
+        self.key = None
+        self.batch_size = 0
+        self.batch_elapsed = 0.0
+        self._started = time.time()
+
+    @property
+    def elapsed(self):
+        """Returns the number of seconds since the scan started."""
+        return time.time() - self._started
+
+    @property
+    def rate(self):
+        """Returns the number of documents scanned per second."""
+        elapsed = self.elapsed
+        return self.scanned / elapsed if elapsed else 0.0
+
+    @property
+    def batch_rate(self):
+        """Returns the number of documents per second in the last batch."""
+        if not self.batch_elapsed:
+            return 0.0
+        return self.batch_size / self.batch_elapsed
+
+    def add(self, size, key, elapsed):
+        """Records that a batch of *size* documents, ending with *key*, was
+        scanned in *elapsed* seconds.
+
+        """
+        self.batches += 1
+        self.scanned += size
+        self.key = key
+        self.batch_size = size
+        self.batch_elapsed = elapsed
+
+    def __repr__(self):
+        return "<ScanReport batches=%d scanned=%d (%.0f/s)>" % (
+            self.batches, self.scanned, self.rate)
+
+
+def keyset_sort(key):
+    """Returns the sort order used to page through documents by *key*."""
+    if "_id" == key:
+        return [("_id", 1)]
+    return [(key, 1), ("_id", 1)]
+
+
+def keyset_scan(document_class, spec=None, key="_id",
+                batch_size=DEFAULT_BATCH_SIZE, checkpoint=None, lazy=False,
+                progress=None):
+    """Implements tavi.documents.Document.scan. *key* is the Mongo name of
+    the field to page by. The checkpoint holds the sort key of the last
+    document processed, as returned by *sort_key*.
+
+    """
+    collection, build = document_class._finder(lazy)
+    sort = keyset_sort(key)
+    last = checkpoint.load() if checkpoint else None
+    report = ScanReport()
+
+    while True:
+        started = time.time()
+        cursor = collection.find(keyset_spec(spec, sort, last))
+        batch = list(cursor.sort(sort).limit(batch_size))
+        if not batch:
+            break
+
+        for raw in batch:
+            yield build(raw)
+
+        last = sort_key(batch[-1], sort)
+
+        if checkpoint:
+            checkpoint.save(last)
+
+        report.add(len(batch), last, time.time() - started)
+        if progress:
+            progress(report)
+
+        if len(batch) < batch_size:
+            break
+
+    if checkpoint:
+        checkpoint.clear()
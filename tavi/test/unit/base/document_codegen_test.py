@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+from bson import ObjectId
+from tavi.base.documents import BaseDocument, get_field_attr, set_field_attr
+from tavi.documents import EmbeddedDocument
+from tavi import fields
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street")
+    city = fields.StringField("city", default="Anywhere")
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+    price = fields.FloatField("price")
+
+
+class Sample(BaseDocument):
+    name = fields.StringField("name", required=True)
+    status = fields.StringField("my_status", default="active")
+    active = fields.BooleanField("active")
+    count = fields.IntegerField("count")
+    price = fields.FloatField("price")
+    sold_on = fields.DateTimeField("sold_on")
+    ref = fields.ObjectIdField("ref")
+    tags = fields.ArrayField("tags")
+    address = fields.EmbeddedField("address", Address)
+    lines = fields.ListField("lines", Line)
+
+
+class GenericSample(BaseDocument):
+    """Same fields as Sample, but hydrated through *set_field_attr*."""
+    name = fields.StringField("name", required=True)
+    status = fields.StringField("my_status", default="active")
+    active = fields.BooleanField("active")
+    count = fields.IntegerField("count")
+    price = fields.FloatField("price")
+    sold_on = fields.DateTimeField("sold_on")
+    ref = fields.ObjectIdField("ref")
+    tags = fields.ArrayField("tags")
+    address = fields.EmbeddedField("address", Address)
+    lines = fields.ListField("lines", Line)
+
+    def _hydrate(self, kwargs):
+        for field in self.fields:
+            set_field_attr(self, field, kwargs.get(field))
+
+
+def generic_field_values(doc):
+    return {field: get_field_attr(doc, field) for field in doc.fields}
+
+
+def generic_mongo_field_values(doc):
+    return {
+        v.name: get_field_attr(doc, k)
+        for k, v in doc._field_descriptors.items()
+    }
+
+
+class DocumentCodegenTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentCodegenTest, self).setUp()
+        self.attrs = {
+            "name": "  John  ",
+            "active": True,
+            "count": 3,
+            "price": 9.99,
+            "sold_on": datetime.datetime(2013, 8, 25, 22, 24, 0),
+            "ref": str(ObjectId()),
+            "tags": ["a", "b"],
+            "address": {"street": "123 Elm Street"},
+            "lines": [
+                {"quantity": 1, "price": 1.5},
+                {"quantity": 2, "price": 3.0}
+            ]
+        }
+
+    def assert_matches_generic(self, attrs):
+        compiled = Sample(**attrs)
+        generic = GenericSample(**attrs)
+
+        self.assertEqual(generic_field_values(generic), compiled.field_values)
+        self.assertEqual(
+            generic_mongo_field_values(generic),
+            compiled.mongo_field_values
+        )
+        self.assertEqual(
+            generic.errors.full_messages,
+            compiled.errors.full_messages
+        )
+
+    def test_matches_generic_path_with_all_fields(self):
+        self.assert_matches_generic(self.attrs)
+
+    def test_matches_generic_path_with_no_fields(self):
+        self.assert_matches_generic({})
+
+    def test_matches_generic_path_with_invalid_values(self):
+        self.attrs.update(name=None, count="three", price="free")
+        self.assert_matches_generic(self.attrs)
+
+    def test_field_values_use_attribute_names(self):
+        sample = Sample(**self.attrs)
+        self.assertEqual("active", sample.field_values["status"])
+        self.assertEqual("active", sample.mongo_field_values["my_status"])
+
+    def test_empty_list_field_is_none(self):
+        sample = Sample(name="John")
+        self.assertIsNone(sample.field_values["lines"])
+
+    def test_hydrates_list_field(self):
+        sample = Sample(**self.attrs)
+        self.assertEqual([1, 2], [line.quantity for line in sample.lines])
+
+    def test_list_field_must_be_a_sequence(self):
+        with self.assertRaises(ValueError) as exc:
+            Sample(lines="not a list")
+
+        self.assertEqual(
+            "ListField value must be a sequence.",
+            exc.exception.message
+        )
+
+    def test_fields_with_unusual_attribute_names(self):
+        UnusualSample = type("UnusualSample", (BaseDocument,), {
+            "class": fields.StringField("class"),
+            "first-name": fields.StringField("first_name")
+        })
+
+        sample = UnusualSample(**{"class": "A", "first-name": "John"})
+        self.assertEqual(
+            {"class": "A", "first-name": "John"},
+            sample.field_values
+        )
+        self.assertEqual(
+            {"class": "A", "first_name": "John"},
+            sample.mongo_field_values
+        )
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi.base.documents import BaseDocument, validation
+from tavi.errors import TaviError
+from tavi.fields import ArrayField, IntegerField, StringField
+
+
+class Sample(BaseDocument):
+    name = StringField("name", required=True)
+    age = IntegerField("age", min_value=0)
+    status = StringField("my_status", choices=["Good", "Bad"])
+    tags = ArrayField("tags", max_length=2)
+
+
+class DeferredSample(Sample):
+    __validation__ = "deferred"
+
+    name = StringField("name", required=True)
+    age = IntegerField("age", min_value=0)
+    status = StringField("my_status", choices=["Good", "Bad"])
+    tags = ArrayField("tags", max_length=2)
+
+
+class BaseDocumentDeferredValidationTest(unittest.TestCase):
+    def setUp(self):
+        super(BaseDocumentDeferredValidationTest, self).setUp()
+        self.attrs = {"age": -1, "status": "Ugly", "tags": ["a", "b", "c"]}
+
+    def test_does_not_validate_on_assignment(self):
+        sample = DeferredSample(**self.attrs)
+        sample.age = -2
+        self.assertEqual(0, sample.errors.count)
+
+    def test_validates_once_when_checked(self):
+        sample = DeferredSample(**self.attrs)
+        self.assertFalse(sample.valid)
+        self.assertEqual(
+            sorted(Sample(**self.attrs).errors.full_messages),
+            sorted(sample.errors.full_messages)
+        )
+
+    def test_only_validates_assigned_fields(self):
+        sample = DeferredSample(name="John", status="Good")
+        self.assertTrue(sample.valid)
+
+        sample.age = -1
+        self.assertEqual(
+            set([DeferredSample._field_descriptors["age"]]),
+            sample._unvalidated
+        )
+        self.assertFalse(sample.valid)
+        self.assertEqual(
+            ["Age is too small (minimum is 0)"],
+            sample.errors.full_messages
+        )
+        self.assertEqual(set(), sample._unvalidated)
+
+    def test_validates_the_last_assigned_value(self):
+        sample = DeferredSample(name="John", status="Good", age=-1)
+        sample.age = 1
+        self.assertTrue(sample.valid, sample.errors.full_messages)
+
+    def test_validation_context(self):
+        with validation("deferred"):
+            sample = Sample(**self.attrs)
+
+        self.assertEqual(0, sample.errors.count)
+        self.assertFalse(sample.valid)
+        self.assertEqual(4, sample.errors.count)
+
+        sample.age = -1
+        self.assertEqual(1, len(sample.errors.get("age")))
+
+    def test_validation_context_overrides_class(self):
+        with validation("immediate"):
+            sample = DeferredSample(**self.attrs)
+        self.assertEqual(4, sample.errors.count)
+
+    def test_unknown_validation_mode(self):
+        with self.assertRaises(TaviError):
+            with validation("never"):
+                pass
+
+        with self.assertRaises(TaviError):
+            type("BadSample", (BaseDocument,), {"__validation__": "never"})
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson import ObjectId
+from tavi.base.documents import BaseDocument
+from tavi.documents import EmbeddedDocument
+from tavi import fields
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity", min_value=1)
+
+
+class Sample(BaseDocument):
+    name = fields.StringField("name", required=True, max_length=5)
+    code = fields.StringField("code", pattern="^[A-Z]+$")
+    status = fields.StringField(
+        "my_status", default="Good", choices=["Good", "Bad"])
+    age = fields.IntegerField("age", min_value=0, max_value=120)
+    price = fields.FloatField("price", min_value=0.5)
+    ref = fields.ObjectIdField("ref")
+    tags = fields.ArrayField("tags", max_length=2)
+    lines = fields.ListField("lines", Line)
+
+
+class Range(BaseDocument):
+    low = fields.IntegerField("low", required=True)
+    high = fields.IntegerField("high")
+
+    def __validate__(self):
+        if self.high is not None and self.high < self.low:
+            self.errors.add("high", "must not be less than low")
+
+
+class EvenField(fields.IntegerField):
+    def validate(self, instance, value):
+        super(EvenField, self).validate(instance, value)
+        if value is not None and value % 2 and not instance.odd_allowed:
+            instance.errors.add(self.name, "must be even")
+
+
+class Pair(BaseDocument):
+    odd_allowed = False
+    count = EvenField("count")
+
+
+class BaseDocumentValidateManyTest(unittest.TestCase):
+    def setUp(self):
+        super(BaseDocumentValidateManyTest, self).setUp()
+        self.rows = [
+            {"name": "John", "age": 42, "price": 1, "ref": str(ObjectId())},
+            {"name": "  ", "age": -1, "price": 0.25},
+            {"name": "Johnny", "code": "abc", "status": "Ugly"},
+            {"name": "Joe", "age": "old", "price": "free", "ref": "nope"},
+            {"name": "Jim", "age": 121, "tags": ["a", "b", "c"]},
+            {"name": "Jane", "age": 2 ** 70, "lines": [{"quantity": 0}]}
+        ]
+
+    def test_reports_the_same_errors_as_documents(self):
+        report = Sample.validate_many(self.rows)
+
+        for row, attrs in enumerate(self.rows):
+            self.assertEqual(
+                sorted(Sample(**attrs).errors.full_messages),
+                sorted(report.full_messages_for(row)),
+                "row %s" % row
+            )
+
+    def test_reports_invalid_rows(self):
+        report = Sample.validate_many(self.rows)
+        self.assertEqual([1, 2, 3, 4, 5], report.rows)
+        self.assertEqual(
+            [("my_status", "value must be in list")],
+            [e for e in report.get(2) if e[0] == "my_status"]
+        )
+        self.assertEqual([], report.get(0))
+
+    def test_accepts_any_iterable(self):
+        report = Sample.validate_many(iter(self.rows))
+        self.assertEqual([1, 2, 3, 4, 5], report.rows)
+
+    def test_with_no_rows(self):
+        self.assertEqual(0, Sample.validate_many([]).count)
+
+    def test_runs_model_validations_for_each_row(self):
+        rows = [{"low": 1, "high": 2}, {"low": 3, "high": 2}, {"high": 1}]
+        report = Range.validate_many(rows)
+
+        self.assertEqual([1, 2], report.rows)
+        for row, attrs in enumerate(rows):
+            document = Range(**attrs)
+            document.valid
+            self.assertEqual(
+                document.errors.full_messages, report.full_messages_for(row))
+        self.assertEqual(
+            ["High must not be less than low"], report.full_messages_for(1))
+
+    def test_passes_documents_to_overridden_field_validations(self):
+        report = Pair.validate_many([{"count": 2}, {"count": 3}])
+        self.assertEqual([1], report.rows)
+        self.assertEqual(["Count must be even"], report.full_messages_for(1))
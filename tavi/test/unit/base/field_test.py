@@ -90,3 +90,24 @@ class BaseFieldTest(unittest.TestCase):
         t = Target()
         t.f = None
         self.assertEqual(1, t.f)
+
+    def test_validates_unhashable_values_against_choices(self):
+        class Target(object):
+            f = BaseField("my_field", choices=["type_a", ["type_b"]])
+            errors = Errors()
+
+        t = Target()
+        t.f = ["type_b"]
+        self.assertEqual(0, t.errors.count)
+
+        t.f = ["type_c"]
+        self.assertEqual(
+            ["My Field value must be in list"],
+            t.errors.full_messages
+        )
+
+    def test_only_builds_validators_for_configured_constraints(self):
+        self.assertEqual([], self.field.build_validators())
+
+        field = BaseField("my_field", required=True, choices=["type_a"])
+        self.assertEqual(2, len(field.build_validators()))
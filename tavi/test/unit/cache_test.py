@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import unittest
+from tavi.utils.cache import ExpiringCache
+
+
+class ExpiringCacheTest(unittest.TestCase):
+    def setUp(self):
+        super(ExpiringCacheTest, self).setUp()
+        self.now = 0
+        self.cache = ExpiringCache(max_size=3, clock=lambda: self.now)
+
+    def test_get_returns_fresh_values(self):
+        self.cache.set("a", 1)
+        self.now = 9
+        self.assertEqual(1, self.cache.get("a", 10))
+
+    def test_get_removes_expired_values(self):
+        self.cache.set("a", 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get("a", 10))
+        self.assertEqual(0, len(self.cache))
+
+    def test_set_removes_values_older_than_longest_max_age(self):
+        self.cache.get("a", 10)
+        self.cache.set("a", 1)
+        self.now = 5
+        self.cache.set("b", 2)
+        self.now = 10
+        self.cache.set("c", 3)
+
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(2, self.cache.get("b", 10))
+
+    def test_evicts_least_recently_used_values(self):
+        for key in ("a", "b", "c"):
+            self.cache.set(key, key)
+        self.cache.get("a", 10)
+        self.cache.set("d", "d")
+
+        self.assertEqual(3, len(self.cache))
+        self.assertIsNone(self.cache.get("b", 10))
+        self.assertEqual("a", self.cache.get("a", 10))
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import multiprocessing
+import os
 import unittest
 from pymongo import MongoClient
 from tavi import Connection
@@ -22,3 +24,39 @@ class ConnectionTest(unittest.TestCase):
     def test_has_a_client_attribute(self):
         Connection.setup("test_database", host="mongodb://localhost:27017")
         self.assertEqual(self.client, Connection.client)
+
+    def test_keeps_settings(self):
+        Connection.setup("test_database", host="localhost", port=27017)
+        self.assertEqual(
+            ("test_database", {"host": "localhost", "port": 27017}),
+            Connection.settings
+        )
+
+    def test_reset(self):
+        Connection.setup("test_database")
+        Connection.reset()
+        self.assertIsNone(Connection._client)
+
+        self.assertEqual(self.db, Connection.database)
+        self.assertEqual(os.getpid(), Connection._pid)
+
+    def test_connects_again_in_another_process(self):
+        Connection.setup("test_database")
+        Connection._pid = os.getpid() + 1
+
+        self.assertEqual(self.db, Connection.database)
+        self.assertEqual(os.getpid(), Connection._pid)
+
+    def test_connects_again_in_forked_process(self):
+        Connection.setup("test_database")
+        results = multiprocessing.Queue()
+
+        def child():
+            Connection.database
+            results.put(Connection._pid == os.getpid())
+
+        process = multiprocessing.Process(target=child)
+        process.start()
+        process.join()
+        self.assertTrue(results.get(timeout=5))
+        self.assertEqual(os.getpid(), Connection._pid)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import unittest
+from pymongo import MongoClient
+from tavi.aggregation import translate
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+
+class Address(EmbeddedDocument):
+    city = fields.StringField("city")
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    status = fields.StringField("my_status")
+    price = fields.FloatField("unit_price")
+    address = fields.EmbeddedField("addr", Address)
+
+
+class Total(EmbeddedDocument):
+    status = fields.StringField("status")
+    total = fields.FloatField("total")
+
+
+class DocumentAggregateTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentAggregateTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.db.samples.insert([
+            {"name": "a", "my_status": "open", "unit_price": 1.5},
+            {"name": "b", "my_status": "open", "unit_price": 2.0},
+            {"name": "c", "my_status": "closed", "unit_price": 4.0}
+        ])
+        self.pipeline = [
+            {"$match": {"price": {"$gt": 1.0}}},
+            {"$group": {"_id": "$status", "total": {"$sum": "$price"}}},
+            {"$sort": {"total": 1}}
+        ]
+
+    def test_translates_attribute_names(self):
+        self.assertEqual(
+            [
+                {"$match": {"unit_price": {"$gt": 1.0}}},
+                {"$group": {
+                    "_id": "$my_status", "total": {"$sum": "$unit_price"}
+                }},
+                {"$sort": {"total": 1}}
+            ],
+            translate(Sample, self.pipeline)
+        )
+
+    def test_translates_queries_and_projections(self):
+        pipeline = [
+            {"$match": {"$or": [{"status": "open"}, {"_id": 1}],
+                        "address.city": "Here"}},
+            {"$project": {"name": 1, "status": {"$toUpper": "$status"},
+                          "note": "$$ROOT"}},
+            {"$sort": {"price": -1}},
+            {"$unset": ["price"]}
+        ]
+        self.assertEqual(
+            [
+                {"$match": {"$or": [{"my_status": "open"}, {"_id": 1}],
+                            "addr.city": "Here"}},
+                {"$project": {"name": 1,
+                              "my_status": {"$toUpper": "$my_status"},
+                              "note": "$$ROOT"}},
+                {"$sort": {"unit_price": -1}},
+                {"$unset": ["unit_price"]}
+            ],
+            translate(Sample, pipeline)
+        )
+
+    def test_aggregate(self):
+        self.assertEqual(
+            [{"_id": "open", "total": 3.5}, {"_id": "closed", "total": 4.0}],
+            list(Sample.aggregate(self.pipeline))
+        )
+
+    def test_aggregate_hydrates_result_class(self):
+        pipeline = self.pipeline + [
+            {"$project": {"_id": 0, "status": "$_id", "total": 1}}
+        ]
+        results = list(Sample.aggregate(pipeline, hydrate=Total))
+        self.assertEqual(["open", "closed"], [r.status for r in results])
+        self.assertEqual([3.5, 4.0], [r.total for r in results])
+
+    def test_aggregate_hydrates_documents(self):
+        results = list(Sample.aggregate(
+            [{"$match": {"status": "open"}}, {"$sort": {"name": 1}}],
+            hydrate=True
+        ))
+        self.assertEqual(["a", "b"], [r.name for r in results])
+        self.assertEqual([1.5, 2.0], [r.price for r in results])
+
+    def test_aggregate_hydrates_with_callable(self):
+        results = Sample.aggregate(self.pipeline, hydrate=lambda r: r["_id"])
+        self.assertEqual(["open", "closed"], list(results))
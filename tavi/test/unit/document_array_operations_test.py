@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from tavi.documents import Document, EmbeddedDocument
+from tavi.commands import Update
+from tavi.errors import TaviError
+from tavi.utils import dump_json
+from tavi import fields
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity", min_value=1)
+
+
+class StampedLine(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+
+
+class StampedSample(Document):
+    name = fields.StringField("name")
+    lines = fields.ListField("lines", StampedLine)
+
+
+class DocumentArrayOperationsTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name")
+        tags = fields.ArrayField("tags", max_length=4)
+        lines = fields.ListField("lines", Line)
+
+    def setUp(self):
+        super(DocumentArrayOperationsTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.id = self.db.samples.insert({
+            "name": "John",
+            "tags": ["a", "b"],
+            "lines": [{"quantity": 1}, {"quantity": 2}]
+        })
+        self.sample = self.Sample.find_by_id(self.id)
+
+    def stored(self):
+        return self.db.samples.find_one(self.id)
+
+    def update_document(self):
+        return Update(self.sample)._update_document()
+
+    def test_saving_appended_items_pushes(self):
+        self.sample.tags.append("c")
+        self.sample.lines.append(Line(quantity=3))
+
+        document = self.update_document()
+        self.assertEqual(
+            {"tags": {"$each": ["c"]}, "lines": {"$each": [{"quantity": 3}]}},
+            document["$push"]
+        )
+        self.assertNotIn("$set", document)
+
+        assert self.sample.save(), self.sample.errors.full_messages
+        self.assertEqual(["a", "b", "c"], self.stored()["tags"])
+        self.assertEqual(
+            [1, 2, 3],
+            [line["quantity"] for line in self.stored()["lines"]]
+        )
+
+    def test_saving_removed_items_pulls(self):
+        self.sample.tags.remove("a")
+        del self.sample.lines[1]
+
+        document = self.update_document()
+        self.assertEqual(
+            {"tags": {"$in": ["a"]}, "lines": {"quantity": 2}},
+            document["$pull"]
+        )
+
+        assert self.sample.save(), self.sample.errors.full_messages
+        self.assertEqual(["b"], self.stored()["tags"])
+        self.assertEqual([{"quantity": 1}], self.stored()["lines"])
+
+    def test_saving_changed_items_sets_by_position(self):
+        self.sample.tags[1] = "z"
+        self.sample.lines[0].quantity = 7
+
+        document = self.update_document()
+        self.assertEqual("z", document["$set"]["tags.1"])
+        self.assertEqual({"quantity": 7}, document["$set"]["lines.0"])
+
+        assert self.sample.save(), self.sample.errors.full_messages
+        self.assertEqual(["a", "z"], self.stored()["tags"])
+        self.assertEqual(
+            [7, 2],
+            [line["quantity"] for line in self.stored()["lines"]]
+        )
+
+    def test_saving_unchanged_arrays(self):
+        self.assertEqual({}, self.update_document())
+
+    def test_saving_reassigned_array_sets(self):
+        self.sample.tags = ["x"]
+        self.assertEqual(["x"], self.update_document()["$set"]["tags"])
+
+    def test_tracks_changes_after_save(self):
+        self.sample.tags.append("c")
+        assert self.sample.save(), self.sample.errors.full_messages
+
+        self.sample.tags.append("d")
+        self.assertEqual(
+            {"tags": {"$each": ["d"]}},
+            self.update_document()["$push"]
+        )
+
+    def test_new_documents_are_inserted_with_arrays(self):
+        sample = self.Sample(name="Joe", tags=["a"])
+        sample.lines.append(Line(quantity=1))
+        assert sample.save(), sample.errors.full_messages
+
+        actual = self.db.samples.find_one(sample.bson_id)
+        self.assertEqual(["a"], actual["tags"])
+        self.assertEqual([{"quantity": 1}], actual["lines"])
+
+    def test_push(self):
+        self.assertTrue(self.sample.push("lines", Line(quantity=3)))
+        self.assertTrue(self.sample.push("tags", "c", "d"))
+
+        self.assertEqual(["a", "b", "c", "d"], self.stored()["tags"])
+        self.assertEqual(
+            [1, 2, 3],
+            [line["quantity"] for line in self.stored()["lines"]]
+        )
+        self.assertEqual(["a", "b", "c", "d"], self.sample.tags)
+        self.assertEqual(3, len(self.sample.lines))
+        self.assertEqual({}, self.sample.lines.update_operations("lines"))
+
+    def test_push_with_slice(self):
+        self.assertTrue(self.sample.push("tags", "c", slice=-2))
+        self.assertEqual(["b", "c"], self.stored()["tags"])
+        self.assertEqual(["b", "c"], self.sample.tags)
+
+    def test_push_does_not_save_other_changes(self):
+        self.sample.name = "Joe"
+        self.sample.push("tags", "c")
+        self.assertEqual("John", self.stored()["name"])
+
+    def test_push_invalid_items(self):
+        self.assertFalse(self.sample.push("lines", Line(quantity=0)))
+        self.assertFalse(self.sample.push("tags", "c", "d", "e"))
+        self.assertEqual(
+            [1, 2],
+            [line["quantity"] for line in self.stored()["lines"]]
+        )
+        self.assertEqual(["a", "b"], self.stored()["tags"])
+
+    def test_pull(self):
+        self.sample.pull("tags", "a")
+        self.sample.pull("lines", Line(quantity=2))
+
+        self.assertEqual(["b"], self.stored()["tags"])
+        self.assertEqual([{"quantity": 1}], self.stored()["lines"])
+        self.assertEqual(["b"], self.sample.tags)
+        self.assertEqual([1], [line.quantity for line in self.sample.lines])
+
+    def test_unsaved_documents_cannot_push(self):
+        with self.assertRaises(TaviError):
+            self.Sample().push("tags", "a")
+
+    def test_saving_hand_built_document_with_id_writes_arrays(self):
+        sample = self.Sample(
+            _id=ObjectId(), name="Jane", tags=["a", "b"],
+            lines=[Line(quantity=1)]
+        )
+        sample.lines.append(Line(quantity=2))
+        assert sample.save(), sample.errors.full_messages
+
+        stored = self.db.samples.find_one(sample.bson_id)
+        self.assertEqual(["a", "b"], stored["tags"])
+        self.assertEqual(
+            [1, 2], [line["quantity"] for line in stored["lines"]])
+
+    def test_saving_document_from_json_writes_arrays(self):
+        sample = self.Sample.from_json(dump_json({
+            "_id": ObjectId(), "name": "Jane", "tags": ["a"],
+            "lines": [{"quantity": 1}]
+        }))
+        assert sample.save(), sample.errors.full_messages
+
+        stored = self.db.samples.find_one(sample.bson_id)
+        self.assertEqual(["a"], stored["tags"])
+        self.assertEqual([{"quantity": 1}], stored["lines"])
+
+    def test_stamping_read_lines_does_not_set_them(self):
+        _id = self.db.stamped_samples.insert({
+            "name": "John", "lines": [{"quantity": 1}, {"quantity": 2}]})
+        sample = StampedSample.find_by_id(_id)
+        self.assertEqual([1, 2], [line.quantity for line in sample.lines])
+        sample.lines.append(StampedLine(quantity=3))
+
+        update = Update(sample)
+        update.stamp()
+        document = update.write_operation()[2]
+        self.assertEqual(["$push"], document.keys())
+        pushed = document["$push"]["lines"]["$each"]
+        self.assertEqual([3], [line["quantity"] for line in pushed])
+        self.assertIsNotNone(sample.lines[2].last_modified_at)
+        self.assertIsNone(sample.lines[0].last_modified_at)
+
+        assert sample.save(), sample.errors.full_messages
+        stored = self.db.stamped_samples.find_one(_id)["lines"]
+        self.assertEqual([1, 2, 3], [line["quantity"] for line in stored])
+
+    def test_stamping_read_lines_on_scalar_change(self):
+        _id = self.db.stamped_samples.insert({
+            "name": "John", "lines": [{"quantity": 1}, {"quantity": 2}]})
+        sample = StampedSample.find_by_id(_id)
+        sample.lines[0].quantity
+        sample.lines[1].quantity = 5
+        sample.name = "Jane"
+
+        update = Update(sample)
+        update.stamp()
+        document = update.write_operation()[2]
+        self.assertEqual(
+            set(["name", "lines.1"]), set(document["$set"]))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviError, TaviValidationError
+from tavi import fields
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+
+
+class Product(Document):
+    name = fields.StringField("name")
+    sku = fields.StringField("sku")
+    stock = fields.IntegerField("stock", min_value=0, max_value=10)
+    price = fields.FloatField("price")
+    checked_at = fields.DateTimeField("checked")
+    lines = fields.ListField("lines", Line)
+
+
+class DocumentAtomicUpdateTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentAtomicUpdateTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.id = self.db.products.insert(
+            {"name": "Widget", "sku": "123", "stock": 1, "price": 5.0})
+
+    def stored(self):
+        return self.db.products.find_one(self.id)
+
+    def test_update_one_increments(self):
+        self.assertTrue(Product.update_one({"sku": "123"}, inc={"stock": 1}))
+        self.assertEqual(2, self.stored()["stock"])
+
+    def test_update_one_does_not_increment_out_of_range(self):
+        self.assertTrue(Product.update_one({"sku": "123"}, inc={"stock": -1}))
+        self.assertFalse(Product.update_one({"sku": "123"}, inc={"stock": -1}))
+        self.assertEqual(0, self.stored()["stock"])
+
+    def test_update_one_by_id(self):
+        self.assertTrue(Product.update_one(self.id, set={"name": " Gadget "}))
+        self.assertEqual("Gadget", self.stored()["name"])
+
+    def test_update_one_min_and_max(self):
+        Product.update_one(self.id, min={"price": 3.0}, max={"stock": 4})
+        self.assertEqual(3.0, self.stored()["price"])
+        self.assertEqual(4, self.stored()["stock"])
+
+    def test_update_one_current_date(self):
+        Product.update_one(self.id, current_date=["checked_at"])
+        self.assertIsInstance(self.stored()["checked"], datetime.datetime)
+
+    def test_update_one_with_no_match(self):
+        self.assertFalse(Product.update_one({"sku": "456"}, inc={"stock": 1}))
+
+    def test_update_one_validates_operands(self):
+        with self.assertRaises(TaviValidationError) as exc:
+            Product.update_one(
+                self.id, set={"stock": 11}, inc={"price": "free"})
+
+        self.assertEqual(
+            ["Price must be incremented by a float",
+             "Stock is too big (maximum is 10)"],
+            sorted(exc.exception.errors.full_messages)
+        )
+        self.assertEqual(1, self.stored()["stock"])
+
+    def test_update_one_rejects_unknown_and_list_fields(self):
+        with self.assertRaises(TaviError):
+            Product.update_one(self.id, set={"colour": "red"})
+        with self.assertRaises(TaviError):
+            Product.update_one(self.id, set={"lines": []})
+
+    def test_find_one_and_update(self):
+        product = Product.find_one_and_update(
+            {"sku": "123"}, inc={"stock": 2})
+        self.assertEqual(3, product.stock)
+        self.assertEqual(self.id, product.bson_id)
+
+    def test_find_one_and_update_returns_original(self):
+        product = Product.find_one_and_update(
+            {"sku": "123"}, new=False, inc={"stock": 2})
+        self.assertEqual(1, product.stock)
+
+    def test_find_one_and_update_with_no_match(self):
+        self.assertIsNone(
+            Product.find_one_and_update({"sku": "456"}, inc={"stock": 1}))
+
+    def test_update(self):
+        product = Product.find_by_id(self.id)
+        product.name = "Gadget"
+
+        self.assertTrue(product.update(inc={"stock": 4}))
+        self.assertEqual(5, product.stock)
+        self.assertEqual(5, self.stored()["stock"])
+        self.assertEqual("Widget", self.stored()["name"])
+        self.assertEqual(set(["name"]), product.changed_fields)
+
+    def test_update_with_invalid_operands(self):
+        product = Product.find_by_id(self.id)
+        self.assertFalse(product.update(inc={"stock": 1.5}))
+        self.assertEqual(
+            ["Stock must be incremented by a integer"],
+            product.errors.full_messages
+        )
+
+    def test_update_out_of_range(self):
+        product = Product.find_by_id(self.id)
+        self.assertFalse(product.update(inc={"stock": 10}))
+        self.assertEqual(1, product.stock)
+
+    def test_unsaved_documents_cannot_update(self):
+        with self.assertRaises(TaviError):
+            Product().update(inc={"stock": 1})
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from tavi.commands import Update
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street")
+    city = fields.StringField("city")
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    status = fields.StringField("my_status")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+    address = fields.EmbeddedField("address", Address)
+
+
+class DocumentChangeDetectionTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentChangeDetectionTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.id = self.db.samples.insert({
+            "name": "John",
+            "my_status": "active",
+            "address": {"street": "123 Elm Street", "city": "Anywhere"}
+        })
+
+    def stored(self):
+        return self.db.samples.find_one(self.id)
+
+    def test_unchanged_document_is_not_written(self):
+        sample = Sample.find_by_id(self.id)
+        self.db.samples.update({"_id": self.id}, {"$set": {"name": "Joe"}})
+
+        self.assertTrue(sample.save())
+        self.assertEqual("Joe", self.stored()["name"])
+        self.assertNotIn("last_modified_at", self.stored())
+
+    def test_unchanged_lazy_document_is_not_written(self):
+        sample = Sample.find_by_id(self.id, lazy=True)
+        sample.name
+        self.assertEqual({}, sample.changed_values())
+        self.assertFalse(Update(sample).has_changes())
+
+    def test_sets_only_changed_fields(self):
+        sample = Sample.find_by_id(self.id)
+        sample.status = "inactive"
+
+        self.assertEqual({"my_status": "inactive"}, sample.changed_values())
+
+        self.db.samples.update({"_id": self.id}, {"$set": {"name": "Joe"}})
+        assert sample.save(), sample.errors.full_messages
+        self.assertEqual("Joe", self.stored()["name"])
+        self.assertEqual("inactive", self.stored()["my_status"])
+        self.assertIsNotNone(self.stored()["last_modified_at"])
+
+    def test_sets_changed_paths_of_embedded_documents(self):
+        sample = Sample.find_by_id(self.id, lazy=True)
+        sample.address.street = "456 Pine Street"
+
+        self.assertEqual(
+            {"address.street": "456 Pine Street"},
+            sample.changed_values()
+        )
+
+        assert sample.save(), sample.errors.full_messages
+        self.assertEqual(
+            {"street": "456 Pine Street", "city": "Anywhere"},
+            self.stored()["address"]
+        )
+
+    def test_saved_document_is_not_written_again(self):
+        sample = Sample(name="Jane")
+        assert sample.save(), sample.errors.full_messages
+        last_modified_at = self.db.samples.find_one(
+            sample.bson_id)["last_modified_at"]
+
+        self.assertEqual({}, sample.changed_values())
+        self.assertTrue(sample.save())
+        self.assertEqual(
+            last_modified_at,
+            self.db.samples.find_one(sample.bson_id)["last_modified_at"]
+        )
+
+    def test_document_with_new_id_is_upserted(self):
+        sample = Sample(name="Jane")
+        sample._id = ObjectId()
+        self.assertIn("name", sample.changed_values())
+
+        assert sample.save(), sample.errors.full_messages
+        self.assertEqual(
+            "Jane",
+            self.db.samples.find_one(sample.bson_id)["name"]
+        )
+
+    def test_atomic_update_refreshes_snapshot(self):
+        sample = Sample.find_by_id(self.id)
+        assert sample.update(set={"status": "closed"})
+        self.assertEqual({}, sample.changed_values())
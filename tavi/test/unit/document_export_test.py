@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from pymongo import MongoClient
+from tavi import cli
+from tavi.documents import Document
+from tavi import fields
+
+
+class DocumentExportTest(unittest.TestCase):
+    class Sample(Document):
+        name = fields.StringField("name")
+        status = fields.StringField("my_status")
+
+    def setUp(self):
+        super(DocumentExportTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.ids = self.db.samples.insert([
+            {"name": "John", "my_status": "active"},
+            {"name": "Joe", "my_status": "inactive"},
+            {"name": "Jane", "my_status": "active"}
+        ])
+        self.out = StringIO()
+
+    def exported(self):
+        return [json.loads(line) for line in self.out.getvalue().splitlines()]
+
+    def test_export_ndjson(self):
+        count = self.Sample.export_ndjson(
+            {"my_status": "active"}, self.out, batch_size=1)
+
+        self.assertEqual(2, count)
+        self.assertEqual(
+            [
+                {"_id": {"$oid": str(self.ids[0])}, "name": "John",
+                 "my_status": "active"},
+                {"_id": {"$oid": str(self.ids[2])}, "name": "Jane",
+                 "my_status": "active"}
+            ],
+            self.exported()
+        )
+
+    def test_export_ndjson_fields(self):
+        self.Sample.export_ndjson({}, self.out, fields=["status"])
+        self.assertEqual(
+            [{"my_status": "active"}, {"my_status": "inactive"},
+             {"my_status": "active"}],
+            self.exported()
+        )
+
+    def test_export_ndjson_fields_with_id(self):
+        self.Sample.export_ndjson(
+            {"name": "Joe"}, self.out, fields=["bson_id", "name"])
+        self.assertEqual(
+            [{"_id": {"$oid": str(self.ids[1])}, "name": "Joe"}],
+            self.exported()
+        )
+
+    def test_export_nothing(self):
+        self.assertEqual(
+            0, self.Sample.export_ndjson({"name": "Bob"}, self.out))
+        self.assertEqual("", self.out.getvalue())
+
+
+class CliExportTest(unittest.TestCase):
+    def setUp(self):
+        super(CliExportTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        client["test_database"].samples.insert([
+            {"name": "John", "my_status": "active"},
+            {"name": "Joe", "my_status": "inactive"},
+            {"name": "Jane", "my_status": "active"}
+        ])
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "samples.ndjson")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        super(CliExportTest, self).tearDown()
+
+    def test_export_command(self):
+        cli.main([
+            "export", "test_database", "samples",
+            "--query", '{"name": {"$in": ["John", "Joe"]}}',
+            "--fields", "name", "--output", self.path
+        ])
+
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(["John", "Joe"], [line["name"] for line in lines])
+        self.assertEqual(set(["_id", "name"]), set(lines[0]))
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import unittest
 from pymongo import MongoClient
-from tavi.documents import Document
+from tavi.documents import Document, _count_cache
+from tavi.errors import TaviError
 from tavi import fields
 
 
@@ -62,3 +63,29 @@ class DocumentFindTest(unittest.TestCase):
 
     def test_count(self):
         self.assertEqual(3, self.Sample.count())
+
+    def test_count_with_spec(self):
+        self.assertEqual(2, self.Sample.count({"last_name": "Smith"}))
+        self.assertEqual(0, self.Sample.count({"last_name": "Nobody"}))
+
+    def test_estimated_count(self):
+        self.assertEqual(3, self.Sample.count(mode="estimated"))
+
+    def test_estimated_count_cannot_have_criteria(self):
+        with self.assertRaises(TaviError):
+            self.Sample.count({"last_name": "Smith"}, mode="estimated")
+
+    def test_unknown_count_mode(self):
+        with self.assertRaises(TaviError):
+            self.Sample.count(mode="approximate")
+
+    def test_cached_count(self):
+        _count_cache.clear()
+        spec = {"last_name": "Smith"}
+        self.assertEqual(2, self.Sample.count(spec, mode="cached"))
+
+        self.db.samples.insert({"first_name": "Jane", "last_name": "Smith"})
+        self.assertEqual(2, self.Sample.count(spec, mode="cached"))
+        self.assertEqual(3, self.Sample.count(spec))
+        self.assertEqual(3, self.Sample.count(spec, mode="cached", ttl=0))
+        self.assertEqual(4, self.Sample.count(mode="cached"))
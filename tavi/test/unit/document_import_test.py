@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+from bson import ObjectId
+from pymongo import MongoClient
+from tavi import Connection, cli, ndjson
+from tavi.documents import Document
+from tavi import fields
+
+
+class Sample(Document):
+    name = fields.StringField("name", required=True)
+    status = fields.StringField("my_status", default="active")
+    age = fields.IntegerField("age", min_value=0)
+    ref = fields.ObjectIdField("ref")
+
+
+class DocumentImportTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentImportTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.ref = ObjectId()
+        self.lines = [
+            '{"name": " John ", "age": 42, "ref": "%s"}' % self.ref,
+            '{"name": "Joe", "my_status": "inactive"}',
+            '',
+            '{"age": -1}',
+            'not json',
+            '{"name": "Jane", "age": 30}'
+        ]
+        self.rejects = StringIO()
+
+    def load(self, lines=None, **kwargs):
+        fileobj = StringIO("\n".join(lines or self.lines) + "\n")
+        return Sample.import_ndjson(fileobj, rejects=self.rejects, **kwargs)
+
+    def stored(self):
+        return list(self.db.samples.find(sort=[("name", 1)]))
+
+    def rejected(self):
+        return [json.loads(line) for line in self.rejects.getvalue().split(
+            "\n") if line]
+
+    def test_imports_valid_documents(self):
+        report = self.load(batch_size=2)
+
+        self.assertEqual(
+            (5, 3, 2),
+            (report.read, report.written, report.rejected)
+        )
+        stored = self.stored()
+        self.assertEqual(["Jane", "Joe", "John"], [s["name"] for s in stored])
+        self.assertEqual("active", stored[2]["my_status"])
+        self.assertEqual(self.ref, stored[2]["ref"])
+        self.assertEqual("inactive", stored[1]["my_status"])
+
+    def test_writes_rejected_lines(self):
+        self.load(batch_size=2)
+        rejected = self.rejected()
+
+        self.assertEqual([4, 5], [r["line"] for r in rejected])
+        self.assertEqual(
+            sorted(["Name is required", "Age is too small (minimum is 0)"]),
+            sorted(rejected[0]["errors"])
+        )
+        self.assertEqual({"age": -1}, rejected[0]["document"])
+        self.assertEqual("not json", rejected[1]["document"])
+
+    def test_imports_with_multiple_workers(self):
+        lines = ['{"name": "Sample %d"}' % i for i in range(50)]
+        report = self.load(lines, batch_size=3, workers=4)
+        self.assertEqual(50, report.written)
+        self.assertEqual(50, self.db.samples.count())
+
+    def test_reports_progress(self):
+        reports = []
+        self.load(batch_size=2, progress=lambda r: reports.append(r.read))
+        self.assertEqual([2, 4, 5], reports)
+
+    def test_rejects_duplicate_ids(self):
+        id_ = ObjectId()
+        lines = ['{"_id": {"$oid": "%s"}, "name": "John"}' % id_] * 2
+        report = self.load(lines)
+
+        self.assertEqual((1, 1), (report.written, report.rejected))
+        self.assertEqual(2, self.rejected()[0]["line"])
+
+    def test_upserts_documents_with_ids(self):
+        id_ = ObjectId()
+        self.db.samples.insert({"_id": id_, "name": "John", "age": 1})
+        lines = [
+            '{"_id": {"$oid": "%s"}, "name": "Joe"}' % id_,
+            '{"name": "Jane"}'
+        ]
+        report = self.load(lines, upsert=True)
+
+        self.assertEqual(2, report.written)
+        self.assertEqual(
+            {"_id": id_, "name": "Joe", "my_status": "active", "age": None,
+             "ref": None},
+            self.db.samples.find_one(id_)
+        )
+        self.assertEqual(2, self.db.samples.count())
+
+
+class DocumentParallelImportTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentParallelImportTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.lines = ['{"name": "Sample %d"}' % i for i in range(20)]
+        self.lines[5] = '{"age": -1}'
+        self.rejects = StringIO()
+
+    def load(self, **kwargs):
+        fileobj = StringIO("\n".join(self.lines) + "\n")
+        return Sample.import_ndjson(
+            fileobj, rejects=self.rejects, processes=2, batch_size=3,
+            **kwargs
+        )
+
+    def test_reports_totals(self):
+        report = self.load()
+        self.assertEqual(
+            (20, 19, 1),
+            (report.read, report.written, report.rejected)
+        )
+
+    def test_reports_per_worker_stats(self):
+        report = self.load()
+        self.assertTrue(1 <= len(report.workers) <= 2)
+        self.assertEqual(20, sum(r.read for r in report.workers.values()))
+        self.assertEqual(
+            1, sum(r.rejected for r in report.workers.values()))
+
+    def test_writes_rejected_lines(self):
+        progress = []
+        self.load(progress=lambda r: progress.append(r.read))
+
+        rejected = json.loads(self.rejects.getvalue())
+        self.assertEqual(6, rejected["line"])
+        self.assertEqual(
+            sorted(["Name is required", "Age is too small (minimum is 0)"]),
+            sorted(rejected["errors"])
+        )
+        self.assertEqual([3, 6, 9, 12, 15, 18, 20], progress)
+
+    def test_worker_writes_its_chunk(self):
+        ndjson._setup_worker(Connection.settings, Sample, False)
+        pid, lines, rejected = ndjson._load_chunk(
+            [(3, '{"name": "John"}'), (7, '{"age": -1}')])
+
+        self.assertEqual([3, 7], lines)
+        self.assertEqual([1], [index for index, _, _ in rejected])
+        self.assertEqual(["John"], [s["name"] for s in self.db.samples.find()])
+
+
+class CliImportTest(unittest.TestCase):
+    def setUp(self):
+        super(CliImportTest, self).setUp()
+        MongoClient().drop_database("test_database")
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "samples.ndjson")
+        self.rejects = os.path.join(self.dir, "rejects.ndjson")
+        with open(self.path, "w") as f:
+            f.write('{"name": "John"}\n{"name": "Joe"}\n{"name\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        super(CliImportTest, self).tearDown()
+
+    def test_import_command(self):
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            cli.main([
+                "import", "test_database", "samples", "--input", self.path,
+                "--rejects", self.rejects
+            ])
+        finally:
+            sys.stderr = stderr
+
+        samples = MongoClient()["test_database"].samples
+        self.assertEqual(2, samples.count())
+        with open(self.rejects) as f:
+            self.assertEqual(3, json.loads(f.readline())["line"])
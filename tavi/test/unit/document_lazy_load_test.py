@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson import BSON
+from pymongo import MongoClient
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+try:
+    from bson.raw_bson import RawBSONDocument
+except ImportError:
+    RawBSONDocument = None
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street", required=True)
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+
+
+class Sample(Document):
+    first_name = fields.StringField("first_name", required=True)
+    last_name = fields.StringField("last_name", required=True)
+    age = fields.IntegerField("age", min_value=0)
+    status = fields.StringField("my_status", default="active")
+    tags = fields.ArrayField("tags")
+    address = fields.EmbeddedField("address", Address)
+    lines = fields.ListField("lines", Line)
+
+
+class DocumentLazyLoadTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentLazyLoadTest, self).setUp()
+        self.attrs = {
+            "first_name": "John",
+            "last_name": "Doe",
+            "age": 42,
+            "tags": ["a", "b"],
+            "address": {"street": "123 Elm Street"},
+            "lines": [{"quantity": 1}, {"quantity": 2}]
+        }
+        self.raw = self.attrs
+        if RawBSONDocument:
+            self.raw = RawBSONDocument(BSON.encode(self.attrs))
+
+        self.sample = Sample.from_raw(self.raw)
+
+    def test_does_not_decode_fields_until_accessed(self):
+        self.assertEqual(
+            set(["first_name", "last_name", "age", "my_status", "tags",
+                 "address", "lines"]),
+            self.sample._pending
+        )
+
+        self.assertEqual("John", self.sample.first_name)
+        self.assertNotIn("first_name", self.sample._pending)
+        self.assertIn("last_name", self.sample._pending)
+
+    def test_decodes_fields_on_access(self):
+        self.assertEqual(42, self.sample.age)
+        self.assertEqual("active", self.sample.status)
+        self.assertEqual(["a", "b"], self.sample.tags)
+        self.assertEqual("123 Elm Street", self.sample.address.street)
+        self.assertEqual([1, 2], [line.quantity for line in self.sample.lines])
+
+    def test_loaded_fields_are_not_dirty(self):
+        self.sample.first_name
+        self.sample.address.street
+        self.assertEqual(set(), self.sample.changed_fields)
+
+    def test_assigned_fields_are_not_overwritten(self):
+        self.sample.first_name = "Joe"
+        self.sample.address = Address(street="456 Pine Street")
+
+        self.assertEqual("Joe", self.sample.first_name)
+        self.assertEqual("456 Pine Street", self.sample.address.street)
+        self.assertEqual(
+            set(["first_name"]),
+            self.sample.changed_fields
+        )
+
+    def test_assigned_fields_are_kept_when_validating(self):
+        self.sample.last_name = "Smith"
+        self.sample.tags = ["c"]
+
+        self.assertTrue(self.sample.valid)
+        self.assertEqual("Smith", self.sample.last_name)
+        self.assertEqual(["c"], self.sample.tags)
+
+    def test_validates_fields_on_access(self):
+        sample = Sample.from_raw({"first_name": "John", "age": -1})
+        sample.age
+        self.assertEqual(
+            ["Age is too small (minimum is 0)"],
+            sample.errors.full_messages
+        )
+
+    def test_valid_decodes_all_fields(self):
+        sample = Sample.from_raw({"first_name": "John"})
+        self.assertFalse(sample.valid)
+        self.assertEqual(
+            ["Last Name is required"],
+            sample.errors.full_messages
+        )
+        self.assertEqual(set(), sample._pending)
+
+    def test_field_values_match_eager_document(self):
+        eager = Sample(**self.attrs)
+        self.assertEqual(eager.field_values, self.sample.field_values)
+
+
+class DocumentLazyFindTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentLazyFindTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client['test_database']
+        self.ids = self.db.samples.insert(
+            [
+                {"first_name": "John", "last_name": "Doe"},
+                {"first_name": "Joe", "last_name": "Smith"}
+            ]
+        )
+
+    def test_find_lazy(self):
+        result = Sample.find({"last_name": "Smith"}, lazy=True)
+        self.assertEqual(1, len(result))
+        self.assertEqual(self.ids[1], result[0].bson_id)
+        self.assertEqual("Joe", result[0].first_name)
+
+    def test_find_one_lazy(self):
+        result = Sample.find_one(self.ids[0], lazy=True)
+        self.assertEqual("John", result.first_name)
+        self.assertEqual(self.ids[0], result.bson_id)
+
+    def test_find_by_id_lazy(self):
+        result = Sample.find_by_id(self.ids[0], lazy=True)
+        self.assertEqual("Doe", result.last_name)
+        self.assertTrue(result.valid)
+
+    def test_saves_fields_assigned_before_access(self):
+        result = Sample.find_one(self.ids[0], lazy=True)
+        result.first_name = "Jane"
+        result.tags = ["a"]
+        self.assertTrue(result.save(), result.errors.full_messages)
+
+        stored = self.db.samples.find_one(self.ids[0])
+        self.assertEqual("Jane", stored["first_name"])
+        self.assertEqual(["a"], stored["tags"])
+        self.assertEqual("Doe", stored["last_name"])
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document
+from tavi.errors import TaviError
+from tavi.pagination import encode_token, keyset_spec
+from tavi import fields
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    rank = fields.IntegerField("my_rank")
+
+
+class DocumentPaginateTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentPaginateTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.ids = self.db.samples.insert(
+            [{"name": "sample %d" % i, "my_rank": i % 3} for i in range(7)]
+        )
+
+    def pages(self, **kwargs):
+        pages = [Sample.paginate(**kwargs)]
+        while pages[-1].has_next:
+            pages.append(Sample.paginate(after=pages[-1].after, **kwargs))
+        return pages
+
+    def test_paginate_by_id(self):
+        pages = self.pages(limit=3)
+        self.assertEqual([3, 3, 1], [len(page) for page in pages])
+        self.assertEqual(
+            self.ids,
+            [sample.bson_id for page in pages for sample in page]
+        )
+
+    def test_has_next_on_exact_last_page(self):
+        pages = self.pages(limit=7)
+        self.assertEqual(1, len(pages))
+        self.assertFalse(pages[0].has_next)
+
+    def test_paginate_empty_result(self):
+        page = Sample.paginate({"name": "nobody"})
+        self.assertEqual(0, len(page))
+        self.assertFalse(page.has_next)
+        self.assertIsNone(page.after)
+
+    def test_paginate_by_field_descending(self):
+        pages = self.pages(sort=[("rank", -1)], limit=2, lazy=True)
+        self.assertEqual(
+            [2, 2, 1, 1, 0, 0, 0],
+            [sample.rank for page in pages for sample in page]
+        )
+        self.assertEqual(
+            [self.ids[2], self.ids[5]],
+            [sample.bson_id for sample in pages[0]]
+        )
+
+    def test_paginate_with_spec(self):
+        pages = self.pages(spec={"my_rank": {"$gt": 0}}, sort=["rank"],
+                           limit=3, lazy=True)
+        self.assertEqual(
+            ["sample 1", "sample 4", "sample 2", "sample 5"],
+            [sample.name for page in pages for sample in page]
+        )
+
+    def test_invalid_token(self):
+        with self.assertRaises(TaviError):
+            Sample.paginate(after="not a token")
+
+        with self.assertRaises(TaviError):
+            Sample.paginate(after=encode_token([1, 2]))
+
+    def test_keyset_spec(self):
+        self.assertEqual({}, keyset_spec(None, [("_id", 1)], None))
+        self.assertEqual(
+            {"$and": [{"a": 1}, {"_id": {"$gt": 5}}]},
+            keyset_spec({"a": 1}, [("_id", 1)], [5])
+        )
+        self.assertEqual(
+            {"$or": [
+                {"$or": [{"b": {"$lt": 2}}, {"b": None}]},
+                {"b": 2, "_id": {"$gt": 5}}
+            ]},
+            keyset_spec(None, [("b", -1), ("_id", 1)], [2, 5])
+        )
+        self.assertEqual(
+            {"$or": [{"b": {"$ne": None}}, {"b": None, "_id": {"$gt": 5}}]},
+            keyset_spec(None, [("b", 1), ("_id", 1)], [None, 5])
+        )
+        self.assertEqual(
+            {"b": None, "_id": {"$gt": 5}},
+            keyset_spec(None, [("b", -1), ("_id", 1)], [None, 5])
+        )
+
+    def test_paginate_by_id_descending(self):
+        pages = self.pages(sort=[("_id", -1)], limit=3)
+        self.assertEqual(
+            list(reversed(self.ids)),
+            [sample.bson_id for page in pages for sample in page]
+        )
+
+    def test_paginate_with_null_sort_keys(self):
+        self.db.samples.update(
+            {"_id": {"$in": self.ids[:3]}}, {"$set": {"my_rank": None}},
+            multi=True
+        )
+
+        pages = self.pages(sort=["rank"], limit=2)
+        self.assertEqual(
+            [None, None, None, 0, 0, 1, 2],
+            [sample.rank for page in pages for sample in page]
+        )
+
+        pages = self.pages(sort=[("rank", -1)], limit=2)
+        self.assertEqual(
+            [2, 1, 0, 0, None, None, None],
+            [sample.rank for page in pages for sample in page]
+        )
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import copy
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document
+from tavi.scan import SAMPLES_PER_PARTITION, id_ranges, range_spec
+from tavi import fields, scan
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    count = fields.IntegerField("count")
+
+
+def name_of_even(sample):
+    if sample.count % 2 == 0:
+        return sample.name
+
+
+class DocumentParallelScanTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentParallelScanTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.db.samples.insert(
+            [{"name": "sample %d" % i, "count": i} for i in range(100)]
+        )
+        self.even_names = set("sample %d" % i for i in range(0, 100, 2))
+
+    def test_id_ranges_cover_collection(self):
+        ranges = id_ranges(self.db.samples, None, 8)
+        self.assertEqual(8, len(ranges))
+        self.assertIsNone(ranges[0][0])
+        self.assertIsNone(ranges[-1][1])
+
+        for (_, upper), (lower, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(upper, lower)
+
+        counts = [
+            self.db.samples.find(range_spec(None, *bounds)).count()
+            for bounds in ranges
+        ]
+        self.assertEqual(100, sum(counts))
+        self.assertTrue(all(11 <= count <= 13 for count in counts), counts)
+
+    def test_id_ranges_with_more_partitions_than_documents(self):
+        ranges = id_ranges(self.db.samples, {"count": {"$lt": 3}}, 10)
+        self.assertEqual(3, len(ranges))
+
+    def test_id_ranges_sample_ids_in_one_aggregation(self):
+        pipelines = []
+        collection = self.db.samples
+
+        class Recorder(object):
+            def aggregate(self, pipeline):
+                pipelines.append(copy.deepcopy(pipeline))
+                return collection.aggregate(pipeline)
+
+        ranges = id_ranges(Recorder(), {"count": {"$gte": 50}}, 2)
+        self.assertEqual(2, len(ranges))
+        self.assertEqual([[
+            {"$match": {"count": {"$gte": 50}}},
+            {"$sample": {"size": 2 * SAMPLES_PER_PARTITION}},
+            {"$project": {"_id": True}}
+        ]], pipelines)
+
+    def test_id_ranges_of_empty_collection(self):
+        self.assertEqual([(None, None)], id_ranges(self.db.empty, None, 4))
+
+    def test_range_spec(self):
+        self.assertEqual({}, range_spec(None, None, None))
+        self.assertEqual({"a": 1}, range_spec({"a": 1}, None, None))
+        self.assertEqual(
+            {"_id": {"$gte": 1, "$lt": 5}},
+            range_spec(None, 1, 5)
+        )
+        self.assertEqual(
+            {"$and": [{"a": 1}, {"_id": {"$gte": 1}}]},
+            range_spec({"a": 1}, 1, None)
+        )
+
+    def test_parallel_scan(self):
+        results = Sample.parallel_scan(name_of_even, workers=3)
+        self.assertItemsEqual(self.even_names, list(results))
+
+    def test_parallel_scan_with_spec(self):
+        results = Sample.parallel_scan(
+            lambda sample: sample.count, {"count": {"$gte": 90}}, workers=2,
+            partitions=3
+        )
+        self.assertItemsEqual(range(90, 100), list(results))
+
+    def test_parallel_scan_keeps_ranges_small(self):
+        partitions = []
+        id_ranges, range_size = scan.id_ranges, scan.DEFAULT_RANGE_SIZE
+
+        def recording_id_ranges(collection, spec, count):
+            partitions.append(count)
+            return id_ranges(collection, spec, count)
+
+        scan.id_ranges, scan.DEFAULT_RANGE_SIZE = recording_id_ranges, 10
+        try:
+            results = list(Sample.parallel_scan(name_of_even, workers=2))
+        finally:
+            scan.id_ranges, scan.DEFAULT_RANGE_SIZE = id_ranges, range_size
+
+        self.assertEqual([10], partitions)
+        self.assertItemsEqual(self.even_names, results)
+
+    def test_parallel_scan_lazy(self):
+        results = Sample.parallel_scan(name_of_even, lazy=True)
+        self.assertItemsEqual(self.even_names, list(results))
+
+    def test_parallel_scan_with_processes(self):
+        results = Sample.parallel_scan(name_of_even, workers=2, processes=True)
+        self.assertItemsEqual(self.even_names, list(results))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import unittest
+from bson import ObjectId
+from pymongo import MongoClient
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviTypeError
+from tavi import fields
+
+
+class Customer(Document):
+    name = fields.StringField("name")
+
+
+class Product(Document):
+    title = fields.StringField("title")
+
+
+class Order(Document):
+    number = fields.IntegerField("number")
+    customer = fields.ReferenceField("customer_id", Customer)
+    product = fields.ReferenceField("product_id", Product)
+
+
+class DocumentReferenceTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentReferenceTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+
+        self.customers = [Customer(name="John"), Customer(name="Joe")]
+        self.product = Product(title="Widget")
+        for document in self.customers + [self.product]:
+            assert document.save(), document.errors.full_messages
+
+        for i in range(4):
+            order = Order(number=i, customer=self.customers[i % 2])
+            if i < 2:
+                order.product = self.product
+            assert order.save(), order.errors.full_messages
+
+    def test_stores_id(self):
+        stored = self.db.orders.find_one({"number": 1})
+        self.assertEqual(self.customers[1].bson_id, stored["customer_id"])
+        self.assertEqual(self.product.bson_id, stored["product_id"])
+
+    def test_dereferences_on_access(self):
+        order = Order.find_one({"number": 1})
+        self.assertEqual("Joe", order.customer.name)
+        self.assertEqual("Widget", order.product.title)
+        self.assertIs(order.customer, order.customer)
+
+    def test_dereferences_lazy_documents(self):
+        order = Order.find_one({"number": 0}, lazy=True)
+        self.assertEqual("John", order.customer.name)
+
+    def test_missing_reference(self):
+        order = Order.find_one({"number": 3})
+        self.assertIsNone(order.product)
+
+        order.customer = ObjectId()
+        self.assertIsNone(order.customer)
+
+    def test_assigning_id_dereferences_new_document(self):
+        order = Order.find_one({"number": 0})
+        self.assertEqual("John", order.customer.name)
+
+        order.customer = self.customers[1].bson_id
+        self.assertEqual("Joe", order.customer.name)
+        self.assertIn("customer_id", order.changed_fields)
+
+    def test_field_values_hold_ids(self):
+        order = Order(number=9, customer=self.customers[0])
+        self.assertEqual(
+            self.customers[0].bson_id,
+            order.mongo_field_values["customer_id"]
+        )
+        self.assertEqual(
+            self.customers[0].bson_id,
+            order.field_values["customer"]
+        )
+
+    def test_validates_id(self):
+        order = Order(customer="not an id")
+        self.assertEqual(
+            ["Customer must be a valid Object Id"],
+            order.errors.full_messages
+        )
+
+    def test_requires_document_class(self):
+        class Line(EmbeddedDocument):
+            pass
+
+        with self.assertRaises(TaviTypeError):
+            fields.ReferenceField("line", Line)
+
+    def test_prefetch(self):
+        orders = Order.find().prefetch("customer", "product")
+        self.db.customers.remove()
+        self.db.products.remove()
+
+        self.assertEqual(
+            ["John", "Joe", "John", "Joe"],
+            [order.customer.name for order in orders]
+        )
+        self.assertEqual(
+            ["Widget", "Widget", None, None],
+            [order.product and order.product.title for order in orders]
+        )
+
+    def test_prefetch_missing_references(self):
+        self.db.customers.remove({"name": "Joe"})
+        orders = Order.find().prefetch("customer")
+        self.db.customers.remove()
+
+        self.assertEqual(
+            ["John", None, "John", None],
+            [order.customer and order.customer.name for order in orders]
+        )
+
+    def test_prefetch_empty_results(self):
+        self.assertEqual([], Order.find({"number": 99}).prefetch("customer"))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document
+from tavi.scan import CollectionCheckpoint, FileCheckpoint
+from tavi import fields
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    rank = fields.IntegerField("my_rank")
+
+
+class DocumentScanTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentScanTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.ids = self.db.samples.insert(
+            [{"name": "sample %d" % i, "my_rank": i % 3} for i in range(10)]
+        )
+        self.dir = tempfile.mkdtemp()
+        self.checkpoint = FileCheckpoint(os.path.join(self.dir, "checkpoint"))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        super(DocumentScanTest, self).tearDown()
+
+    def test_scan_by_id(self):
+        samples = list(Sample.scan(batch_size=3))
+        self.assertEqual(self.ids, [sample.bson_id for sample in samples])
+
+    def test_scan_with_spec(self):
+        samples = Sample.scan({"my_rank": 0}, batch_size=2)
+        self.assertEqual(
+            ["sample 0", "sample 3", "sample 6", "sample 9"],
+            [sample.name for sample in samples]
+        )
+
+    def test_scan_by_field(self):
+        samples = list(Sample.scan(batch_size=2, key="rank", lazy=True))
+        self.assertEqual(
+            [0, 0, 0, 0, 1, 1, 1, 2, 2, 2],
+            [sample.rank for sample in samples]
+        )
+        self.assertEqual(10, len(set(sample.bson_id for sample in samples)))
+
+    def test_scan_by_unknown_field(self):
+        with self.assertRaises(KeyError):
+            Sample.scan(key="unknown")
+
+    def test_reports_progress(self):
+        reports = []
+        list(Sample.scan(
+            batch_size=4,
+            progress=lambda report: reports.append(
+                (report.batches, report.batch_size, report.scanned)
+            )
+        ))
+        self.assertEqual([(1, 4, 4), (2, 4, 8), (3, 2, 10)], reports)
+
+    def test_resumes_from_checkpoint(self):
+        scan = Sample.scan(batch_size=4, checkpoint=self.checkpoint)
+        first = [next(scan) for _ in range(6)]
+        scan.close()
+        self.assertEqual([self.ids[3]], self.checkpoint.load())
+
+        rest = list(Sample.scan(batch_size=4, checkpoint=self.checkpoint))
+        self.assertEqual(self.ids[:6], [sample.bson_id for sample in first])
+        self.assertEqual(self.ids[4:], [sample.bson_id for sample in rest])
+
+    def test_resumes_from_checkpoint_by_field(self):
+        scan = Sample.scan(batch_size=3, key="rank",
+                           checkpoint=self.checkpoint)
+        for _ in range(4):
+            next(scan)
+        scan.close()
+        self.assertEqual([0, self.ids[6]], self.checkpoint.load())
+
+        rest = Sample.scan(batch_size=3, key="rank", lazy=True,
+                           checkpoint=self.checkpoint)
+        self.assertEqual(
+            [0, 1, 1, 1, 2, 2, 2],
+            [sample.rank for sample in rest]
+        )
+
+    def test_clears_checkpoint_when_complete(self):
+        list(Sample.scan(batch_size=4, checkpoint=self.checkpoint))
+        self.assertIsNone(self.checkpoint.load())
+        self.assertFalse(os.path.exists(self.checkpoint.path))
+
+    def test_collection_checkpoint(self):
+        checkpoint = CollectionCheckpoint(self.db.checkpoints, "samples")
+        self.assertIsNone(checkpoint.load())
+
+        scan = Sample.scan(batch_size=5, checkpoint=checkpoint)
+        for _ in range(5):
+            next(scan)
+        next(scan)
+        scan.close()
+        self.assertEqual([self.ids[4]], checkpoint.load())
+
+        checkpoint.clear()
+        self.assertIsNone(checkpoint.load())
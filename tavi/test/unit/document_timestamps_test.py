@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+from pymongo import MongoClient
+from tavi.commands import Update
+from tavi.documents import Document, EmbeddedDocument
+from tavi import fields
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street")
+    created_at = fields.DateTimeField("created_at")
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+    created_at = fields.DateTimeField("created_on")
+    last_modified_at = fields.DateTimeField("modified_on")
+    address = fields.EmbeddedField("address", Address)
+    lines = fields.ListField("lines", Line)
+
+
+class ServerSample(Sample):
+    __server_timestamps__ = True
+
+    name = fields.StringField("name")
+    created_at = fields.DateTimeField("created_on")
+    last_modified_at = fields.DateTimeField("modified_on")
+    address = fields.EmbeddedField("address", Address)
+    lines = fields.ListField("lines", Line)
+
+
+class DocumentTimestampsTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentTimestampsTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+
+    def test_timestamp_targets(self):
+        self.assertEqual(
+            [("created_at", "own"), ("address", "embedded")],
+            Sample._timestamp_targets["created_at"]
+        )
+        self.assertEqual(
+            [("last_modified_at", "own"), ("lines", "list")],
+            Sample._timestamp_targets["last_modified_at"]
+        )
+
+    def test_stamps_embedded_documents(self):
+        sample = Sample(name="John", address=Address(street="Elm"))
+        sample.lines.append(Line(quantity=1))
+        assert sample.save(), sample.errors.full_messages
+
+        stored = self.db.samples.find_one(sample.bson_id)
+        self.assertIsNotNone(stored["created_on"])
+        self.assertEqual(stored["created_on"], stored["address"]["created_at"])
+        self.assertEqual(
+            stored["modified_on"],
+            stored["lines"][0]["last_modified_at"]
+        )
+
+    def test_server_timestamps_on_insert(self):
+        before = datetime.datetime.utcnow().replace(microsecond=0)
+        sample = ServerSample(name="John", address=Address(street="Elm"))
+        assert sample.save(), sample.errors.full_messages
+
+        self.assertIsNone(sample.created_at)
+        self.assertIsNone(sample.last_modified_at)
+
+        stored = self.db.server_samples.find_one(sample.bson_id)
+        self.assertEqual("John", stored["name"])
+        self.assertGreaterEqual(stored["created_on"], before)
+        self.assertGreaterEqual(stored["modified_on"], before)
+        self.assertIsNotNone(stored["address"]["created_at"])
+
+    def test_server_timestamps_on_update(self):
+        sample = ServerSample(name="John")
+        assert sample.save(), sample.errors.full_messages
+        created_on = self.db.server_samples.find_one()["created_on"]
+
+        sample.name = "Joe"
+        operation = Update(sample)
+        operation.execute()
+        document = operation._update_document()
+
+        self.assertEqual({"modified_on": True}, document["$currentDate"])
+        self.assertNotIn("created_on", document["$set"])
+        self.assertNotIn("modified_on", document["$set"])
+
+        stored = self.db.server_samples.find_one()
+        self.assertEqual("Joe", stored["name"])
+        self.assertEqual(created_on, stored["created_on"])
+        self.assertGreaterEqual(stored["modified_on"], created_on)
@@ -11,6 +11,10 @@ class Address(EmbeddedDocument):
     last_modified_at = fields.DateTimeField("last_modified_at")
 
 
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+
+
 class DocumentUpdateTest(unittest.TestCase):
     class Sample(Document):
         name = fields.StringField("name", required=True, unique=True)
@@ -18,6 +22,7 @@ class DocumentUpdateTest(unittest.TestCase):
         last_modified_at = fields.DateTimeField("last_modified_at")
         address = fields.EmbeddedField("address", Address)
         status = fields.StringField("my_status")
+        lines = fields.ListField("lines", Line)
 
     def setUp(self):
         super(DocumentUpdateTest, self).setUp()
@@ -99,3 +104,18 @@ class DocumentUpdateTest(unittest.TestCase):
             ["Name must be unique"],
             another_sample.errors.full_messages
         )
+
+    def test_does_not_materialize_unchanged_list_items(self):
+        self.sample.name = "John"
+        for quantity in range(3):
+            self.sample.lines.append(Line(quantity=quantity))
+        assert self.sample.save(), self.sample.errors.full_messages
+
+        sample = self.Sample.find_by_id(self.sample.bson_id)
+        self.assertEqual(3, len(sample.lines))
+        sample.lines[1].quantity = 5
+        assert sample.save(), sample.errors.full_messages
+
+        self.assertEqual(1, len(sample.lines.materialized()))
+        actual = self.db.samples.find_one()["lines"]
+        self.assertEqual([0, 5, 2], [line["quantity"] for line in actual])
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import datetime
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document, EmbeddedDocument
+from tavi.errors import TaviError, TaviValidationError
+from tavi import fields
+
+
+class Supplier(EmbeddedDocument):
+    name = fields.StringField("name")
+    last_modified_at = fields.DateTimeField("last_modified_at")
+
+
+class Product(Document):
+    sku = fields.StringField("sku", required=True, unique=True)
+    name = fields.StringField("name", required=True)
+    price = fields.FloatField("price", min_value=0)
+    supplier = fields.EmbeddedField("supplier", Supplier)
+    created_at = fields.DateTimeField("created_on")
+    last_modified_at = fields.DateTimeField("modified_on")
+
+
+class Note(Document):
+    text = fields.StringField("text")
+
+
+class DocumentUpsertTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentUpsertTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+
+    def test_inserts_when_no_document_matches(self):
+        self.assertTrue(
+            Product.upsert_by({"sku": "123", "name": "Widget", "price": 1.5}))
+
+        stored = self.db.products.find_one()
+        self.assertEqual("123", stored["sku"])
+        self.assertEqual("Widget", stored["name"])
+        self.assertEqual(1.5, stored["price"])
+        self.assertIsNotNone(stored["created_on"])
+        self.assertIsNotNone(stored["modified_on"])
+
+    def test_updates_only_given_fields(self):
+        product = Product(sku="123", name="Widget", price=1.5)
+        product.supplier = Supplier(name="ACME")
+        product.save()
+        saved_at = datetime.datetime(2000, 1, 1)
+        self.db.products.update({}, {"$set": {
+            "created_on": saved_at, "modified_on": saved_at}})
+
+        Product.upsert_by({"sku": "123", "name": "Widget", "price": 2.0})
+
+        self.assertEqual(1, self.db.products.count())
+        stored = self.db.products.find_one()
+        self.assertEqual(2.0, stored["price"])
+        self.assertEqual("ACME", stored["supplier"]["name"])
+        self.assertEqual(saved_at, stored["created_on"])
+        self.assertGreater(stored["modified_on"], saved_at)
+
+    def test_upserts_by_given_keys(self):
+        self.db.notes.insert({"text": "hello"})
+        self.assertTrue(Note.upsert_by({"text": "hello"}, keys=["text"]))
+        self.assertEqual(1, self.db.notes.count())
+
+    def test_returns_document_when_new(self):
+        product = Product.upsert_by(
+            {"sku": "123", "name": "Widget"}, new=True)
+        self.assertIsInstance(product, Product)
+        self.assertEqual("Widget", product.name)
+        self.assertEqual(self.db.products.find_one()["_id"], product.bson_id)
+
+    def test_stamps_embedded_documents(self):
+        Product.upsert_by({
+            "sku": "123", "name": "Widget", "supplier": Supplier(name="ACME")
+        })
+        stored = self.db.products.find_one()
+        self.assertIsNotNone(stored["supplier"]["last_modified_at"])
+
+    def test_raises_when_not_valid(self):
+        with self.assertRaises(TaviValidationError) as context:
+            Product.upsert_by({"sku": "123", "name": "Widget", "price": -1})
+        self.assertEqual(
+            ["Price is too small (minimum is 0.0)"],
+            context.exception.errors.full_messages
+        )
+        self.assertEqual(0, self.db.products.count())
+
+    def test_requires_keys(self):
+        self.assertRaises(TaviError, Note.upsert_by, {"text": "hello"})
+        self.assertRaises(TaviError, Product.upsert_by, {"name": "Widget"})
+
+    def test_upsert_many(self):
+        Product(sku="1", name="Old", price=1.0).save()
+
+        rejected = Product.upsert_many([
+            {"sku": "1", "name": "New", "price": 1.0},
+            {"sku": "2", "name": "Other"},
+            {"sku": "3", "price": 2.0}
+        ])
+
+        self.assertEqual([(2, ["Name is required"])], rejected)
+        self.assertEqual(
+            {"1": "New", "2": "Other"},
+            {doc["sku"]: doc["name"] for doc in self.db.products.find()}
+        )
+
+    def test_upsert_many_rejects_rows_without_keys(self):
+        rejected = Product.upsert_many([
+            {"name": "No Sku"},
+            {"sku": "1", "name": "Widget", "color": "red"},
+            {"sku": "2", "name": "Other"}
+        ])
+
+        self.assertEqual([
+            (0, ["Missing values for upsert keys: sku"]),
+            (1, ["color is not a field of Product"])
+        ], rejected)
+        self.assertEqual(
+            ["2"], [doc["sku"] for doc in self.db.products.find()])
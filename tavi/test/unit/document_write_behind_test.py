@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document
+from tavi import writebehind
+from tavi.writebehind import WriteBehind
+from tavi import fields
+
+failures = []
+
+
+class Reading(Document):
+    __write_behind__ = {
+        "batch_size": 3,
+        "interval": 0.05,
+        "on_error": lambda error, operations: failures.append(operations)
+    }
+
+    sensor = fields.StringField("sensor", unique=True)
+    value = fields.FloatField("value")
+    tags = fields.ArrayField("tags")
+
+
+class DocumentWriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentWriteBehindTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        del failures[:]
+
+    def tearDown(self):
+        Reading.flush()
+        super(DocumentWriteBehindTest, self).tearDown()
+
+    def test_queues_saves(self):
+        readings = [Reading(sensor="s%d" % i, value=i) for i in range(7)]
+        for reading in readings:
+            self.assertTrue(reading.save())
+            self.assertIsNotNone(reading.bson_id)
+
+        Reading.flush()
+        self.assertEqual(
+            sorted(reading.bson_id for reading in readings),
+            sorted(doc["_id"] for doc in self.db.readings.find())
+        )
+
+    def test_flushes_after_interval(self):
+        Reading(sensor="a", value=1.0).save()
+        deadline = time.time() + 2
+        while not self.db.readings.count() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(1, self.db.readings.count())
+
+    def test_queues_updates(self):
+        reading = Reading(sensor="a", value=1.0)
+        reading.save()
+        Reading.flush()
+
+        reading = Reading.find_one({"sensor": "a"})
+        reading.value = 2.0
+        reading.save()
+        Reading.flush()
+        self.assertEqual(2.0, self.db.readings.find_one()["value"])
+
+    def test_changes_after_save_do_not_change_queued_write(self):
+        reading = Reading(sensor="a", value=1.0, tags=["x"])
+        reading.save()
+        reading.tags.append("y")
+        reading.value = 2.0
+        Reading.flush()
+
+        stored = self.db.readings.find_one()
+        self.assertEqual(["x"], stored["tags"])
+        self.assertEqual(1.0, stored["value"])
+
+        reading.save()
+        Reading.flush()
+        self.assertEqual(["x", "y"], self.db.readings.find_one()["tags"])
+
+    def test_insert_and_update_in_one_batch(self):
+        reading = Reading(sensor="a", value=1.0)
+        reading.save()
+        reading.value = 2.0
+        reading.save()
+        Reading.flush()
+
+        stored = list(self.db.readings.find())
+        self.assertEqual(1, len(stored))
+        self.assertEqual("a", stored[0]["sensor"])
+        self.assertEqual(2.0, stored[0]["value"])
+
+    def test_skips_updates_after_failed_insert(self):
+        Reading(sensor="a", value=1.0).save()
+        reading = Reading(sensor="a", value=2.0)
+        reading.save()
+        reading.value = 3.0
+        reading.save()
+        Reading(sensor="b", value=4.0).save()
+        Reading.flush()
+
+        self.assertEqual(1, len(failures))
+        self.assertEqual(
+            ["insert", "update"], [op[0] for op in failures[0]])
+        self.assertEqual(
+            {"a": 1.0, "b": 4.0},
+            {doc["sensor"]: doc["value"] for doc in self.db.readings.find()}
+        )
+
+    def test_reports_failed_writes(self):
+        Reading(sensor="a", value=1.0).save()
+        Reading(sensor="a", value=2.0).save()
+        Reading.flush()
+
+        self.assertEqual(1, len(failures))
+        self.assertEqual(1, len(failures[0]))
+        self.assertEqual("insert", failures[0][0][0])
+        self.assertEqual(1, self.db.readings.count())
+
+
+class WriteBehindTest(unittest.TestCase):
+    def setUp(self):
+        super(WriteBehindTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.collection = client["test_database"].writes
+        self.release = threading.Event()
+
+    def blocking_collection(self):
+        self.release.wait()
+        return self.collection
+
+    def test_close_writes_queued_operations(self):
+        buffer = WriteBehind(lambda: self.collection, interval=60)
+        for i in range(5):
+            buffer.put(("insert", {"n": i}))
+        buffer.close()
+        self.assertEqual(5, self.collection.count())
+
+    def test_put_blocks_while_queue_is_full(self):
+        buffer = WriteBehind(
+            self.blocking_collection, batch_size=1, max_pending=1)
+        buffer.put(("insert", {"n": 0}))
+        buffer.put(("insert", {"n": 1}))
+
+        blocked = threading.Thread(
+            target=buffer.put, args=(("insert", {"n": 2}),))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+
+        self.release.set()
+        blocked.join(2)
+        self.assertFalse(blocked.is_alive())
+        buffer.close()
+        self.assertEqual(3, self.collection.count())
+
+    def test_unexpected_errors_are_reported(self):
+        failed = []
+
+        def collection():
+            if not failed:
+                raise RuntimeError("no collection")
+            return self.collection
+
+        buffer = WriteBehind(
+            collection, on_error=lambda e, ops: failed.append((e, ops)))
+        buffer.put(("insert", {"n": 0}))
+        buffer.flush()
+
+        self.assertEqual(1, len(failed))
+        self.assertIsInstance(failed[0][0], RuntimeError)
+        self.assertEqual([("insert", {"n": 0})], failed[0][1])
+
+        buffer.put(("insert", {"n": 1}))
+        buffer.close()
+        self.assertEqual(1, self.collection.count())
+
+    def test_restarts_dead_thread(self):
+        buffer = WriteBehind(lambda: self.collection, interval=0.01)
+        buffer.put(("insert", {"n": 0}))
+        buffer.flush()
+
+        buffer._queue.put(writebehind._STOP)  # ends the thread
+        buffer._thread.join(2)
+        self.assertFalse(buffer._thread.is_alive())
+
+        buffer.put(("insert", {"n": 1}))
+        buffer.close()
+        self.assertEqual(2, self.collection.count())
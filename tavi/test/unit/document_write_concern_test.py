@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import unittest
+from pymongo import MongoClient
+from tavi.documents import Document
+from tavi import fields
+
+
+class AuditEntry(Document):
+    __write_concern__ = {"w": 0}
+
+    message = fields.StringField("message")
+
+
+class Order(Document):
+    __write_concern__ = {"w": "majority", "wtimeout": 5000}
+
+    name = fields.StringField("name")
+    tags = fields.ArrayField("tags")
+
+
+class Sample(Document):
+    name = fields.StringField("name")
+
+
+class DocumentWriteConcernTest(unittest.TestCase):
+    def setUp(self):
+        super(DocumentWriteConcernTest, self).setUp()
+        client = MongoClient()
+        client.drop_database("test_database")
+        self.db = client["test_database"]
+        self.calls = []
+
+    def tearDown(self):
+        for cls in (AuditEntry, Order, Sample):
+            for name in ("insert", "update", "remove"):
+                cls.collection.__dict__.pop(name, None)
+        super(DocumentWriteConcernTest, self).tearDown()
+
+    def record(self, cls, name):
+        collection = cls.collection
+        original = getattr(collection, name)
+
+        def recorder(*args, **kwargs):
+            self.calls.append((name, kwargs))
+            return original(*args, **kwargs)
+        setattr(collection, name, recorder)
+
+    def test_defaults_without_profile(self):
+        self.record(Sample, "insert")
+        self.assertTrue(Sample(name="a").save())
+        self.assertEqual(
+            [("insert", {"w": 1, "wtimeout": 0, "j": False})], self.calls)
+
+    def test_uses_class_profile(self):
+        self.record(Order, "insert")
+        Order(name="a").save()
+        self.assertEqual(
+            [("insert", {"w": "majority", "wtimeout": 5000, "j": False})],
+            self.calls
+        )
+
+    def test_arguments_override_class_profile(self):
+        self.record(Order, "insert")
+        Order(name="a").save(w=1, j=True)
+        self.assertEqual(
+            [("insert", {"w": 1, "wtimeout": 5000, "j": True})], self.calls)
+
+    def test_unacknowledged_insert_assigns_client_id(self):
+        self.record(AuditEntry, "insert")
+        entry = AuditEntry(message="logged in")
+        self.assertTrue(entry.save())
+        self.assertIsNotNone(entry.bson_id)
+        self.assertEqual(0, self.calls[0][1]["w"])
+        self.assertEqual(
+            entry.bson_id, self.db.audit_entries.find_one()["_id"])
+
+    def test_unacknowledged_update(self):
+        entry = AuditEntry(message="logged in")
+        entry.save()
+
+        self.record(AuditEntry, "update")
+        entry.message = "logged out"
+        self.assertTrue(entry.save())
+        self.assertEqual(0, self.calls[0][1]["w"])
+        self.assertEqual(
+            "logged out", self.db.audit_entries.find_one()["message"])
+
+    def test_atomic_updates_use_class_profile(self):
+        order = Order(name="a", tags=["old"])
+        order.save()
+
+        self.record(Order, "update")
+        Order.update_one(order.bson_id, set={"name": "b"})
+        order.push("tags", "new")
+        self.assertEqual(["update", "update"], [c[0] for c in self.calls])
+        for _, kwargs in self.calls:
+            self.assertEqual("majority", kwargs["w"])
+
+    def test_delete_uses_class_profile(self):
+        entry = AuditEntry(message="logged in")
+        entry.save()
+
+        self.record(AuditEntry, "remove")
+        entry.delete()
+        self.assertEqual([("remove", {"w": 0})], self.calls)
+        self.assertEqual(0, self.db.audit_entries.count())
+
+    def test_write_behind_uses_class_profile(self):
+        class QueuedEntry(AuditEntry):
+            __write_behind__ = True
+
+        self.assertEqual(
+            {"w": 0}, QueuedEntry._write_behind().write_concern)
@@ -115,3 +115,164 @@ class EmbeddedListTest(unittest.TestCase):
 
         self.my_list.remove(self.address1)
         self.assertEqual([], self.my_list)
+
+
+class LazyEmbeddedListTest(unittest.TestCase):
+    class Line(EmbeddedDocument):
+        quantity = fields.IntegerField("quantity", min_value=1)
+
+    class Owner(Document):
+        pass
+
+    def setUp(self):
+        super(LazyEmbeddedListTest, self).setUp()
+        self.my_list = EmbeddedList("lines", self.Line)
+        self.my_list.owner = self.Owner()
+        self.raw = [{"quantity": 1}, {"quantity": 2}, {"quantity": 3}]
+        self.my_list.extend_raw(self.raw)
+
+    def test_len_does_not_materialize_items(self):
+        self.assertEqual(3, len(self.my_list))
+        self.assertEqual([], self.my_list.materialized())
+
+    def test_materializes_accessed_items_only(self):
+        line = self.my_list[1]
+        self.assertIsInstance(line, self.Line)
+        self.assertEqual(2, line.quantity)
+        self.assertEqual(self.my_list.owner, line.owner)
+        self.assertEqual([line], self.my_list.materialized())
+
+    def test_materializes_items_once(self):
+        self.assertIs(self.my_list[0], self.my_list[0])
+
+    def test_iterates_over_documents(self):
+        self.assertEqual([1, 2, 3], [line.quantity for line in self.my_list])
+        self.assertEqual(3, len(self.my_list.materialized()))
+
+    def test_slice(self):
+        self.assertEqual([2, 3], [line.quantity for line in self.my_list[1:]])
+
+    def test_field_values_uses_raw_items(self):
+        self.my_list[0].quantity = 5
+        self.assertEqual(
+            [{"quantity": 5}, {"quantity": 2}, {"quantity": 3}],
+            self.my_list.field_values
+        )
+        self.assertIs(self.raw[1], self.my_list.field_values[1])
+
+    def test_merges_errors_with_owner_when_materialized(self):
+        self.my_list.extend_raw([{"quantity": 0}])
+        self.assertEqual(0, self.my_list[3].quantity)
+        self.assertEqual(
+            ["Lines Error: Quantity is too small (minimum is 1)"],
+            self.my_list.owner.errors.full_messages
+        )
+
+    def test_compares_with_documents(self):
+        self.assertEqual(
+            [self.Line(quantity=1), self.Line(quantity=2),
+             self.Line(quantity=3)],
+            self.my_list
+        )
+
+
+class EmbeddedListUpdateOperationsTest(unittest.TestCase):
+    class Line(EmbeddedDocument):
+        quantity = fields.IntegerField("quantity")
+
+    def setUp(self):
+        super(EmbeddedListUpdateOperationsTest, self).setUp()
+        self.my_list = EmbeddedList("lines", self.Line)
+        self.my_list.extend_raw([{"quantity": 1}, {"quantity": 2}])
+
+    def test_untracked_list_is_set(self):
+        self.assertIsNone(self.my_list.update_operations("lines"))
+
+    def test_no_changes(self):
+        self.my_list.mark_saved()
+        self.assertEqual({}, self.my_list.update_operations("lines"))
+
+    def test_appends_are_pushed(self):
+        self.my_list.mark_saved()
+        self.my_list.append(self.Line(quantity=3))
+        self.assertEqual(
+            {"$push": {"lines": {"$each": [{"quantity": 3}]}}},
+            self.my_list.update_operations("lines")
+        )
+        self.assertEqual(1, len(self.my_list.materialized()))
+
+    def test_changed_items_are_set_by_position(self):
+        self.my_list.mark_saved()
+        self.my_list[1].quantity = 5
+        self.assertEqual(
+            {"$set": {"lines.1": {"quantity": 5}}},
+            self.my_list.update_operations("lines")
+        )
+
+    def test_replaced_items_are_set_by_position(self):
+        self.my_list.mark_saved()
+        self.my_list[-2] = self.Line(quantity=7)
+        self.assertEqual(
+            {"$set": {"lines.0": {"quantity": 7}}},
+            self.my_list.update_operations("lines")
+        )
+
+    def test_removed_item_is_pulled(self):
+        self.my_list.mark_saved()
+        del self.my_list[0]
+        self.assertEqual(
+            {"$pull": {"lines": {"quantity": 1}}},
+            self.my_list.update_operations("lines")
+        )
+
+    def test_removed_items_are_pulled(self):
+        self.my_list.extend_raw([{"quantity": 3}])
+        self.my_list.mark_saved()
+        del self.my_list[2]
+        del self.my_list[0]
+        self.assertEqual(
+            {"$pull": {"lines": {"$or": [{"quantity": 3}, {"quantity": 1}]}}},
+            self.my_list.update_operations("lines")
+        )
+
+    def test_removed_duplicate_is_set(self):
+        self.my_list.extend_raw([{"quantity": 1}])
+        self.my_list.mark_saved()
+        del self.my_list[0]
+        self.assertIsNone(self.my_list.update_operations("lines"))
+
+    def test_inserting_before_saved_items_is_set(self):
+        self.my_list.mark_saved()
+        self.my_list.insert(0, self.Line(quantity=3))
+        self.assertIsNone(self.my_list.update_operations("lines"))
+
+    def test_mixed_changes_are_set(self):
+        self.my_list.mark_saved()
+        self.my_list[0].quantity = 5
+        self.my_list.append(self.Line(quantity=3))
+        self.assertIsNone(self.my_list.update_operations("lines"))
+
+    def test_mark_saved_resets_changes(self):
+        self.my_list.mark_saved()
+        self.my_list[0].quantity = 5
+        del self.my_list[1]
+        self.my_list.mark_saved()
+        self.assertEqual({}, self.my_list.update_operations("lines"))
+
+    def test_record_push(self):
+        self.my_list.mark_saved()
+        self.my_list.append(self.Line(quantity=4))
+        self.my_list.record_push([self.Line(quantity=3)], -2)
+
+        self.assertEqual([2, 3, 4], [line.quantity for line in self.my_list])
+        self.assertEqual(
+            {"$push": {"lines": {"$each": [{"quantity": 4}]}}},
+            self.my_list.update_operations("lines")
+        )
+
+    def test_record_pull(self):
+        self.my_list.mark_saved()
+        self.my_list.record_pull([{"quantity": 1}])
+
+        self.assertEqual([2], [line.quantity for line in self.my_list])
+        self.assertEqual({}, self.my_list.update_operations("lines"))
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
-from tavi.errors import Errors
+from tavi.errors import BatchErrors, Errors
 
 
 class ErrorsTest(unittest.TestCase):
@@ -33,6 +33,28 @@ class ErrorsTest(unittest.TestCase):
         self.errors.add("first_name", "is required")
         self.assertEqual(3, self.errors.count)
 
+    def test_count_after_clear(self):
+        self.errors.add("email", "is required")
+        self.errors.add("email", "must be valid")
+        self.errors.add("first_name", "is required")
+        self.errors.clear("email")
+        self.errors.clear("last_name")
+        self.assertEqual(1, self.errors.count)
+
+    def test_no_errors(self):
+        self.errors.clear("email")
+        self.assertEqual(0, self.errors.count)
+        self.assertEqual([], self.errors.get("email"))
+        self.assertEqual([], self.errors.full_messages)
+        self.assertEqual([], self.errors.items())
+        self.assertIsNone(self.errors._errors)
+
+    def test_items(self):
+        self.errors.add("email", "is required")
+        self.errors.add("first_name", "is required")
+        self.errors.clear("first_name")
+        self.assertEqual([("email", ["is required"])], self.errors.items())
+
     def test_full_messages_for(self):
         self.errors.add("email", "is required")
         self.errors.add("email", "must be valid")
@@ -53,3 +75,28 @@ class ErrorsTest(unittest.TestCase):
         self.assertTrue("Email is required" in self.errors.full_messages)
         self.assertTrue("Email must be valid" in self.errors.full_messages)
         self.assertTrue("First Name is required" in self.errors.full_messages)
+
+
+class BatchErrorsTest(unittest.TestCase):
+    def setUp(self):
+        super(BatchErrorsTest, self).setUp()
+        self.errors = BatchErrors()
+
+    def test_add_error_to_current_row(self):
+        self.errors.row = 3
+        self.errors.errors.add("email", "is required")
+        self.assertEqual([("email", "is required")], self.errors.get(3))
+        self.assertEqual([3], self.errors.rows)
+
+    def test_add_error_to_rows(self):
+        self.errors.add_rows([4, 1], "first_name", "is required")
+        self.assertEqual([1, 4], self.errors.rows)
+        self.assertEqual(2, self.errors.count)
+        self.assertEqual(
+            {1: ["First Name is required"], 4: ["First Name is required"]},
+            self.errors.full_messages
+        )
+
+    def test_valid_rows_have_no_errors(self):
+        self.assertEqual([], self.errors.get(0))
+        self.assertEqual([], self.errors.full_messages_for(0))
@@ -2,8 +2,21 @@
 import unittest
 import datetime
 import json
+from bson import ObjectId, json_util
+from bson.binary import Binary
+from bson.code import Code
 from tavi import fields
-from tavi.documents import Document
+from tavi.documents import Document, EmbeddedDocument
+
+
+class Address(EmbeddedDocument):
+    street = fields.StringField("street")
+    moved_on = fields.DateTimeField("moved_on")
+
+
+class Line(EmbeddedDocument):
+    quantity = fields.IntegerField("quantity")
+    product_id = fields.ObjectIdField("product_id")
 
 
 class SerializationTest(unittest.TestCase):
@@ -12,6 +25,9 @@ class SerializationTest(unittest.TestCase):
         price = fields.FloatField("price")
         quantity = fields.IntegerField("quantity")
         sold_on = fields.DateTimeField("sold_on")
+        address = fields.EmbeddedField("address", Address)
+        lines = fields.ListField("lines", Line)
+        tags = fields.ArrayField("tags")
 
     def test_serialize_to_json(self):
         t = self.Target(
@@ -26,7 +42,10 @@ class SerializationTest(unittest.TestCase):
             "sold_on": {"$date": 1377469440000},
             "price": 9.99,
             "name": "Widget",
-            "quantity": 3
+            "quantity": 3,
+            "address": None,
+            "lines": None,
+            "tags": None
         }
 
         self.assertDictEqual(expected, json.loads(t.to_json()))
@@ -53,6 +72,61 @@ class SerializationTest(unittest.TestCase):
             json.loads(actual)
         )
 
+    def test_serialize_nested_values_like_json_util(self):
+        product_id = ObjectId()
+        t = self.Target(
+            name="Widget",
+            address={
+                "street": "123 Elm Street",
+                "moved_on": datetime.datetime(2013, 8, 25, 22, 24, 0)
+            },
+            lines=[{"quantity": 1, "product_id": product_id}],
+            tags=["a", product_id]
+        )
+        t._id = ObjectId()
+
+        expected = dict(t.field_values, id=t.bson_id)
+        self.assertEqual(
+            json.loads(json_util.dumps(expected)),
+            json.loads(t.to_json())
+        )
+        self.assertEqual(
+            {"$oid": str(product_id)},
+            json.loads(t.to_json(["lines"]))["lines"][0]["product_id"]
+        )
+
+    def test_serialize_binary_and_code_like_json_util(self):
+        t = self.Target(
+            name="Widget",
+            tags=[
+                Binary(b"abc"),
+                Binary(b"\x00\xff", 5),
+                Code("f()"),
+                Code("g(x)", {"x": Binary(b"\x01")}),
+                {"nested": [Binary(b"def")]}
+            ]
+        )
+
+        expected = dict(t.field_values, id=t.bson_id)
+        self.assertEqual(
+            json.loads(json_util.dumps(expected)),
+            json.loads(t.to_json())
+        )
+        self.assertEqual(
+            {"$binary": "AP8=", "$type": "05"},
+            json.loads(t.to_json(["tags"]))["tags"][1]
+        )
+
+    def test_serialize_specified_fields_does_not_change_them(self):
+        t = self.Target(name="Widget")
+        requested = ["bson_id", "name"]
+        t.to_json(fields=requested)
+        self.assertEqual(["bson_id", "name"], requested)
+
+    def test_serialize_unknown_field(self):
+        with self.assertRaises(KeyError):
+            self.Target(name="Widget").to_json(fields=["colour"])
+
     def test_deserialize_from_json(self):
         json = (
             '{'
@@ -1,5 +1,14 @@
 # -*- coding: utf-8 -*-
 """Various utility functions."""
+import collections
+from bson import json_util
+from bson.binary import Binary
+from bson.code import Code
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
 
 
 def flatten(target):
@@ -10,3 +19,89 @@ def flatten(target):
 
     """
     return [item for sublist in target for item in sublist]
+
+
+def apply_slice(target, slice_):
+    """Returns the items of the list *target* that Mongo's $slice modifier
+    would keep. A positive *slice_* keeps that many items from the start of
+    the list, a negative one keeps them from the end, and zero empties it.
+    If *slice_* is None, all the items are kept.
+
+    For example::
+        apply_slice([1, 2, 3], -2) # => [2, 3]
+
+    """
+    if slice_ is None:
+        return list(target)
+    if slice_ < 0:
+        return list(target[slice_:])
+    return list(target[:slice_])
+
+
+def dump_json(value):
+    """Encodes *value* as extended JSON. The output is the same as
+    bson.json_util.dumps, but most values are encoded in a single pass, using
+    simplejson if it is installed.
+
+    """
+    return json.dumps(_convert_strings(value), default=json_util.default)
+
+
+def _convert_strings(value):
+    """Returns *value* with its Binary and Code values replaced by their
+    extended JSON form. They are str subclasses, so the JSON encoder would
+    write them as plain strings instead of passing them to
+    json_util.default. Lists and dicts are only copied if they hold such
+    values.
+
+    """
+    if isinstance(value, (Binary, Code)):
+        return _convert_strings(json_util.default(value))
+
+    if isinstance(value, dict):
+        converted = None
+        for key, item in value.iteritems():
+            new_item = _convert_strings(item)
+            if new_item is not item:
+                if converted is None:
+                    converted = value.copy()
+                converted[key] = new_item
+        return value if converted is None else converted
+
+    if isinstance(value, (list, tuple)):
+        items = [_convert_strings(item) for item in value]
+        for new_item, item in zip(items, value):
+            if new_item is not item:
+                return items
+        return value
+
+    return value
+
+
+def bounded_map(func, iterable, pool, pending_limit):
+    """Applies *func* to the items of *iterable*, yielding the results in
+    order. If a *pool* is given the items are processed by it while the next
+    ones are taken from *iterable*, with no more than *pending_limit* in
+    progress at a time. The pool is terminated if the results are not all
+    consumed.
+
+    """
+    if pool is None:
+        for item in iterable:
+            yield func(item)
+        return
+
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= pending_limit:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+        pool.join()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Support for caching values for a limited time."""
+from __future__ import with_statement
+import collections
+import threading
+import time
+
+DEFAULT_MAX_SIZE = 1024
+
+
+class ExpiringCache(object):
+    """A thread safe cache of values that are only returned while they are
+    younger than the maximum age asked for.
+
+    Expired values are removed when they are looked up, and when a value is
+    stored, values older than the longest maximum age asked for so far are
+    removed. At most *max_size* values are kept; the least recently used
+    ones are evicted first.
+
+    """
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, clock=time.time):
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self._max_age = None
+        self._clock = clock
+
+    def get(self, key, max_age):
+        """Returns the value stored for *key* if it was stored less than
+        *max_age* seconds ago, otherwise None.
+
+        """
+        with self._lock:
+            if self._max_age is None or max_age > self._max_age:
+                self._max_age = max_age
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+
+            value, stored_at = entry
+            if self._clock() - stored_at >= max_age:
+                return None
+
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        """Stores *value* for *key*."""
+        with self._lock:
+            now = self._clock()
+            self._entries.pop(key, None)
+            self._entries[key] = (value, now)
+
+            if self._max_age is not None:
+                expired = [
+                    k for k, (_, stored_at) in self._entries.iteritems()
+                    if now - stored_at >= self._max_age
+                ]
+                for k in expired:
+                    del self._entries[k]
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all of the stored values."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Provides write-behind buffering: writes are queued and flushed to Mongo
+in bulk from a background thread instead of each waiting for its own round
+trip.
+
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from Queue import Empty, Queue
+from pymongo.errors import BulkWriteError
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 10000
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def log_errors(error, operations):
+    """The default *on_error* callback. Logs the writes that failed."""
+    logger.error(
+        "Write-behind flush failed for %s write(s): %s",
+        len(operations),
+        error
+    )
+
+
+def _document_id(operation):
+    """Returns the _id of the Document written by *operation*, if known."""
+    return operation[1].get("_id")
+
+
+class WriteBehind(object):
+    """Queues the writes returned by tavi.commands.MongoCommand's
+    *write_operation* and writes them to the collection returned by
+    *collection*, a callable, with ordered bulk operations from a background
+    thread.
+
+    A batch is written once *batch_size* writes are queued, or *interval*
+    seconds after its first write was queued. At most *max_pending* writes
+    can be queued; *put* blocks when the queue is full until the background
+    thread catches up. Writes that fail, e.g. because of a duplicate key,
+    are passed to *on_error* along with the error, once per flush. Queued
+    writes are flushed when the process exits. *write_concern* is a dictionary
+    of write concern options, such as {"w": 0}, for the bulk operations.
+
+    """
+
+    def __init__(self, collection, batch_size=DEFAULT_BATCH_SIZE,
+                 interval=DEFAULT_INTERVAL, max_pending=DEFAULT_MAX_PENDING,
+                 on_error=log_errors, write_concern=None):
+        self.collection = collection
+        self.write_concern = write_concern
+        self.batch_size = batch_size
+        self.interval = interval
+        self.on_error = on_error
+        self._queue = Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def put(self, operation):
+        """Queues the write *operation*, blocking while the queue is full."""
+        self._ensure_started()
+        self._queue.put(operation)
+
+    def flush(self):
+        """Blocks until every write queued so far has been written."""
+        if self._thread is not None and self._pid == os.getpid():
+            self._ensure_started()
+            self._queue.join()
+
+    def close(self):
+        """Writes everything that is queued and stops the background
+        thread.
+
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if (thread is None or self._pid != os.getpid() or
+                not thread.is_alive()):
+            return
+        self._queue.put(_STOP)
+        thread.join()
+
+    def _ensure_started(self):
+        """Starts the background thread, again in a forked child, since
+        threads do not survive a fork, or if it has died.
+
+        """
+        if self._running():
+            return
+        with self._lock:
+            if not self._running():
+                if self._pid != os.getpid():
+                    self._queue = Queue(self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="tavi-write-behind")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _running(self):
+        return (self._thread is not None and self._pid == os.getpid() and
+                self._thread.is_alive())
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._take()
+            try:
+                if batch:
+                    self._write(batch)
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+
+    def _take(self):
+        """Waits for the next batch of writes. Returns the batch and whether
+        *close* was called.
+
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+            try:
+                operation = self._queue.get(timeout=timeout)
+            except Empty:
+                break
+
+            if operation is _STOP:
+                return batch, True
+            batch.append(operation)
+            if deadline is None:
+                deadline = time.time() + self.interval
+        return batch, False
+
+    def _write(self, batch):
+        """Writes *batch* with ordered bulk operations, so that the writes of
+        a Document are applied in the order they were queued. When a write
+        fails, the later writes of the same Document are not made, since an
+        update after a failed insert would upsert a partial Document; they
+        are reported along with it and the rest of the batch is written. Any
+        error is reported rather than raised, so that the background thread
+        keeps running.
+
+        """
+        while batch:
+            try:
+                bulk = self.collection().initialize_ordered_bulk_op()
+                for operation in batch:
+                    if "insert" == operation[0]:
+                        bulk.insert(operation[1])
+                    else:
+                        bulk.find(operation[1]).upsert().update_one(
+                            operation[2])
+                bulk.execute(self.write_concern)
+                return
+            except BulkWriteError as e:
+                index = e.details["writeErrors"][0]["index"]
+                _id = _document_id(batch[index])
+                rest = batch[index + 1:]
+                if _id is None:
+                    failed = [batch[index]]
+                else:
+                    failed = [batch[index]] + [
+                        op for op in rest if _document_id(op) == _id]
+                    rest = [op for op in rest if _document_id(op) != _id]
+                self._report(e, failed)
+                batch = rest
+            except Exception as e:
+                self._report(e, batch)
+                return
+
+    def _report(self, error, operations):
+        try:
+            self.on_error(error, operations)
+        except Exception:
+            logger.exception("Write-behind error callback failed")